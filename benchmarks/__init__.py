@@ -0,0 +1,6 @@
+"""
+Benchmarks - Repeatable timings of the bot's hot paths
+
+Run with `python -m benchmarks run`, store a baseline with
+`--save-baseline NAME` and check a change with `python -m benchmarks compare`.
+"""
@@ -0,0 +1,100 @@
+"""
+Benchmark CLI
+
+    python -m benchmarks list
+    python -m benchmarks run [-k PATTERN] [--group micro|macro] [--save-baseline NAME]
+    python -m benchmarks compare [--baseline NAME] [--threshold 0.1] [RESULTS.json]
+
+compare exits with status 1 when a benchmark regressed beyond the threshold.
+Without a results file it runs the benchmarks found in the baseline first.
+"""
+
+import argparse
+import sys
+
+from loguru import logger
+
+from . import bench_database, bench_engine, bench_game, bench_learning, bench_pgn  # noqa: F401
+from .harness import (BENCHMARKS, baseline_path, compare, load_results, run, save_results,
+                      select)
+
+
+def _report(name: str, entry: dict):
+    if 'skipped' in entry:
+        print(f"{name:32s} ignorado: {entry['skipped']}")
+        return
+    extra = ''.join(f"  {key}={value:,.1f}" for key, value in entry['metrics'].items())
+    print(f"{name:32s} {entry['seconds_per_op'] * 1e6:12.1f} µs/op  "
+          f"{entry['ops_per_second']:12,.1f} ops/s  ±{entry['stdev_pct']:.1f}%{extra}")
+
+
+def _run(args) -> int:
+    benches = select(args.k, args.group)
+    results = run(benches, args.repeat, _report)
+    if args.output:
+        save_results(results, baseline_path(args.output))
+    if args.save_baseline:
+        save_results(results, baseline_path(args.save_baseline))
+        print(f"Baseline salvo em {baseline_path(args.save_baseline)}")
+    return 0
+
+
+def _compare(args) -> int:
+    path = baseline_path(args.baseline)
+    if not path.exists():
+        print(f"Baseline {path} não encontrado; crie com: python -m benchmarks run --save-baseline {args.baseline}")
+        return 2
+    baseline = load_results(path)
+    if args.results:
+        current = load_results(baseline_path(args.results))
+    else:
+        names = [name for name in baseline['benchmarks'] if name in BENCHMARKS]
+        current = run(select(names), args.repeat, _report)
+
+    rows = compare(baseline, current, args.threshold)
+    regressions = [row for row in rows if row[5]]
+    for name, metric, before, after, change, regressed in rows:
+        status = 'REGRESSÃO' if regressed else ('melhor' if change < -args.threshold else 'ok')
+        print(f"{name:32s} {metric:22s} {before:14.6g} -> {after:14.6g} {change:+8.1%}  {status}")
+    print(f"{len(regressions)} regressões acima de {args.threshold:.0%} em {len(rows)} métricas")
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks with baselines")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list", help="list registered benchmarks")
+
+    run_parser = commands.add_parser("run", help="run benchmarks")
+    run_parser.add_argument("-k", action="append", help="glob pattern on benchmark names (repeatable)")
+    run_parser.add_argument("--group", choices=["micro", "macro"])
+    run_parser.add_argument("--repeat", type=int, default=None)
+    run_parser.add_argument("--output", help="write results to this JSON file")
+    run_parser.add_argument("--save-baseline", metavar="NAME", help="store results as baseline NAME")
+
+    compare_parser = commands.add_parser("compare", help="compare results with a baseline")
+    compare_parser.add_argument("results", nargs="?", help="results JSON (default: run now)")
+    compare_parser.add_argument("--baseline", default="default")
+    compare_parser.add_argument("--threshold", type=float, default=0.10,
+                                help="relative slowdown that counts as a regression")
+    compare_parser.add_argument("--repeat", type=int, default=None)
+
+    parser.add_argument("-v", "--verbose", action="store_true", help="keep the application's logs")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logger.remove()
+        logger.add(sys.stderr, level="WARNING")
+
+    if args.command == "list":
+        for bench in BENCHMARKS.values():
+            print(f"{bench.name:32s} {bench.group}")
+        return 0
+    if args.command == "run":
+        return _run(args)
+    return _compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+"""
+Database Benchmarks - Game writes and statistics reads
+"""
+
+from itertools import count
+
+from .fixtures import close_database, game_data, open_database, random_games
+from .harness import Case, benchmark
+
+
+@benchmark('db.save_game')
+async def save_game():
+    db = await open_database()
+    boards = random_games(50)
+    ids = count()
+
+    async def run():
+        for board in boards:
+            await db.save_game(game_data(next(ids), board))
+        await db.flush()
+    yield Case(run, ops=len(boards))
+    await close_database(db)
+
+
+@benchmark('db.get_bot_statistics')
+async def get_bot_statistics():
+    db = await open_database()
+    for i, board in enumerate(random_games(200)):
+        await db.save_game(game_data(i, board))
+    await db.flush()
+
+    async def run():
+        for _ in range(200):
+            await db.get_bot_statistics()
+    yield Case(run, ops=200)
+    await close_database(db)
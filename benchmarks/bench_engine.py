@@ -0,0 +1,74 @@
+"""
+Engine Benchmarks - Neural alpha-beta, MCTS and Stockfish
+"""
+
+import chess
+import chess.engine
+
+from src.engine.mcts import MCTS
+from src.engine.neural_search import NeuralSearch
+from src.engine.stockfish_engine import StockfishEngine
+from src.learning.neural_network import ChessNet
+
+from .fixtures import random_positions, require_stockfish
+from .harness import Case, benchmark
+
+# A quiet Italian Game middlegame, so the trees are not dominated by forced lines
+MIDDLEGAME_FEN = 'r1bq1rk1/ppp2ppp/2np1n2/2b1p3/2B1P3/2PP1N2/PP3PPP/RNBQ1RK1 w - - 0 7'
+
+
+@benchmark('search.neural.depth3')
+async def neural_search():
+    search = NeuralSearch(ChessNet(), max_depth=3)
+    board = chess.Board(MIDDLEGAME_FEN)
+
+    def run():
+        # Cold tables every time, otherwise later repeats only hit the cache
+        search.tt.clear()
+        search.evals.clear()
+        search.search(board, time_limit=60.0)
+        return {'nps': search.last_search['nps']}
+    yield Case(run)
+
+
+@benchmark('search.mcts.800')
+async def mcts_search():
+    mcts = MCTS(ChessNet(), nodes=800)
+    board = chess.Board(MIDDLEGAME_FEN)
+
+    def run():
+        mcts.reset(board)
+        mcts.search(board)
+        return {'playouts_per_second': mcts.last_search['playouts_per_second']}
+    yield Case(run)
+
+
+async def _stockfish() -> StockfishEngine:
+    require_stockfish()
+    engine = StockfishEngine()
+    await engine.initialize()
+    return engine
+
+
+@benchmark('stockfish.evaluate_position', repeat=3)
+async def evaluate_position():
+    engine = await _stockfish()
+    boards = random_positions(200)[::40]
+
+    async def run():
+        for board in boards:
+            await engine.evaluate_position(board)
+    yield Case(run, ops=len(boards))
+    await engine.shutdown()
+
+
+@benchmark('stockfish.label_positions', repeat=3)
+async def label_positions():
+    engine = await _stockfish()
+    boards = random_positions(500)
+
+    async def run():
+        async for _ in engine.label_positions(boards, nodes=engine.label_nodes, log_every=0):
+            pass
+    yield Case(run, ops=len(boards))
+    await engine.shutdown()
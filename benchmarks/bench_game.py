@@ -0,0 +1,78 @@
+"""
+Game Benchmarks - Whole games through the bot's move loop
+"""
+
+import time
+from itertools import count
+
+import chess
+import chess.engine
+
+from src.analysis.game_analyzer import GameAnalyzer
+from src.bot.chess_bot import SophieBot
+from src.engine.mcts import MCTS
+from src.engine.neural_search import NeuralSearch
+from src.engine.stockfish_engine import StockfishEngine
+from src.learning.model_manager import ModelManager
+from src.learning.neural_network import ChessNet, ChessTrainer, PositionEncoder
+from src.learning.self_play import play_game
+
+from .fixtures import close_database, open_database, require_stockfish
+from .harness import Case, benchmark
+
+
+class SimulatedClient:
+    """Stands in for LichessClient; the opponent is Stockfish on a node budget."""
+
+    def __init__(self, engine: StockfishEngine, nodes: int = 1000):
+        self.engine = engine
+        self.limit = chess.engine.Limit(nodes=nodes)
+        self.board = chess.Board()
+
+    async def make_move(self, game_id: str, move_uci: str) -> bool:
+        self.board.push_uci(move_uci)
+        return True
+
+    async def wait_for_opponent_move(self, game_id: str, last_move=None, max_wait: int = 60) -> str:
+        result = await self.engine.engine.play(self.board, self.limit)
+        self.board.push(result.move)
+        return result.move.uci()
+
+
+@benchmark('game.self_play', group='macro', repeat=3)
+async def self_play_game():
+    mcts = MCTS(ChessNet(), nodes=64, dirichlet_alpha=0.3)
+
+    def run():
+        start = time.perf_counter()
+        records = play_game(mcts, exploration_rate=0.1, discount_factor=0.99, max_plies=120)
+        return {'plies_per_second': len(records) / (time.perf_counter() - start)}
+    yield Case(run, warmup=0)
+
+
+@benchmark('game.simulated', group='macro', repeat=1)
+async def simulated_game():
+    require_stockfish()
+    engine = StockfishEngine()
+    await engine.initialize()
+    db = await open_database()
+
+    model_manager = ModelManager(db)
+    model_manager.encoder = PositionEncoder()
+    model_manager.model = ChessNet()
+    model_manager.trainer = ChessTrainer(model_manager.model)
+    model_manager.search = NeuralSearch(model_manager.model)
+    model_manager.mcts = MCTS(model_manager.model, nodes=64)
+    bot = SophieBot(db, model_manager, engine, GameAnalyzer(engine))
+    bot.move_source = 'mcts'
+    games = count()
+
+    async def run():
+        bot.client = SimulatedClient(engine)
+        start = time.perf_counter()
+        await bot.play_game({'game_id': f'sim{next(games)}', 'opponent': 'Stockfish', 'color': 'white',
+                             'time_control': '180+0'})
+        return {'plies_per_second': bot.client.board.ply() / (time.perf_counter() - start)}
+    yield Case(run, warmup=0)
+    await close_database(db)
+    await engine.shutdown()
@@ -0,0 +1,69 @@
+"""
+Learning Benchmarks - Position encoding, network inference and training
+"""
+
+import numpy as np
+import torch
+
+from src.learning.neural_network import ChessNet, ChessTrainer, PositionEncoder
+from src.learning.position_codec import POSITION_DTYPE, decode_features, encode_position
+
+from .fixtures import random_positions
+from .harness import Case, benchmark
+
+FORWARD_BATCH_SIZES = (1, 32, 256)
+
+
+@benchmark('encoder.board_to_tensor')
+async def board_to_tensor():
+    boards = random_positions(500)
+
+    def run():
+        for board in boards:
+            PositionEncoder.add_game_state_features(board, PositionEncoder.board_to_tensor(board))
+    yield Case(run, ops=len(boards))
+
+
+@benchmark('codec.encode_decode')
+async def encode_decode():
+    boards = random_positions(500)
+
+    def run():
+        decode_features(np.array([encode_position(board) for board in boards], dtype=POSITION_DTYPE))
+    yield Case(run, ops=len(boards))
+
+
+def _forward_benchmark(batch_size: int):
+    async def forward():
+        model = ChessNet()
+        model.eval()
+        records = np.array([encode_position(board) for board in random_positions(batch_size)],
+                           dtype=POSITION_DTYPE)
+        features = torch.from_numpy(decode_features(records))
+        iterations = max(1, 1024 // batch_size)
+
+        def run():
+            with torch.no_grad():
+                for _ in range(iterations):
+                    model(features)
+        yield Case(run, ops=iterations * batch_size)
+    benchmark(f'model.forward.b{batch_size}')(forward)
+
+
+for _batch_size in FORWARD_BATCH_SIZES:
+    _forward_benchmark(_batch_size)
+
+
+@benchmark('trainer.train_step.b256')
+async def train_step():
+    trainer = ChessTrainer(ChessNet())
+    records = np.array([encode_position(board, next(iter(board.legal_moves), None))
+                        for board in random_positions(256)], dtype=POSITION_DTYPE)
+    features = torch.from_numpy(decode_features(records))
+    values = np.random.uniform(-1, 1, len(records)).astype(np.float32)
+    moves = records['move'].astype(np.int64)
+
+    def run():
+        trainer.model.train()
+        trainer.train_step(features, values, moves)
+    yield Case(run, ops=len(records))
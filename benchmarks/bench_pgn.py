@@ -0,0 +1,55 @@
+"""
+PGN Benchmarks - Corpus scanning, filtering and position extraction
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import time
+
+from src.learning.pgn_corpus import process_pgn, scan_games
+from src.learning.position_codec import games_to_positions
+
+from .fixtures import pgn_text
+from .harness import Case, benchmark
+
+GAMES = 5000
+PROCESS_GAMES = 2000
+
+
+@benchmark('pgn.scan_games')
+async def scan():
+    data = pgn_text(GAMES)
+
+    def run():
+        start = time.perf_counter()
+        for _ in scan_games(io.BytesIO(data)):
+            pass
+        return {'mb_per_second': len(data) / 1e6 / (time.perf_counter() - start)}
+    yield Case(run, ops=GAMES)
+
+
+@benchmark('pgn.process_pgn', repeat=3)
+async def process():
+    directory = tempfile.mkdtemp(prefix='bench_pgn_')
+    pgn_path = os.path.join(directory, 'games.pgn')
+    with open(pgn_path, 'wb') as f:
+        f.write(pgn_text(PROCESS_GAMES))
+    output_path = os.path.join(directory, 'filtered.pgn')
+
+    def run():
+        process_pgn(pgn_path, output_path, min_elo=1500, workers=2)
+    yield Case(run, ops=PROCESS_GAMES)
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+@benchmark('pgn.games_to_positions')
+async def to_positions():
+    raw_games = [raw for _, raw in scan_games(io.BytesIO(pgn_text(200)))]
+
+    def run():
+        start = time.perf_counter()
+        records = games_to_positions(raw_games)
+        return {'positions_per_second': len(records) / (time.perf_counter() - start)}
+    yield Case(run, ops=len(raw_games))
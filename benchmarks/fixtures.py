@@ -0,0 +1,101 @@
+"""
+Benchmark Fixtures - Deterministic positions, games and PGN text
+"""
+
+import os
+import random
+import shutil
+import tempfile
+from typing import Any, Dict, List
+
+import chess
+import chess.pgn
+
+from src.database.db_manager import DatabaseManager
+
+from .harness import SkipBenchmark
+
+
+def random_games(count: int, max_plies: int = 80, seed: int = 0) -> List[chess.Board]:
+    """Play seeded random games; each board keeps its move stack."""
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        board = chess.Board()
+        while not board.is_game_over() and board.ply() < max_plies:
+            board.push(rng.choice(list(board.legal_moves)))
+        games.append(board)
+    return games
+
+
+def random_positions(count: int, seed: int = 0) -> List[chess.Board]:
+    """Positions sampled from every ply of seeded random games."""
+    positions = []
+    for game in random_games(count // 40 + 1, seed=seed):
+        board = chess.Board()
+        for move in game.move_stack:
+            board.push(move)
+            positions.append(board.copy(stack=False))
+    return positions[:count]
+
+
+def pgn_text(count: int, seed: int = 0) -> bytes:
+    """A PGN file of `count` random games with Lichess-like headers."""
+    rng = random.Random(seed)
+    games = random_games(min(count, 50), seed=seed)
+    chunks = []
+    for i in range(count):
+        game = chess.pgn.Game.from_board(games[i % len(games)])
+        game.headers['Event'] = f'Rated Blitz game {i}'
+        game.headers['WhiteElo'] = str(rng.randint(1000, 2600))
+        game.headers['BlackElo'] = str(rng.randint(1000, 2600))
+        game.headers['Result'] = rng.choice(['1-0', '0-1', '1/2-1/2'])
+        chunks.append(str(game).replace(' *', ' ' + game.headers['Result']))
+    return ('\n\n'.join(chunks) + '\n').encode()
+
+
+def game_data(index: int, board: chess.Board) -> Dict[str, Any]:
+    """A finished game in the shape SophieBot hands to DatabaseManager.save_game."""
+    moves = [move.uci() for move in board.move_stack]
+    return {
+        'game_id': f'bench{index:06d}',
+        'opponent': f'Bot{index % 7}',
+        'color': 'white' if index % 2 == 0 else 'black',
+        'result': ('win', 'loss', 'draw')[index % 3],
+        'time_control': '180+0',
+        'played_at': f'2024-05-{index % 28 + 1:02d}T12:{index % 60:02d}:00',
+        'moves': moves,
+        'move_times': [0.1 + (i % 5) * 0.05 for i in range(len(moves) // 2)],
+        'evaluations': [((i * 37) % 200 - 100) / 100.0 for i in range(len(moves))],
+        'pgn': str(chess.pgn.Game.from_board(board)),
+        'duration': 60.0 + index % 120,
+    }
+
+
+def require_stockfish() -> str:
+    """Path of the Stockfish binary, or skip the benchmark."""
+    path = os.getenv('STOCKFISH_PATH', 'stockfish')
+    if not (os.path.isfile(path) or shutil.which(path)):
+        raise SkipBenchmark(f"Stockfish not found at {path}")
+    return path
+
+
+async def open_database() -> DatabaseManager:
+    """A manager on a fresh temporary database file (DB_PATH is restored right away)."""
+    directory = tempfile.mkdtemp(prefix='bench_db_')
+    previous = os.environ.get('DB_PATH')
+    os.environ['DB_PATH'] = os.path.join(directory, 'bench.db')
+    try:
+        db = DatabaseManager()
+    finally:
+        if previous is None:
+            del os.environ['DB_PATH']
+        else:
+            os.environ['DB_PATH'] = previous
+    await db.initialize()
+    return db
+
+
+async def close_database(db: DatabaseManager):
+    await db.close()
+    shutil.rmtree(os.path.dirname(db.db_path), ignore_errors=True)
@@ -0,0 +1,210 @@
+"""
+Benchmark Harness - Registry, timing and baseline comparison
+
+Benchmarks are async generators registered with @benchmark: they set up
+their fixtures, yield a Case whose run() is timed, and clean up after the
+yield. run() may be sync or async and may return extra metrics (all
+throughput-style, so higher is better), e.g. {'nps': ...}.
+"""
+
+import asyncio
+import fnmatch
+import inspect
+import json
+import os
+import platform
+import random
+import statistics
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+BASELINE_DIR = Path(__file__).parent / 'baselines'
+
+
+class SkipBenchmark(Exception):
+    """Raised during setup when a benchmark cannot run here (e.g. no Stockfish)."""
+
+
+@dataclass
+class Case:
+    """What a benchmark times: run() performs `ops` operations."""
+    run: Callable[[], Any]
+    ops: int = 1
+    warmup: int = 1
+
+
+@dataclass
+class Benchmark:
+    name: str
+    func: Callable[[], AsyncIterator[Case]]
+    group: str = 'micro'
+    repeat: int = 5
+
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, group: str = 'micro', repeat: int = 5):
+    """Register an async generator as a benchmark."""
+    def register(func):
+        BENCHMARKS[name] = Benchmark(name, func, group, repeat)
+        return func
+    return register
+
+
+def select(patterns: Optional[List[str]] = None, group: Optional[str] = None) -> List[Benchmark]:
+    """Registered benchmarks matching any glob pattern and the group."""
+    selected = []
+    for bench in BENCHMARKS.values():
+        if group and bench.group != group:
+            continue
+        if patterns and not any(fnmatch.fnmatch(bench.name, pattern) for pattern in patterns):
+            continue
+        selected.append(bench)
+    return selected
+
+
+def _seed(value: int = 0):
+    random.seed(value)
+    np.random.seed(value)
+    try:
+        import torch
+        torch.manual_seed(value)
+    except ImportError:
+        pass
+
+
+async def _call(run: Callable[[], Any]) -> Any:
+    result = run()
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+async def run_benchmark(bench: Benchmark, repeat: Optional[int] = None) -> Dict[str, Any]:
+    """Time one benchmark; returns its result entry."""
+    _seed()
+    repeat = repeat or bench.repeat
+    generator = bench.func()
+    case = await generator.__anext__()
+    try:
+        for _ in range(case.warmup):
+            await _call(case.run)
+
+        times, extra = [], {}
+        for _ in range(repeat):
+            start = time.perf_counter()
+            metrics = await _call(case.run)
+            times.append(time.perf_counter() - start)
+            for key, value in (metrics or {}).items():
+                extra.setdefault(key, []).append(value)
+    finally:
+        # Resume the generator so the code after its yield tears the fixtures down
+        try:
+            await generator.__anext__()
+        except StopAsyncIteration:
+            pass
+
+    median = statistics.median(times)
+    return {
+        'group': bench.group,
+        'ops': case.ops,
+        'repeat': repeat,
+        'seconds_per_op': median / case.ops,
+        'min_seconds_per_op': min(times) / case.ops,
+        'stdev_pct': 100 * statistics.pstdev(times) / median if median else 0.0,
+        'ops_per_second': case.ops / median if median else 0.0,
+        'metrics': {key: statistics.median(values) for key, values in extra.items()},
+    }
+
+
+def environment() -> Dict[str, Any]:
+    """Machine and library details stored next to the numbers."""
+    info = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+    }
+    try:
+        import torch
+        info['torch'] = torch.__version__
+        info['torch_threads'] = torch.get_num_threads()
+    except ImportError:
+        pass
+    return info
+
+
+async def run_all(benches: List[Benchmark], repeat: Optional[int] = None,
+                  report: Callable[[str, Dict[str, Any]], None] = lambda name, entry: None) -> Dict[str, Any]:
+    """Run benchmarks in order, recording skips instead of failing the run."""
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'environment': environment(),
+        'benchmarks': {},
+        'skipped': {},
+    }
+    for bench in benches:
+        try:
+            entry = await run_benchmark(bench, repeat)
+        except SkipBenchmark as e:
+            results['skipped'][bench.name] = str(e)
+            report(bench.name, {'skipped': str(e)})
+            continue
+        results['benchmarks'][bench.name] = entry
+        report(bench.name, entry)
+    return results
+
+
+def run(benches: List[Benchmark], repeat: Optional[int] = None,
+        report: Callable[[str, Dict[str, Any]], None] = lambda name, entry: None) -> Dict[str, Any]:
+    return asyncio.run(run_all(benches, repeat, report))
+
+
+def baseline_path(name_or_path: str) -> Path:
+    """A baseline name (stored in benchmarks/baselines/) or an explicit JSON path."""
+    if name_or_path.endswith('.json') or os.sep in name_or_path:
+        return Path(name_or_path)
+    return BASELINE_DIR / f'{name_or_path}.json'
+
+
+def save_results(results: Dict[str, Any], path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def load_results(path: Path) -> Dict[str, Any]:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any],
+            threshold: float = 0.10) -> List[Tuple[str, str, float, float, float, bool]]:
+    """
+    Compare two result sets benchmark by benchmark. Returns rows of
+    (benchmark, metric, baseline, current, relative change, regressed) where
+    the change is positive when things got slower. Time per operation must
+    not grow, and extra metrics must not drop, by more than the threshold.
+    """
+    rows = []
+    for name, entry in current['benchmarks'].items():
+        base = baseline['benchmarks'].get(name)
+        if base is None:
+            continue
+        before, after = base['seconds_per_op'], entry['seconds_per_op']
+        change = after / before - 1 if before else 0.0
+        rows.append((name, 'seconds_per_op', before, after, change, change > threshold))
+        for metric, after in entry['metrics'].items():
+            before = base['metrics'].get(metric)
+            if not before:
+                continue
+            change = before / after - 1 if after else float('inf')
+            rows.append((name, metric, before, after, change, change > threshold))
+    return rows
@@ -6,23 +6,62 @@ Provides a web dashboard to monitor the bot's performance and statistics.
 """
 
 import asyncio
+import hashlib
+import os
 import sys
+import time
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent / "src"))
 
 import json
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
 from loguru import logger
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pandas as pd
-from flask import Flask, render_template, jsonify
-from threading import Thread
+from aiohttp import web
 
 from src.database.db_manager import DatabaseManager
 
-app = Flask(__name__)
-db_manager = None
+
+# Responses kept at most; expired entries are evicted first, then the oldest
+CACHE_MAX_ENTRIES = 256
+
+
+class ResponseCache:
+    """Short-lived cache of serialized API responses, shared by all viewers."""
+    
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.entries: "OrderedDict[str, Tuple[float, bytes, str]]" = OrderedDict()
+        self.inflight: Dict[str, asyncio.Future] = {}
+        self.max_entries = max_entries
+    
+    async def get(self, key: str, ttl: float,
+                  producer: Callable[[], Awaitable[Any]]) -> Tuple[bytes, str]:
+        """Return (body, etag) for the key, running the producer at most once per TTL."""
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1], entry[2]
+        
+        # Concurrent misses wait for the same query
+        future = self.inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._refresh(key, ttl, producer))
+            self.inflight[key] = future
+            future.add_done_callback(lambda _: self.inflight.pop(key, None))
+        return await asyncio.shield(future)
+    
+    async def _refresh(self, key: str, ttl: float,
+                       producer: Callable[[], Awaitable[Any]]) -> Tuple[bytes, str]:
+        body = json.dumps(await producer(), separators=(',', ':')).encode('utf-8')
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        now = time.monotonic()
+        self.entries[key] = (now + ttl, body, etag)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            for stale in [k for k, entry in self.entries.items() if entry[0] <= now]:
+                del self.entries[stale]
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return body, etag
 
 
 class DashboardData:
@@ -47,107 +86,14 @@ class DashboardData:
     
     async def get_recent_games(self, limit=10):
         """Get recent games data."""
-        # This would be implemented with proper SQL queries
-        # For demo purposes, returning mock data
-        return [
-            {
-                'game_id': f'game_{i}',
-                'opponent': f'Player{i}',
-                'result': ['win', 'loss', 'draw'][i % 3],
-                'color': ['white', 'black'][i % 2],
-                'duration': 300 + i * 30,
-                'date': (datetime.now() - timedelta(days=i)).isoformat()
-            }
-            for i in range(limit)
-        ]
-    
-    def generate_performance_chart(self):
-        """Generate performance chart over time."""
-        # Mock data for demonstration
-        dates = pd.date_range(start='2023-01-01', periods=30, freq='D')
-        win_rates = [50 + i * 0.5 + (i % 3) * 2 for i in range(30)]
-        
-        plt.figure(figsize=(12, 6))
-        plt.plot(dates, win_rates, marker='o', linewidth=2, markersize=4)
-        plt.title('Win Rate Over Time', fontsize=16, fontweight='bold')
-        plt.xlabel('Date')
-        plt.ylabel('Win Rate (%)')
-        plt.grid(True, alpha=0.3)
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        
-        chart_path = 'static/performance_chart.png'
-        Path('static').mkdir(exist_ok=True)
-        plt.savefig(chart_path, dpi=150, bbox_inches='tight')
-        plt.close()
-        
-        return chart_path
-
-
-@app.route('/')
-def index():
-    """Main dashboard page."""
-    return render_template('dashboard.html')
-
-
-@app.route('/api/stats')
-def api_stats():
-    """API endpoint for performance statistics."""
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+        return await self.db_manager.get_recent_games(limit)
     
-    try:
-        dashboard_data = DashboardData(db_manager)
-        stats = loop.run_until_complete(dashboard_data.get_performance_stats())
-        return jsonify(stats)
-    finally:
-        loop.close()
+    async def get_performance_series(self, granularity='day', points=30):
+        """Get the precomputed per-day or per-hour performance series."""
+        return await self.db_manager.get_performance_series(granularity, points)
 
 
-@app.route('/api/recent-games')
-def api_recent_games():
-    """API endpoint for recent games."""
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    
-    try:
-        dashboard_data = DashboardData(db_manager)
-        games = loop.run_until_complete(dashboard_data.get_recent_games())
-        return jsonify(games)
-    finally:
-        loop.close()
-
-
-async def init_dashboard():
-    """Initialize dashboard components."""
-    global db_manager
-    
-    logger.info("Initializing dashboard...")
-    
-    # Initialize database connection
-    db_manager = DatabaseManager()
-    await db_manager.initialize()
-    
-    logger.info("Dashboard initialized")
-
-
-def run_flask_app():
-    """Run the Flask application in a separate thread."""
-    app.run(host='0.0.0.0', port=5000, debug=False)
-
-
-async def main():
-    """Main dashboard function."""
-    logger.info("📈 Starting Chess Bot Dashboard")
-    logger.info("=" * 40)
-    
-    await init_dashboard()
-    
-    # Create templates directory and basic template
-    templates_dir = Path('templates')
-    templates_dir.mkdir(exist_ok=True)
-    
-    dashboard_template = '''
+DASHBOARD_TEMPLATE = '''
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -178,6 +124,7 @@ async def main():
         <div class="header">
             <h1>🤖 Chess Learning Bot Dashboard</h1>
             <p>Real-time monitoring and performance analytics</p>
+            <p id="live-game">Waiting for games...</p>
         </div>
         
         <div class="stats-grid" id="stats-container">
@@ -210,33 +157,54 @@ async def main():
     </div>
     
     <script>
+        let stats = null;
+        
+        function renderStats() {
+            const total = Math.max(stats.total_games, 1);
+            const container = document.getElementById('stats-container');
+            container.innerHTML = `
+                <div class="stat-card">
+                    <div class="stat-value">${stats.total_games}</div>
+                    <div class="stat-label">Total Games</div>
+                </div>
+                <div class="stat-card">
+                    <div class="stat-value">${(stats.wins / total * 100).toFixed(1)}%</div>
+                    <div class="stat-label">Win Rate</div>
+                </div>
+                <div class="stat-card">
+                    <div class="stat-value">${stats.wins}</div>
+                    <div class="stat-label">Wins</div>
+                </div>
+                <div class="stat-card">
+                    <div class="stat-value">${stats.losses}</div>
+                    <div class="stat-label">Losses</div>
+                </div>
+                <div class="stat-card">
+                    <div class="stat-value">${stats.draws}</div>
+                    <div class="stat-label">Draws</div>
+                </div>
+            `;
+        }
+        
+        function gameRow(game) {
+            return `
+                <tr>
+                    <td>${game.game_id}</td>
+                    <td>${game.opponent}</td>
+                    <td>${game.color}</td>
+                    <td class="${game.result}">${game.result.toUpperCase()}</td>
+                    <td>${Math.floor(game.duration / 60)}m ${Math.round(game.duration % 60)}s</td>
+                    <td>${new Date(game.date).toLocaleDateString()}</td>
+                </tr>
+            `;
+        }
+        
         // Load statistics
         fetch('/api/stats')
             .then(response => response.json())
             .then(data => {
-                const container = document.getElementById('stats-container');
-                container.innerHTML = `
-                    <div class="stat-card">
-                        <div class="stat-value">${data.total_games}</div>
-                        <div class="stat-label">Total Games</div>
-                    </div>
-                    <div class="stat-card">
-                        <div class="stat-value">${data.win_rate.toFixed(1)}%</div>
-                        <div class="stat-label">Win Rate</div>
-                    </div>
-                    <div class="stat-card">
-                        <div class="stat-value">${data.wins}</div>
-                        <div class="stat-label">Wins</div>
-                    </div>
-                    <div class="stat-card">
-                        <div class="stat-value">${data.losses}</div>
-                        <div class="stat-label">Losses</div>
-                    </div>
-                    <div class="stat-card">
-                        <div class="stat-value">${data.draws}</div>
-                        <div class="stat-label">Draws</div>
-                    </div>
-                `;
+                stats = data;
+                renderStats();
             });
         
         // Load recent games
@@ -244,69 +212,331 @@ async def main():
             .then(response => response.json())
             .then(games => {
                 const tbody = document.getElementById('recent-games-body');
-                tbody.innerHTML = games.map(game => `
-                    <tr>
-                        <td>${game.game_id}</td>
-                        <td>${game.opponent}</td>
-                        <td>${game.color}</td>
-                        <td class="${game.result}">${game.result.toUpperCase()}</td>
-                        <td>${Math.floor(game.duration / 60)}m ${game.duration % 60}s</td>
-                        <td>${new Date(game.date).toLocaleDateString()}</td>
-                    </tr>
-                `).join('');
+                tbody.innerHTML = games.map(gameRow).join('');
             });
         
         // Create performance chart
-        const ctx = document.getElementById('performanceChart').getContext('2d');
-        new Chart(ctx, {
-            type: 'line',
-            data: {
-                labels: Array.from({length: 30}, (_, i) => `Day ${i + 1}`),
-                datasets: [{
-                    label: 'Win Rate (%)',
-                    data: Array.from({length: 30}, (_, i) => 50 + i * 0.5 + (i % 3) * 2),
-                    borderColor: 'rgb(75, 192, 192)',
-                    backgroundColor: 'rgba(75, 192, 192, 0.2)',
-                    tension: 0.1
-                }]
-            },
-            options: {
-                responsive: true,
-                scales: {
-                    y: {
-                        beginAtZero: true,
-                        max: 100
+        fetch('/api/timeseries')
+            .then(response => response.json())
+            .then(series => {
+                const ctx = document.getElementById('performanceChart').getContext('2d');
+                new Chart(ctx, {
+                    type: 'line',
+                    data: {
+                        labels: series.t,
+                        datasets: [{
+                            label: 'Win Rate (%)',
+                            data: series.win_rate,
+                            borderColor: 'rgb(75, 192, 192)',
+                            backgroundColor: 'rgba(75, 192, 192, 0.2)',
+                            yAxisID: 'y',
+                            tension: 0.1
+                        }, {
+                            label: 'Avg CP Loss',
+                            data: series.avg_cp_loss,
+                            borderColor: 'rgb(255, 99, 132)',
+                            yAxisID: 'cp',
+                            tension: 0.1
+                        }, {
+                            label: 'Avg Move Time (s)',
+                            data: series.avg_move_time,
+                            borderColor: 'rgb(54, 162, 235)',
+                            yAxisID: 'cp',
+                            hidden: true,
+                            tension: 0.1
+                        }]
+                    },
+                    options: {
+                        responsive: true,
+                        spanGaps: true,
+                        scales: {
+                            y: {
+                                beginAtZero: true,
+                                max: 100
+                            },
+                            cp: {
+                                beginAtZero: true,
+                                position: 'right',
+                                grid: { drawOnChartArea: false }
+                            }
+                        }
                     }
-                }
+                });
+            });
+        
+        // Live updates pushed by the bot; no page reloads
+        const events = new EventSource('/api/events');
+        const live = document.getElementById('live-game');
+        
+        events.addEventListener('game_start', e => {
+            const game = JSON.parse(e.data);
+            live.textContent = `Playing ${game.game_id} vs ${game.opponent} as ${game.color}`;
+        });
+        
+        events.addEventListener('move', e => {
+            const move = JSON.parse(e.data);
+            const evaluation = move.evaluation === null ? '' : ` (eval ${move.evaluation})`;
+            live.textContent = `${move.game_id} - ply ${move.ply}: ${move.uci}${evaluation}`;
+        });
+        
+        events.addEventListener('game_end', e => {
+            const game = JSON.parse(e.data);
+            live.textContent = `Game ${game.game_id} finished: ${game.result}`;
+            const tbody = document.getElementById('recent-games-body');
+            tbody.insertAdjacentHTML('afterbegin', gameRow(game));
+            while (tbody.rows.length > 10) {
+                tbody.deleteRow(-1);
             }
         });
         
-        // Auto-refresh every 30 seconds
-        setInterval(() => {
-            location.reload();
-        }, 30000);
+        events.addEventListener('stats', e => {
+            if (!stats) return;
+            const delta = JSON.parse(e.data).delta;
+            stats.total_games += delta.games_played;
+            stats.wins += delta.wins;
+            stats.losses += delta.losses;
+            stats.draws += delta.draws;
+            renderStats();
+        });
     </script>
 </body>
 </html>
-    '''
+'''
+
+
+class EventBroadcaster:
+    """Tails the bot's events table once and fans new events out to every viewer."""
     
-    with open(templates_dir / 'dashboard.html', 'w', encoding='utf-8') as f:
-        f.write(dashboard_template)
+    def __init__(self, db_manager: DatabaseManager, cache: ResponseCache,
+                 poll_interval: Optional[float] = None):
+        self.db_manager = db_manager
+        self.cache = cache
+        # Moves reach the table with the bot's write-behind flushes, game ends at once
+        self.poll_interval = (poll_interval if poll_interval is not None
+                              else float(os.getenv('DASHBOARD_POLL_INTERVAL', '0.25')))
+        self.subscribers = set()
+        self.last_id = 0
+        self.task = None
     
-    # Start Flask app in a separate thread
-    flask_thread = Thread(target=run_flask_app, daemon=True)
-    flask_thread.start()
+    async def start(self):
+        self.last_id = await self.db_manager.get_last_event_id()
+        self.task = asyncio.create_task(self._poll())
     
-    logger.info("🌐 Dashboard available at http://localhost:5000")
-    logger.info("Press Ctrl+C to stop")
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+    
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=256)
+        self.subscribers.add(queue)
+        return queue
+    
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+    
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                events = await self.db_manager.get_events_since(self.last_id)
+            except Exception as e:
+                logger.error(f"Error reading events: {e}")
+                continue
+            if not events:
+                continue
+            self.last_id = events[-1][0]
+            for queue in list(self.subscribers):
+                for event in events:
+                    try:
+                        queue.put_nowait(event)
+                    except asyncio.QueueFull:
+                        self._drop(queue)
+                        break
+            # Finished games change every cached aggregate
+            if any(event[1] == 'game_end' for event in events):
+                self.cache.entries.clear()
+    
+    def _drop(self, queue: asyncio.Queue):
+        """Disconnect a slow viewer; its browser reconnects with Last-Event-ID."""
+        self.unsubscribe(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+
+routes = web.RouteTableDef()
+
+# Events read per query when replaying for a reconnecting browser
+REPLAY_BATCH = 500
+
+# Seconds each endpoint may be served from cache
+STATS_TTL = 5.0
+RECENT_GAMES_TTL = 5.0
+TIMESERIES_TTL = 60.0
+
+
+def int_param(request: web.Request, name: str, default: int, maximum: int) -> int:
+    """Read a positive integer query parameter clamped to [1, maximum]; 400 if malformed."""
+    value = request.query.get(name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise web.HTTPBadRequest(text=f"{name} must be an integer")
+    return min(max(number, 1), maximum)
+
+
+async def cached_json(request: web.Request, key: str, ttl: float,
+                      producer: Callable[[], Awaitable[Any]]) -> web.Response:
+    """
+    Serve a cached JSON body, answering 304 when the client's ETag matches.
+    The key holds the validated parameters, so unrelated query strings share an entry.
+    """
+    cache: ResponseCache = request.app['cache']
+    body, etag = await cache.get(key, ttl, producer)
+    headers = {'ETag': etag, 'Cache-Control': f'max-age={int(ttl)}'}
+    if request.headers.get('If-None-Match') == etag:
+        return web.Response(status=304, headers=headers)
+    return web.Response(body=body, content_type='application/json', headers=headers)
+
+
+@routes.get('/')
+async def index(request: web.Request) -> web.Response:
+    """Main dashboard page."""
+    return web.Response(text=DASHBOARD_TEMPLATE, content_type='text/html')
+
+
+@routes.get('/api/stats')
+async def api_stats(request: web.Request) -> web.Response:
+    """API endpoint for performance statistics."""
+    return await cached_json(request, 'stats', STATS_TTL, request.app['data'].get_performance_stats)
+
+
+@routes.get('/api/stats/breakdown')
+async def api_stats_breakdown(request: web.Request) -> web.Response:
+    """API endpoint for statistics per color, opponent, time control and window."""
+    return await cached_json(request, 'stats/breakdown', STATS_TTL,
+                             request.app['db'].get_statistics_breakdown)
+
+
+@routes.get('/api/recent-games')
+async def api_recent_games(request: web.Request) -> web.Response:
+    """API endpoint for recent games."""
+    limit = int_param(request, 'limit', 10, 100)
+    return await cached_json(request, f'recent-games?limit={limit}', RECENT_GAMES_TTL,
+                             lambda: request.app['data'].get_recent_games(limit))
+
+
+@routes.get('/api/timeseries')
+async def api_timeseries(request: web.Request) -> web.Response:
+    """API endpoint for the per-day or per-hour performance series."""
+    granularity = request.query.get('bucket', 'day')
+    if granularity not in ('day', 'hour'):
+        raise web.HTTPBadRequest(text="bucket must be 'day' or 'hour'")
+    points = int_param(request, 'points', 30, 1000)
+    return await cached_json(request, f'timeseries?bucket={granularity}&points={points}', TIMESERIES_TTL,
+                             lambda: request.app['data'].get_performance_series(granularity, points))
+
+
+def format_event(event: Tuple[int, str, str]) -> bytes:
+    """Serialize an (id, type, payload) event as a server-sent event."""
+    event_id, event_type, payload = event
+    return f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n".encode()
+
+
+@routes.get('/api/events')
+async def api_events(request: web.Request) -> web.StreamResponse:
+    """Server-sent events stream of game starts, moves, game ends and stats deltas."""
+    broadcaster: EventBroadcaster = request.app['events']
+    queue = broadcaster.subscribe()
     
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+    })
+    await response.prepare(request)
+    
+    last_sent = 0
     try:
+        # Replay what a reconnecting browser missed
+        last_id = request.headers.get('Last-Event-ID')
+        if last_id and last_id.isdigit():
+            last_sent = int(last_id)
+            while True:
+                missed = await request.app['db'].get_events_since(last_sent, REPLAY_BATCH)
+                for event in missed:
+                    await response.write(format_event(event))
+                    last_sent = event[0]
+                if len(missed) < REPLAY_BATCH:
+                    break
+        
         while True:
-            await asyncio.sleep(1)
-    except KeyboardInterrupt:
-        logger.info("🛑 Dashboard stopping...")
-        if db_manager:
-            await db_manager.close()
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=15)
+            except asyncio.TimeoutError:
+                await response.write(b": keepalive\n\n")
+                continue
+            if event is None:
+                break
+            # The queue fills from subscribe() on, so it can repeat replayed events
+            if event[0] <= last_sent:
+                continue
+            await response.write(format_event(event))
+            last_sent = event[0]
+    except (ConnectionResetError, asyncio.CancelledError):
+        pass
+    finally:
+        broadcaster.unsubscribe(queue)
+    return response
+
+
+async def init_dashboard(app: web.Application):
+    """Initialize dashboard components."""
+    logger.info("Initializing dashboard...")
+    
+    # Read-only: the bot owns the schema, migrations and all writes
+    db_manager = DatabaseManager()
+    await db_manager.initialize_read_only()
+    
+    app['db'] = db_manager
+    app['data'] = DashboardData(db_manager)
+    app['cache'] = ResponseCache()
+    app['events'] = EventBroadcaster(db_manager, app['cache'])
+    await app['events'].start()
+    
+    logger.info("Dashboard initialized")
+
+
+async def close_dashboard(app: web.Application):
+    """Release dashboard resources."""
+    logger.info("🛑 Dashboard stopping...")
+    await app['events'].stop()
+    await app['db'].close()
+
+
+def create_app() -> web.Application:
+    """Build the dashboard application."""
+    app = web.Application()
+    app.add_routes(routes)
+    app.on_startup.append(init_dashboard)
+    app.on_cleanup.append(close_dashboard)
+    return app
+
+
+def main():
+    """Main dashboard function."""
+    logger.info("📈 Starting Chess Bot Dashboard")
+    logger.info("=" * 40)
+    
+    port = int(os.getenv('DASHBOARD_PORT', '5000'))
+    logger.info(f"🌐 Dashboard available at http://localhost:{port}")
+    logger.info("Press Ctrl+C to stop")
+    web.run_app(create_app(), host='0.0.0.0', port=port, print=None)
 
 
 if __name__ == "__main__":
@@ -320,8 +550,7 @@ if __name__ == "__main__":
     
     # Create necessary directories
     Path("data/logs").mkdir(parents=True, exist_ok=True)
-    Path("static").mkdir(exist_ok=True)
     
     # Run dashboard
-    asyncio.run(main())
+    main()
 
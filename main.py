@@ -16,6 +16,8 @@ from src.database.db_manager import DatabaseManager
 from src.learning.model_manager import ModelManager
 from src.engine.stockfish_engine import StockfishEngine
 from src.analysis.game_analyzer import GameAnalyzer
+from src.metrics import MetricsServer
+from src.profiler import SamplingProfiler
 
 
 class ChessLearningBot:
@@ -27,6 +29,8 @@ class ChessLearningBot:
         self.model_manager = None
         self.engine = None
         self.analyzer = None
+        self.metrics_server = None
+        self.profiler = SamplingProfiler()
         self.running = False
         
     async def initialize(self):
@@ -64,6 +68,10 @@ class ChessLearningBot:
             await self.bot.initialize()
             logger.info("✅ SophieBot initialized")
             
+            # Expose latency histograms and counters for Prometheus
+            self.metrics_server = MetricsServer(profiler=self.profiler)
+            await self.metrics_server.start()
+            
             logger.success("🎯 All components initialized successfully!")
             
         except Exception as e:
@@ -89,6 +97,10 @@ class ChessLearningBot:
         logger.info("🛑 Shutting down Chess Learning Bot...")
         self.running = False
         
+        if self.profiler.running:
+            self.profiler.stop()
+        if self.metrics_server:
+            await self.metrics_server.stop()
         if self.bot:
             await self.bot.shutdown()
         if self.engine:
@@ -105,8 +117,14 @@ def setup_signal_handlers(bot_instance):
         logger.info(f"Received signal {signum}")
         asyncio.create_task(bot_instance.shutdown())
     
+    def profile_handler(signum, frame):
+        # SIGUSR1 starts the sampling profiler; the next one stops it and writes data/logs/profile-*
+        bot_instance.profiler.toggle()
+    
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, profile_handler)
 
 
 async def main():
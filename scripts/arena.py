@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Arena - Gate a checkpoint with an SPRT match before it goes live
+
+Plays game pairs on all cores between checkpoint A and checkpoint B (or
+Stockfish at a fixed node count) from an openings file plus a few random
+plies, until the SPRT decides or no new start position is left. Exits
+with 0 when A is accepted as stronger, 1 otherwise.
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.config import get_section
+from src.engine.arena import SPRT, Arena, load_openings
+
+
+def main():
+    settings = get_section('arena')
+    parser = argparse.ArgumentParser(description="Offline checkpoint match with SPRT")
+    parser.add_argument("a", help="candidate checkpoint (.pth)")
+    parser.add_argument("b", help="reference checkpoint (.pth) or 'stockfish'")
+    parser.add_argument("--nodes", type=int, default=settings.get('mcts_nodes', 200),
+                        help="MCTS playouts per move for checkpoints")
+    parser.add_argument("--stockfish-nodes", type=int, default=settings.get('stockfish_nodes', 1000))
+    parser.add_argument("--stockfish-path", default=os.getenv('STOCKFISH_PATH', 'stockfish'))
+    parser.add_argument("--openings", default=settings.get('openings'),
+                        help="openings as PGN or one FEN/EPD per line")
+    parser.add_argument("--random-plies", type=int, default=settings.get('random_plies', 4),
+                        help="random moves played after each opening")
+    parser.add_argument("--temperature-plies", type=int, default=settings.get('temperature_plies', 8),
+                        help="plies in which checkpoints sample moves by visit count")
+    parser.add_argument("--workers", type=int, default=settings.get('workers') or None)
+    parser.add_argument("--max-games", type=int, default=settings.get('max_games', 10000))
+    parser.add_argument("--max-plies", type=int, default=settings.get('max_plies', 400))
+    parser.add_argument("--elo0", type=float, default=settings.get('elo0', 0.0))
+    parser.add_argument("--elo1", type=float, default=settings.get('elo1', 10.0))
+    parser.add_argument("--alpha", type=float, default=settings.get('alpha', 0.05))
+    parser.add_argument("--beta", type=float, default=settings.get('beta', 0.05))
+    args = parser.parse_args()
+
+    player_a = {'kind': 'model', 'path': args.a, 'nodes': args.nodes,
+                'temperature_plies': args.temperature_plies}
+    if args.b == 'stockfish':
+        player_b = {'kind': 'stockfish', 'path': args.stockfish_path, 'nodes': args.stockfish_nodes}
+    else:
+        player_b = {'kind': 'model', 'path': args.b, 'nodes': args.nodes,
+                    'temperature_plies': args.temperature_plies}
+
+    arena = Arena(player_a, player_b, load_openings(args.openings), workers=args.workers,
+                  max_pairs=max(1, args.max_games // 2), max_plies=args.max_plies,
+                  sprt=SPRT(args.elo0, args.elo1, args.alpha, args.beta), random_plies=args.random_plies)
+    summary = arena.run()
+
+    verdict = {
+        'H1': f"A é mais forte (>= {args.elo1:+g} Elo)",
+        'H0': f"A não é mais forte (<= {args.elo0:+g} Elo)",
+        None: ("inconclusivo (sem novas posições iniciais)" if summary['openings_exhausted']
+               else "inconclusivo (limite de jogos atingido)"),
+    }[summary['status']]
+    print(f"{2 * summary['pairs']} jogos: +{summary['wins']} ={summary['draws']} -{summary['losses']} "
+          f"(pares {summary['pentanomial']})")
+    print(f"Elo {summary['elo']:+.1f} ±{summary['elo_margin']:.1f}, LLR {summary['llr']:.2f} "
+          f"[{summary['bounds'][0]:.2f}, {summary['bounds'][1]:.2f}] em {summary['seconds']:.0f}s")
+    print(f"Resultado: {verdict}")
+    sys.exit(0 if summary['status'] == 'H1' else 1)
+
+
+if __name__ == "__main__":
+    main()
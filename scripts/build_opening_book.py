@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Build Opening Book - Compile our PGN corpus into a Polyglot book
+
+Reads every PGN in the given directory and writes a sorted Polyglot .bin
+file that the bot serves through memory-mapped binary search.
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.config import get_section
+from src.engine.opening_book import OpeningBookBuilder
+
+
+def main():
+    settings = get_section('opening_book')
+    # OPENING_BOOK_PATH may list several books; the first one is written
+    book_path = os.getenv('OPENING_BOOK_PATH') or settings.get('path', 'data/books/sophie.bin')
+    parser = argparse.ArgumentParser(description="Build a Polyglot opening book from PGN files")
+    parser.add_argument("--pgn-dir", default=os.path.join("data", "processed"))
+    parser.add_argument("--output", default=book_path.split(os.pathsep)[0])
+    parser.add_argument("--max-ply", type=int, default=settings.get('max_ply', 24))
+    parser.add_argument("--min-games", type=int, default=settings.get('min_games', 2))
+    parser.add_argument("--min-elo", type=int, default=0)
+    args = parser.parse_args()
+
+    builder = OpeningBookBuilder(max_ply=args.max_ply, min_games=args.min_games)
+    for fname in sorted(os.listdir(args.pgn_dir)):
+        if fname.endswith(".pgn"):
+            builder.add_pgn(os.path.join(args.pgn_dir, fname), min_elo=args.min_elo)
+
+    entries = builder.write(args.output)
+    print(f"{builder.games_added} jogos -> {entries} entradas em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
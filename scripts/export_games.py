@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Export Games - Incremental columnar export of the games database
+
+Writes new games and per-ply positions to data/exports as date-partitioned
+Parquet (default) or Arrow IPC files.
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.database.db_manager import DatabaseManager
+from src.database.exporter import GameExporter
+
+
+async def main(args):
+    db_manager = DatabaseManager()
+    await db_manager.initialize()
+    try:
+        exporter = GameExporter(db_manager, output_dir=args.output_dir, fmt=args.format)
+        totals = await exporter.export()
+        print(f"Exportados {totals['games']} jogos e {totals['positions']} posições")
+    finally:
+        await db_manager.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export games and positions to Parquet/Arrow")
+    parser.add_argument("--output-dir", default=None)
+    parser.add_argument("--format", choices=["parquet", "arrow"], default="parquet")
+    asyncio.run(main(parser.parse_args()))
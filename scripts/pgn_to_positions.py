@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+PGN to Positions - Turn filtered games into supervised training shards
+
+Replays every game in data/processed/ (plain or compressed PGN) on all
+cores and writes positions labeled with the played move and the game
+result to deduplicated .bin shards in data/positions/.
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.learning.pgn_corpus import PGN_SUFFIXES, iter_game_batches, map_ordered
+from src.learning.position_codec import ShardWriter, games_to_positions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Encode PGN games into training position shards")
+    parser.add_argument("--pgn-dir", default=os.path.join("data", "processed"))
+    parser.add_argument("--output-dir", default=os.path.join("data", "positions"))
+    parser.add_argument("--shard-size", type=int, default=1_000_000)
+    parser.add_argument("--min-ply", type=int, default=0,
+                        help="skip the first plies of each game (book moves)")
+    parser.add_argument("--max-games", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    workers = args.workers or os.cpu_count()
+    writer = ShardWriter(args.output_dir, shard_size=args.shard_size)
+    encode = partial(games_to_positions, min_ply=args.min_ply)
+    start = time.time()
+    games = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for fname in sorted(os.listdir(args.pgn_dir)):
+            if not fname.endswith(PGN_SUFFIXES):
+                continue
+            counts = {'total': 0, 'accepted': 0}
+            batches = iter_game_batches(os.path.join(args.pgn_dir, fname), max_games=args.max_games,
+                                        batch_size=500, counts=counts)
+            for records in map_ordered(executor, ((encode, batch) for batch in batches), 2 * workers):
+                writer.add(records)
+            games += counts['accepted']
+            print(f"{fname}: {counts['accepted']} jogos")
+    writer.close()
+
+    elapsed = time.time() - start
+    positions = writer.written + writer.duplicates
+    print(f"{games} jogos, {positions} posições ({writer.written} únicas) em {elapsed:.1f}s "
+          f"({positions / max(elapsed, 1e-9):.0f} posições/s)")
+
+
+if __name__ == "__main__":
+    main()
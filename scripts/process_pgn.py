@@ -1,53 +1,48 @@
+#!/usr/bin/env python3
+"""
+Process PGN - Filter large PGN files by rating
+
+Indexes each file in data/pgn/ with a single scan, filters games on their
+headers and parses only the accepted ones on all cores. Compressed Lichess
+dumps (.pgn.zst, .pgn.bz2) are streamed without decompressing to disk.
+"""
+
+import argparse
 import os
-import chess.pgn
-from tqdm import tqdm
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.learning.pgn_corpus import PGN_SUFFIXES, process_pgn
 
 DATA_DIR = "data"
 PGN_DIR = os.path.join(DATA_DIR, "pgn")
 PROCESSED_DIR = os.path.join(DATA_DIR, "processed")
 
-os.makedirs(PGN_DIR, exist_ok=True)
-os.makedirs(PROCESSED_DIR, exist_ok=True)
-
-def count_games_in_pgn(pgn_path):
-    count = 0
-    with open(pgn_path, encoding="utf-8", errors="ignore") as pgn:
-        while True:
-            game = chess.pgn.read_game(pgn)
-            if game is None:
-                break
-            count += 1
-    return count
-
-def process_pgn(pgn_path, output_path, min_elo=0, max_games=None):
-    """
-    Processa um arquivo PGN gigante, filtrando por rating mínimo e salvando jogos válidos em outro arquivo.
-    """
-    with open(pgn_path, encoding="utf-8", errors="ignore") as pgn, open(output_path, "w", encoding="utf-8") as out:
-        processed = 0
-        for game in tqdm(iter(lambda: chess.pgn.read_game(pgn), None), desc=f"Processando {os.path.basename(pgn_path)}"):
-            try:
-                white_elo = int(game.headers.get("WhiteElo", 0))
-                black_elo = int(game.headers.get("BlackElo", 0))
-                if white_elo < min_elo or black_elo < min_elo:
-                    continue
-                out.write(str(game) + "\n\n")
-                processed += 1
-                if max_games and processed >= max_games:
-                    break
-            except Exception:
-                continue
-    print(f"Salvo {processed} jogos em {output_path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Filter PGN files by minimum rating")
+    parser.add_argument("--pgn-dir", default=PGN_DIR)
+    parser.add_argument("--output-dir", default=PROCESSED_DIR)
+    parser.add_argument("--min-elo", type=int, default=1500)
+    parser.add_argument("--max-games", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--parallel-decompress", action="store_true",
+                        help="use lbzip2/pbzip2/pzstd when installed")
+    args = parser.parse_args()
+
+    os.makedirs(args.pgn_dir, exist_ok=True)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    for fname in sorted(os.listdir(args.pgn_dir)):
+        if fname.endswith(PGN_SUFFIXES):
+            pgn_path = os.path.join(args.pgn_dir, fname)
+            stem = fname[:fname.index(".pgn")]
+            output_path = os.path.join(args.output_dir, f"filtered_{stem}.pgn")
+            process_pgn(pgn_path, output_path, min_elo=args.min_elo, max_games=args.max_games,
+                        workers=args.workers, parallel_decompress=args.parallel_decompress)
+
 
 if __name__ == "__main__":
-    # Exemplo de uso: processar todos os PGNs em data/pgn/
-    min_elo = 1500  # ajuste conforme desejar
-    max_games = None  # ou defina um limite
-    for fname in os.listdir(PGN_DIR):
-        if fname.endswith(".pgn"):
-            pgn_path = os.path.join(PGN_DIR, fname)
-            output_path = os.path.join(PROCESSED_DIR, f"filtered_{fname}")
-            print(f"Contando jogos em {fname}...")
-            total = count_games_in_pgn(pgn_path)
-            print(f"Total de jogos: {total}")
-            process_pgn(pgn_path, output_path, min_elo=min_elo, max_games=max_games)
+    main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Self Play - Train the model offline from games against itself
+
+Starts MCTS actor processes and a learner that trains on their games and
+publishes new weights, then saves the final model.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.learning.self_play import SelfPlayLearner
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Self-play reinforcement learning")
+    parser.add_argument("--actors", type=int, default=None)
+    parser.add_argument("--nodes", type=int, default=None, help="MCTS playouts per move")
+    parser.add_argument("--games", type=int, default=None)
+    parser.add_argument("--hours", type=float, default=None)
+    parser.add_argument("--initial-model", default=None)
+    parser.add_argument("--output", default="models/chess_model_selfplay.pth")
+    args = parser.parse_args()
+
+    if args.games is None and args.hours is None:
+        parser.error("set --games or --hours")
+
+    learner = SelfPlayLearner(initial_model=args.initial_model, actors=args.actors,
+                              mcts_nodes=args.nodes)
+    stats = learner.run(max_games=args.games, max_hours=args.hours, save_path=args.output)
+    print(f"{stats['games']} jogos, {stats['positions']} posições, "
+          f"{stats['games_per_hour_per_core']:.1f} jogos/hora/núcleo")
+
+
+if __name__ == "__main__":
+    main()
@@ -56,8 +56,7 @@ def check_dependencies():
         'aiosqlite',
         'matplotlib',
         'seaborn',
-        'pandas',
-        'flask'
+        'pandas'
     ]
     
     missing_packages = []
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Sweep - Search learning hyperparameters with successive halving
+
+Trains sampled configurations in parallel on a position shard directory
+(scripts/pgn_to_positions.py) and reports the best one. Every trial is
+recorded in data/sweeps/sweeps.db.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import yaml
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.learning.sweep import SweepRunner
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hyperparameter sweep for the learning config")
+    parser.add_argument("data", help="position shard directory or .bin file")
+    parser.add_argument("--space", default=None,
+                        help="YAML file with the search space (default: learning.sweep.space)")
+    parser.add_argument("--trials", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--min-epochs", type=int, default=None)
+    parser.add_argument("--max-epochs", type=int, default=None)
+    parser.add_argument("--eta", type=int, default=None)
+    parser.add_argument("--train-positions", type=int, default=None, help="positions per epoch")
+    parser.add_argument("--db", default=None)
+    parser.add_argument("--name", default=None)
+    args = parser.parse_args()
+
+    space = None
+    if args.space:
+        with open(args.space, encoding='utf-8') as f:
+            space = yaml.safe_load(f)
+
+    runner = SweepRunner(args.data, db_path=args.db, space=space, trials=args.trials,
+                         workers=args.workers, min_epochs=args.min_epochs,
+                         max_epochs=args.max_epochs, eta=args.eta,
+                         train_positions=args.train_positions)
+    best = runner.run(name=args.name)
+    print(f"Melhor configuração (sweep {best['sweep_id']}, trial {best['trial_id']}): {best['params']}")
+    print(f"Perda de validação: {best['val_loss']:.4f} - modelo em {best['checkpoint']}")
+    print(f"{best['epochs_run']} épocas treinadas de {best['full_budget']} sem parada antecipada")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,13 +5,16 @@ Main chess bot that handles game logic, move generation, and learning.
 """
 
 import asyncio
+import os
 import chess
 import chess.pgn
 from typing import Optional, Dict, Any
 from loguru import logger
 from datetime import datetime
 
+from .. import metrics
 from ..engine.stockfish_engine import StockfishEngine
+from ..engine.opening_book import OpeningBook
 from ..learning.model_manager import ModelManager
 from ..database.db_manager import DatabaseManager
 from ..analysis.game_analyzer import GameAnalyzer
@@ -27,7 +30,13 @@ class SophieBot:
         self.model_manager = model_manager
         self.engine = engine
         self.analyzer = analyzer
+        self.opening_book = OpeningBook()
         self.client = None
+        # 'engine': Stockfish decides (model moves are checked against it),
+        # 'search': the model-driven alpha-beta search plays on its own,
+        # 'mcts': MCTS over the model, reusing its tree across the game
+        self.move_source = os.getenv('MOVE_SOURCE', 'engine')
+        self.move_time = float(os.getenv('MOVE_TIME', '1.0'))
         
         self.current_game = None
         self.games_played = 0
@@ -43,6 +52,10 @@ class SophieBot:
         self.client = LichessClient()
         await self.client.initialize()
         
+        # Load local opening books
+        self.opening_book.open()
+        metrics.register_collector('opening_book', self._book_metrics)
+        
         # Load bot statistics
         await self._load_statistics()
         
@@ -74,8 +87,10 @@ class SophieBot:
         color = game_info['color']  # 'white' or 'black'
         
         logger.info(f"🎮 Starting game {game_id} vs {opponent} as {color}")
+        await self._publish('game_start', {'game_id': game_id, 'opponent': opponent, 'color': color})
         
         board = chess.Board()
+        self.model_manager.new_game()
         moves_history = []
         move_times = []
         evaluations = []
@@ -93,7 +108,8 @@ class SophieBot:
                     move_start_time = datetime.now()
                     
                     # Get move from our model
-                    move = await self._get_best_move(board)
+                    with metrics.span('sophie_move_stage_seconds', stage='think'):
+                        move = await self._get_best_move(board)
                     
                     move_time = (datetime.now() - move_start_time).total_seconds()
                     move_times.append(move_time)
@@ -103,17 +119,24 @@ class SophieBot:
                     moves_history.append(move.uci())
                     
                     # Get evaluation for learning
-                    evaluation = await self.engine.evaluate_position(board)
+                    with metrics.span('sophie_move_stage_seconds', stage='evaluate'):
+                        evaluation = await self.engine.evaluate_position(board)
                     evaluations.append(evaluation)
                     
                     # Send move to Lichess
-                    await self.client.make_move(game_id, move.uci())
+                    with metrics.span('sophie_move_stage_seconds', stage='submit'):
+                        await self.client.make_move(game_id, move.uci())
                     
                     logger.info(f"Made move: {move} (eval: {evaluation}) in {move_time:.2f}s")
+                    await self._publish('move', {
+                        'game_id': game_id, 'ply': len(board.move_stack), 'uci': move.uci(),
+                        'evaluation': evaluation, 'move_time': move_time, 'side': 'bot'
+                    })
                     
                 else:
                     # Opponent's turn - wait for their move
-                    opponent_move = await self.client.wait_for_opponent_move(game_id)
+                    with metrics.span('sophie_move_stage_seconds', stage='opponent_wait'):
+                        opponent_move = await self.client.wait_for_opponent_move(game_id)
                     if opponent_move:
                         try:
                             move = chess.Move.from_uci(opponent_move)
@@ -121,10 +144,15 @@ class SophieBot:
                             moves_history.append(opponent_move)
                             
                             # Evaluate opponent's move for learning
-                            evaluation = await self.engine.evaluate_position(board)
+                            with metrics.span('sophie_move_stage_seconds', stage='evaluate'):
+                                evaluation = await self.engine.evaluate_position(board)
                             evaluations.append(evaluation)
                             
                             logger.info(f"Opponent played: {move} (eval: {evaluation})")
+                            await self._publish('move', {
+                                'game_id': game_id, 'ply': len(board.move_stack), 'uci': opponent_move,
+                                'evaluation': evaluation, 'move_time': None, 'side': 'opponent'
+                            })
                         except ValueError:
                             logger.error(f"Invalid move from opponent: {opponent_move}")
                             break
@@ -136,6 +164,8 @@ class SophieBot:
                 'opponent': opponent,
                 'color': color,
                 'result': result,
+                'time_control': game_info.get('time_control'),
+                'played_at': game_start_time.isoformat(timespec='seconds'),
                 'moves': moves_history,
                 'move_times': move_times,
                 'evaluations': evaluations,
@@ -149,8 +179,36 @@ class SophieBot:
     async def _get_best_move(self, board: chess.Board) -> chess.Move:
         """Get the best move for the current position."""
         try:
-            # First, try to get move from our trained model
-            if self.model_manager.is_model_ready():
+            # Book moves cost no engine time
+            book_move = self.opening_book.get_move(board)
+            if book_move is not None:
+                logger.debug(f"Using book move: {book_move}")
+                metrics.inc('sophie_moves_total', source='book')
+                return book_move
+            
+            # Endgames within tablebase range are played perfectly
+            tablebase_move = self.engine.get_tablebase_move(board)
+            if tablebase_move is not None:
+                logger.debug(f"Using tablebase move: {tablebase_move}")
+                metrics.inc('sophie_moves_total', source='tablebase')
+                return tablebase_move
+            
+            if self.move_source == 'search':
+                search_move = await self.model_manager.search_move(board, time_limit=self.move_time)
+                if search_move is not None:
+                    logger.debug(f"Using search move: {search_move}")
+                    metrics.inc('sophie_moves_total', source='search')
+                    return search_move
+            
+            elif self.move_source == 'mcts':
+                mcts_move = await self.model_manager.mcts_move(board, time_limit=self.move_time)
+                if mcts_move is not None:
+                    logger.debug(f"Using MCTS move: {mcts_move}")
+                    metrics.inc('sophie_moves_total', source='mcts')
+                    return mcts_move
+            
+            elif self.model_manager.is_model_ready():
+                # Then, try to get move from our trained model
                 model_move = await self.model_manager.predict_move(board)
                 if model_move and model_move in board.legal_moves:
                     # Validate move with engine
@@ -161,22 +219,26 @@ class SophieBot:
                     # Use model move if it's not too much worse than engine
                     if model_eval - engine_eval > -100:  # within 1 pawn
                         logger.debug(f"Using model move: {model_move}")
+                        metrics.inc('sophie_moves_total', source='model')
                         return model_move
             
             # Fallback to engine move
-            engine_move = await self.engine.get_best_move(board, time_limit=1.0)
+            engine_move = await self.engine.get_best_move(board, time_limit=self.move_time)
             if engine_move is not None:
                 logger.debug(f"Using engine move: {engine_move}")
+                metrics.inc('sophie_moves_total', source='engine')
                 return engine_move
             else:
                 logger.error("Engine did not return a valid move. Choosing random legal move.")
                 import random
+                metrics.inc('sophie_moves_total', source='random')
                 return random.choice(list(board.legal_moves))
         
         except Exception as e:
             logger.error(f"Error getting best move: {e}")
             # Last resort - random legal move
             import random
+            metrics.inc('sophie_moves_total', source='random')
             return random.choice(list(board.legal_moves))
     
     async def _process_finished_game(self, game_data: Dict[str, Any]):
@@ -185,6 +247,7 @@ class SophieBot:
         
         # Update statistics
         self.games_played += 1
+        metrics.inc('sophie_games_total', result=game_data['result'])
         if game_data['result'] == 'win':
             self.wins += 1
         elif game_data['result'] == 'loss':
@@ -195,6 +258,25 @@ class SophieBot:
         # Save game to database
         await self.db_manager.save_game(game_data)
         
+        # Notify live dashboards
+        result = game_data['result']
+        await self._publish('game_end', {
+            'game_id': game_data['game_id'],
+            'opponent': game_data['opponent'],
+            'result': result,
+            'color': game_data['color'],
+            'duration': game_data['duration'],
+            'date': game_data.get('played_at'),
+        })
+        await self._publish('stats', {
+            'delta': {
+                'games_played': 1,
+                'wins': int(result == 'win'),
+                'losses': int(result == 'loss'),
+                'draws': int(result == 'draw'),
+            }
+        })
+        
         # Analyze game for mistakes
         analysis = await self.analyzer.analyze_game(game_data)
         
@@ -208,6 +290,13 @@ class SophieBot:
         logger.info(f"📊 Games: {self.games_played}, Win rate: {win_rate:.1%}, "
                    f"Mistakes this game: {analysis.get('mistakes', 0)}")
     
+    async def _publish(self, event_type: str, payload: Dict[str, Any]):
+        """Publish a live event for the dashboard without ever interrupting play."""
+        try:
+            await self.db_manager.publish_event(event_type, payload)
+        except Exception as e:
+            logger.warning(f"Failed to publish {event_type} event: {e}")
+    
     def _get_game_result(self, board: chess.Board, our_color: str) -> str:
         """Determine the game result from our perspective."""
         if board.is_checkmate():
@@ -251,6 +340,13 @@ class SophieBot:
         else:
             return '*'
     
+    def _book_metrics(self):
+        """Opening book counters for the metrics endpoint."""
+        return [
+            ('sophie_book_lookups_total', 'counter', {}, self.opening_book.lookups),
+            ('sophie_book_hits_total', 'counter', {}, self.opening_book.hits),
+        ]
+    
     async def _load_statistics(self):
         """Load bot statistics from database."""
         stats = await self.db_manager.get_bot_statistics()
@@ -269,6 +365,7 @@ class SophieBot:
     async def shutdown(self):
         """Shutdown the chess bot."""
         logger.info("Shutting down SophieBot...")
+        self.opening_book.close()
         if self.client:
             await self.client.close()
 
@@ -7,10 +7,13 @@ Handles authentication, game finding, and move communication with Lichess.
 import asyncio
 import aiohttp
 import os
+import time
 from typing import Optional, Dict, Any, List
 from loguru import logger
 from dotenv import load_dotenv
 
+from .. import metrics
+
 load_dotenv('.env.local')
 
 class LichessClient:
@@ -145,14 +148,18 @@ class LichessClient:
         """
         try:
             url = f"{self.base_url}/board/game/{game_id}/move/{move_uci}"
-            async with self.session.post(url) as resp:
-                if resp.status == 200:
-                    logger.info(f"Lance {move_uci} enviado com sucesso para o jogo {game_id}")
-                    return True
-                else:
-                    logger.error(f"Erro ao enviar lance {move_uci} para o jogo {game_id}: status {resp.status}")
-                    return False
+            with metrics.span('sophie_lichess_request_seconds', endpoint='move'):
+                async with self.session.post(url) as resp:
+                    status = resp.status
+            if status == 200:
+                logger.info(f"Lance {move_uci} enviado com sucesso para o jogo {game_id}")
+                return True
+            else:
+                metrics.inc('sophie_lichess_errors_total', endpoint='move')
+                logger.error(f"Erro ao enviar lance {move_uci} para o jogo {game_id}: status {status}")
+                return False
         except Exception as e:
+            metrics.inc('sophie_lichess_errors_total', endpoint='move')
             logger.error(f"Error making move: {e}")
             return False
 
@@ -165,7 +172,11 @@ class LichessClient:
             url = f"{self.base_url}/board/game/stream/{game_id}"
             timeout = 0
             while timeout < max_wait:
+                request_start = time.perf_counter()
                 async with self.session.get(url) as resp:
+                    # Time to the response headers; the wait for the move itself is the bot's opponent_wait
+                    metrics.observe('sophie_lichess_request_seconds', time.perf_counter() - request_start,
+                                    endpoint='stream')
                     if resp.status == 200:
                         async for line in resp.content:
                             if not line:
@@ -183,11 +194,14 @@ class LichessClient:
                                         return moves_list[-1]
                             except Exception:
                                 continue
+                    else:
+                        metrics.inc('sophie_lichess_errors_total', endpoint='stream')
                 await asyncio.sleep(2)
                 timeout += 2
             logger.warning(f"Timeout esperando lance do oponente no jogo {game_id}")
             return None
         except Exception as e:
+            metrics.inc('sophie_lichess_errors_total', endpoint='stream')
             logger.error(f"Error waiting for opponent move: {e}")
             return None
 
@@ -1,53 +1,206 @@
-import requests
-import chess
-import chess.pgn
+"""
+Online Opening Explorer - Async cached client for the Lichess opening explorer
+
+Queries explorer.lichess.ovh through a shared aiohttp session, with a
+bounded in-memory LRU in front of an SQLite cache keyed by normalized FEN.
+Both layers expire entries after `ttl` seconds.
+"""
+
+import asyncio
+import json
+import os
 import time
-from typing import List
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+import aiosqlite
+import chess
+from loguru import logger
+
+LICHESS_EXPLORER_API = "https://explorer.lichess.ovh/lichess"
 
-# Exemplo de uso com ChessBase Online Database
-CHESSBASE_API = "https://database.chessbase.com/"
 
-# Para Lichess, use: https://explorer.lichess.ovh/lichess?fen=<FEN>
+def normalize_fen(fen: str) -> str:
+    """Reduce a FEN to its position part (no clocks, en passant only if legal)."""
+    return chess.Board(fen).epd()
+
 
 class OnlineOpeningExplorer:
-    def __init__(self, api_url: str = CHESSBASE_API):
+    """Async client for the online opening explorer with memory and disk caches."""
+
+    def __init__(self, api_url: str = LICHESS_EXPLORER_API, cache_path: Optional[str] = None,
+                 cache_size: int = 4096, ttl: float = 7 * 24 * 3600):
         self.api_url = api_url.rstrip('/')
+        self.cache_path = cache_path or os.getenv('EXPLORER_CACHE_PATH', 'data/explorer_cache.db')
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self.session = None
+        self.cache_db = None
+        # FEN -> (moves, fetched_at)
+        self.memory: "OrderedDict[str, Tuple[List[str], float]]" = OrderedDict()
+        self.inflight: Dict[str, asyncio.Future] = {}
+        self.prefetches = set()
 
-    def get_moves(self, fen: str) -> List[str]:
-        """
-        Consulta a API online e retorna os lances possíveis a partir da FEN.
-        Para ChessBase, a API pública não é documentada, então este é um exemplo genérico.
-        Para Lichess, troque a URL e o parsing.
-        """
-        # Exemplo para Lichess (troque a URL se quiser usar Lichess):
-        url = f"https://explorer.lichess.ovh/lichess?fen={fen}"
-        resp = requests.get(url)
-        if resp.status_code != 200:
+        self.requests = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.coalesced = 0
+
+    async def initialize(self):
+        """Open the shared HTTP session and the disk cache."""
+        self.session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=10),
+            headers={'User-Agent': 'SophieBot/1.0'}
+        )
+        Path(self.cache_path).parent.mkdir(parents=True, exist_ok=True)
+        self.cache_db = await aiosqlite.connect(self.cache_path)
+        await self.cache_db.execute('''
+            CREATE TABLE IF NOT EXISTS explorer_cache (
+                fen TEXT PRIMARY KEY,
+                moves TEXT,
+                fetched_at REAL
+            )
+        ''')
+        await self.cache_db.commit()
+        logger.info(f"Opening explorer ready (cache: {self.cache_path})")
+
+    async def get_moves(self, fen: str) -> List[str]:
+        """Return the explorer moves for a position, most popular first."""
+        key = normalize_fen(fen)
+
+        entry = self.memory.get(key)
+        if entry is not None:
+            moves, fetched_at = entry
+            if time.time() - fetched_at < self.ttl:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                return moves
+            del self.memory[key]
+
+        # Identical concurrent requests share one lookup
+        future = self.inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._load(key))
+            self.inflight[key] = future
+            future.add_done_callback(lambda _: self.inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+
+    async def _load(self, key: str) -> List[str]:
+        """Load a position from the disk cache, falling back to the network."""
+        async with self.cache_db.execute(
+            'SELECT moves, fetched_at FROM explorer_cache WHERE fen = ?', (key,)
+        ) as cursor:
+            row = await cursor.fetchone()
+        if row is not None and time.time() - row[1] < self.ttl:
+            self.disk_hits += 1
+            moves = json.loads(row[0])
+            self._remember(key, moves, row[1])
+            return moves
+
+        moves = await self._fetch(key)
+        if moves is None:
             return []
-        data = resp.json()
-        moves = [move['uci'] for move in data.get('moves', [])]
+
+        fetched_at = time.time()
+        await self.cache_db.execute(
+            'INSERT OR REPLACE INTO explorer_cache (fen, moves, fetched_at) VALUES (?, ?, ?)',
+            (key, json.dumps(moves), fetched_at)
+        )
+        await self.cache_db.commit()
+        self._remember(key, moves, fetched_at)
         return moves
 
-    def find_longest_line(self, board: chess.Board, max_time: float = 5.0) -> List[str]:
+    async def _fetch(self, key: str) -> Optional[List[str]]:
+        """Query the explorer API. Returns None on failure so nothing is cached."""
+        self.requests += 1
+        try:
+            async with self.session.get(self.api_url, params={'fen': f"{key} 0 1"}) as resp:
+                if resp.status != 200:
+                    logger.warning(f"Opening explorer returned status {resp.status}")
+                    return None
+                data = await resp.json()
+                return [move['uci'] for move in data.get('moves', [])]
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"Opening explorer request failed: {e}")
+            return None
+
+    def _remember(self, key: str, moves: List[str], fetched_at: float):
+        """Store a result in the in-memory LRU, keeping its age for the TTL."""
+        self.memory[key] = (moves, fetched_at)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.cache_size:
+            self.memory.popitem(last=False)
+
+    def _prefetch(self, board: chess.Board, moves: List[str]):
+        """Warm the caches for the positions after the given moves."""
+        for uci in moves:
+            child = board.copy(stack=False)
+            child.push_uci(uci)
+            task = asyncio.ensure_future(self.get_moves(child.fen()))
+            self.prefetches.add(task)
+            task.add_done_callback(self.prefetches.discard)
+
+    async def find_longest_line(self, board: chess.Board, max_time: float = 5.0,
+                                prefetch: int = 3) -> List[str]:
         """
-        Busca a linha mais longa possível a partir da posição, consultando a API online, dentro do tempo limite.
+        Follow the most popular explorer moves from the position until the
+        deadline, prefetching the replies to the top candidates at each ply.
         """
-        start = time.time()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_time
         sequence = []
         current_board = board.copy()
-        while time.time() - start < max_time:
-            fen = current_board.fen()
-            moves = self.get_moves(fen)
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                moves = await asyncio.wait_for(self.get_moves(current_board.fen()), remaining)
+            except asyncio.TimeoutError:
+                break
             if not moves:
                 break
+            self._prefetch(current_board, moves[:prefetch])
             move = moves[0]  # Pega o lance mais popular
             sequence.append(move)
             current_board.push_uci(move)
         return sequence
 
-if __name__ == "__main__":
+    def get_cache_stats(self) -> Dict[str, int]:
+        """Return cache and network counters."""
+        return {
+            'requests': self.requests,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'coalesced': self.coalesced,
+            'memory_entries': len(self.memory),
+        }
+
+    async def close(self):
+        """Cancel prefetches and pending lookups, then close the session and disk cache."""
+        for task in list(self.prefetches) + list(self.inflight.values()):
+            task.cancel()
+        if self.session:
+            await self.session.close()
+        if self.cache_db:
+            await self.cache_db.close()
+
+
+async def _demo():
     explorer = OnlineOpeningExplorer()
-    board = chess.Board()  # posição inicial
-    line = explorer.find_longest_line(board, max_time=5.0)
-    print("Linha mais longa encontrada em 5s:")
-    print(line)
+    await explorer.initialize()
+    try:
+        line = await explorer.find_longest_line(chess.Board(), max_time=5.0)
+        print("Linha mais longa encontrada em 5s:")
+        print(line)
+        print(explorer.get_cache_stats())
+    finally:
+        await explorer.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(_demo())
@@ -0,0 +1,30 @@
+"""
+Config - Access to config/config.yaml
+
+Loads the YAML configuration once per process. Environment variables still
+take precedence where a component reads one.
+"""
+
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict
+
+import yaml
+from loguru import logger
+
+
+@lru_cache(maxsize=None)
+def load_config(path: str = '') -> Dict[str, Any]:
+    """Load the YAML config (CONFIG_PATH, default config/config.yaml)."""
+    config_path = Path(path or os.getenv('CONFIG_PATH', 'config/config.yaml'))
+    if not config_path.exists():
+        logger.warning(f"Config file not found: {config_path}")
+        return {}
+    with open(config_path, encoding='utf-8') as f:
+        return yaml.safe_load(f) or {}
+
+
+def get_section(name: str) -> Dict[str, Any]:
+    """Return one top-level section of the config (empty if absent)."""
+    return load_config().get(name) or {}
@@ -4,99 +4,795 @@ Database Manager - Manages the persistence layer
 Handles storing and retrieving game data from the database.
 """
 
+import asyncio
+import itertools
+import json
+import sqlite3
 import aiosqlite
-from typing import Dict, Any
+import chess
+import chess.polyglot
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
 from loguru import logger
 import os
+import time
+
+from .. import metrics
+
+# Events that flush the buffer with them: they must not get ahead of the game rows they report
+FLUSHING_EVENTS = frozenset({'game_end', 'stats'})
+
+# Bumped whenever _migrate learns a new step (stored in PRAGMA user_version)
+SCHEMA_VERSION = 3
+
+GAMES_TABLE = '''
+    CREATE TABLE IF NOT EXISTS games (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        game_id TEXT UNIQUE,
+        opponent TEXT,
+        color TEXT,
+        result TEXT,
+        time_control TEXT,
+        pgn TEXT,
+        duration REAL,
+        played_at TEXT
+    )
+'''
+
+# One row per ply; zobrist is the key of the position before the move
+MOVES_TABLE = '''
+    CREATE TABLE IF NOT EXISTS moves (
+        game_id TEXT NOT NULL REFERENCES games(game_id),
+        ply INTEGER NOT NULL,
+        uci TEXT NOT NULL,
+        evaluation REAL,
+        move_time REAL,
+        zobrist INTEGER,
+        PRIMARY KEY (game_id, ply)
+    ) WITHOUT ROWID
+'''
+
+# Materialized counters, maintained in the same transaction as each save.
+# scope is 'all', 'color', 'opponent', 'time_control' or 'last_<N>'.
+STATS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS bot_stats (
+        scope TEXT NOT NULL,
+        key TEXT NOT NULL,
+        games INTEGER NOT NULL DEFAULT 0,
+        wins INTEGER NOT NULL DEFAULT 0,
+        losses INTEGER NOT NULL DEFAULT 0,
+        draws INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (scope, key)
+    ) WITHOUT ROWID
+'''
+
+# Rolling windows over the most recent N games
+ROLLING_WINDOWS = (10, 50, 100)
+
+GAME_INSERT = '''
+    INSERT INTO games (game_id, opponent, color, result, time_control, pgn, duration, played_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+MOVE_INSERT = '''
+    INSERT INTO moves (game_id, ply, uci, evaluation, move_time, zobrist)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+# Per-day and per-hour performance aggregates behind the dashboard charts.
+# bucket is played_at truncated to 'YYYY-MM-DD' (day) or 'YYYY-MM-DDTHH' (hour).
+PERFORMANCE_TABLE = '''
+    CREATE TABLE IF NOT EXISTS performance_rollup (
+        granularity TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        games INTEGER NOT NULL DEFAULT 0,
+        wins INTEGER NOT NULL DEFAULT 0,
+        losses INTEGER NOT NULL DEFAULT 0,
+        draws INTEGER NOT NULL DEFAULT 0,
+        move_time_total REAL NOT NULL DEFAULT 0,
+        move_count INTEGER NOT NULL DEFAULT 0,
+        cp_loss_total REAL NOT NULL DEFAULT 0,
+        cp_loss_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (granularity, bucket)
+    ) WITHOUT ROWID
+'''
+
+ROLLUP_UPSERT = '''
+    INSERT INTO performance_rollup
+        (granularity, bucket, games, wins, losses, draws,
+         move_time_total, move_count, cp_loss_total, cp_loss_count)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(granularity, bucket) DO UPDATE SET
+        games = games + excluded.games,
+        wins = wins + excluded.wins,
+        losses = losses + excluded.losses,
+        draws = draws + excluded.draws,
+        move_time_total = move_time_total + excluded.move_time_total,
+        move_count = move_count + excluded.move_count,
+        cp_loss_total = cp_loss_total + excluded.cp_loss_total,
+        cp_loss_count = cp_loss_count + excluded.cp_loss_count
+'''
+
+ROLLUP_BUCKETS = (('day', 10), ('hour', 13))
+
+# Mate scores would swamp the average, so each move's loss is capped
+MAX_CP_LOSS = 1000.0
+
+# Live events published by the bot and tailed by the dashboard
+EVENTS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        created_at REAL NOT NULL,
+        type TEXT NOT NULL,
+        payload TEXT NOT NULL
+    )
+'''
+
+EVENT_INSERT = 'INSERT INTO events (created_at, type, payload) VALUES (?, ?, ?)'
+
+STATS_UPSERT = '''
+    INSERT INTO bot_stats (scope, key, games, wins, losses, draws)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(scope, key) DO UPDATE SET
+        games = games + excluded.games,
+        wins = wins + excluded.wins,
+        losses = losses + excluded.losses,
+        draws = draws + excluded.draws
+'''
+
+
+def _result_counts(result: str, sign: int = 1) -> Tuple[int, int, int, int]:
+    """Return (games, wins, losses, draws) deltas for one game result."""
+    return sign, sign * (result == 'win'), sign * (result == 'loss'), sign * (result == 'draw')
+
+
+def _stats_dict(row: Optional[tuple]) -> Dict[str, int]:
+    """Convert a (games, wins, losses, draws) row into the statistics dict."""
+    games, wins, losses, draws = row if row is not None else (0, 0, 0, 0)
+    return {'games_played': games, 'wins': wins, 'losses': losses, 'draws': draws}
+
+
+def _performance_summary(color: str, move_rows: List[tuple]) -> Tuple[float, int, float, int]:
+    """
+    Return (move_time_total, move_count, cp_loss_total, cp_loss_count) for
+    our moves. Evaluations are in pawns for the side to move after each ply.
+    """
+    white = color == 'white'
+    move_time_total, move_count, cp_loss_total, cp_loss_count = 0.0, 0, 0.0, 0
+    previous_eval = None
+    for _, ply, _, evaluation, move_time, _ in move_rows:
+        if (ply % 2 == 0) == white:
+            if move_time is not None:
+                move_time_total += move_time
+                move_count += 1
+            if previous_eval is not None and evaluation is not None:
+                # Before our move the eval is ours; after it, it is the opponent's
+                loss = (previous_eval + evaluation) * 100
+                cp_loss_total += min(max(loss, 0.0), MAX_CP_LOSS)
+                cp_loss_count += 1
+        previous_eval = evaluation
+    return move_time_total, move_count, cp_loss_total, cp_loss_count
+
+
+def _signed64(key: int) -> int:
+    """Map an unsigned 64-bit Zobrist key onto SQLite's signed INTEGER range."""
+    return key - (1 << 64) if key >= (1 << 63) else key
+
+
+def _parse_floats(text: Optional[str]) -> List[float]:
+    """Parse a legacy comma-joined column."""
+    return [float(value) for value in text.split(',') if value] if text else []
+
 
 class DatabaseManager:
     """Manages the storage and retrieval of game data."""
     
     def __init__(self):
         self.db_path = os.getenv('DB_PATH', 'data/chess_bot.db')
+        self.read_pool_size = int(os.getenv('DB_READ_POOL_SIZE', '4'))
+        self.cache_size_kb = int(os.getenv('DB_CACHE_SIZE_KB', '16384'))
+        self.mmap_size = int(os.getenv('DB_MMAP_SIZE', str(256 * 1024 * 1024)))
+        # Single writer connection; analytics and dashboard go through the read pool
         self.connection = None
+        self._write_lock = asyncio.Lock()
+        self._readers: asyncio.Queue = asyncio.Queue()
+        self._reader_connections = []
+        
+        # Write-behind buffer: rows are grouped per INSERT statement and
+        # written with executemany in one transaction per flush
+        self.flush_interval = float(os.getenv('DB_FLUSH_INTERVAL', '2.0'))
+        self.flush_rows = int(os.getenv('DB_FLUSH_ROWS', '500'))
+        # A batch that cannot be written at all is retried this many times, then set aside
+        self.flush_retries = int(os.getenv('DB_FLUSH_RETRIES', '3'))
+        self.dead_letter_path = os.getenv('DB_DEAD_LETTER_PATH', f'{self.db_path}.rejected.jsonl')
+        self._flush_failures = 0
+        self._pending: Dict[str, List[tuple]] = {}
+        self._pending_stats: List[tuple] = []
+        self._pending_count = 0
+        self._flush_task = None
+        self.event_retention = float(os.getenv('DB_EVENT_RETENTION', '3600'))
+        self._last_event_prune = time.monotonic()
+        self.write_metrics = {
+            'rows_written': 0,
+            'flushes': 0,
+            'failed_flushes': 0,
+            'rejected_rows': 0,
+            'max_batch_rows': 0,
+            'last_flush_ms': 0.0,
+        }
     
     async def initialize(self):
         """Initialize database connection and tables."""
         logger.info("Initializing database...")
         self.connection = await aiosqlite.connect(self.db_path)
+        await self._configure(self.connection)
+        await self.connection.execute('PRAGMA journal_mode = WAL')
+        await self.connection.execute('PRAGMA synchronous = NORMAL')
+        async with self.connection.execute('PRAGMA user_version') as cursor:
+            version = (await cursor.fetchone())[0]
+        await self._migrate(version)
         await self._create_tables()
+        if version < 3:
+            await self._rebuild_statistics()
+        await self._open_readers()
+        metrics.register_collector('database', self._metrics)
+        if self.flush_interval > 0:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+    
+    async def initialize_read_only(self):
+        """Open only the read-only pool, for processes that never write (the dashboard)."""
+        if not Path(self.db_path).exists():
+            raise FileNotFoundError(f"Database not found: {self.db_path}")
+        self.read_pool_size = max(self.read_pool_size, 1)
+        await self._open_readers()
+        logger.info(f"Database opened read-only ({self.read_pool_size} connections)")
+    
+    async def _configure(self, connection: aiosqlite.Connection):
+        """Apply the per-connection pragmas."""
+        await connection.execute(f'PRAGMA cache_size = -{self.cache_size_kb}')
+        await connection.execute(f'PRAGMA mmap_size = {self.mmap_size}')
+        await connection.execute('PRAGMA temp_store = MEMORY')
+        await connection.execute('PRAGMA busy_timeout = 5000')
+    
+    async def _open_readers(self):
+        """Open the read-only connection pool. WAL lets readers run alongside the writer."""
+        uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+        for _ in range(self.read_pool_size):
+            reader = await aiosqlite.connect(uri, uri=True)
+            await self._configure(reader)
+            await reader.execute('PRAGMA query_only = ON')
+            self._reader_connections.append(reader)
+            self._readers.put_nowait(reader)
+    
+    @asynccontextmanager
+    async def reader(self):
+        """Borrow a read-only connection from the pool."""
+        if not self._reader_connections:
+            yield self.connection
+            return
+        connection = await self._readers.get()
+        try:
+            yield connection
+        finally:
+            self._readers.put_nowait(connection)
+    
+    @asynccontextmanager
+    async def writer(self):
+        """Hold the single writer connection for one transaction."""
+        async with self._write_lock:
+            yield self.connection
     
     async def _create_tables(self):
         """Create necessary tables in the database."""
         async with self.connection.cursor() as cursor:
-            await cursor.execute('''
-                CREATE TABLE IF NOT EXISTS games (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    game_id TEXT UNIQUE,
-                    opponent TEXT,
-                    color TEXT,
-                    result TEXT,
-                    moves TEXT,
-                    move_times TEXT,
-                    evaluations TEXT,
-                    pgn TEXT,
-                    duration REAL
-                )
-            ''')
+            await cursor.execute(GAMES_TABLE)
+            await cursor.execute(MOVES_TABLE)
+            await cursor.execute(STATS_TABLE)
+            await cursor.execute(PERFORMANCE_TABLE)
+            await cursor.execute(EVENTS_TABLE)
+            await cursor.execute('CREATE INDEX IF NOT EXISTS idx_games_result ON games(result)')
+            await cursor.execute('CREATE INDEX IF NOT EXISTS idx_games_opponent ON games(opponent, played_at)')
+            await cursor.execute('CREATE INDEX IF NOT EXISTS idx_games_played_at ON games(played_at)')
+            await cursor.execute('CREATE INDEX IF NOT EXISTS idx_moves_zobrist ON moves(zobrist)')
+            await cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
             await self.connection.commit()
             logger.info("✅ Database tables ready")
     
-    async def save_game(self, game_data: Dict[str, Any]):
-        """Save a completed game to the database."""
-        async with self.connection.cursor() as cursor:
-            await cursor.execute('''
-                INSERT INTO games (game_id, opponent, color, result, moves, move_times, evaluations, pgn, duration)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                game_data['game_id'],
-                game_data['opponent'],
-                game_data['color'],
-                game_data['result'],
-                ','.join(game_data['moves']),
-                ','.join(map(str, game_data['move_times'])),
-                ','.join(map(str, game_data['evaluations'])),
-                game_data['pgn'],
-                game_data['duration']
-            ))
+    async def _migrate(self, version: int):
+        """Upgrade databases created by older versions of the bot."""
+        async with self.connection.execute('PRAGMA table_info(games)') as cursor:
+            columns = {row[1] for row in await cursor.fetchall()}
+        
+        if version >= 1 or 'moves' not in columns:
+            return
+        
+        # v0 -> v1: comma-joined moves/move_times/evaluations become rows in `moves`
+        logger.info("Migrating games table to the per-ply schema...")
+        await self.connection.execute('BEGIN')
+        try:
+            await self.connection.execute('ALTER TABLE games RENAME TO games_legacy')
+            await self.connection.execute(GAMES_TABLE)
+            await self.connection.execute(MOVES_TABLE)
+            async with self.connection.execute('''
+                SELECT game_id, opponent, color, result, moves, move_times, evaluations, pgn, duration
+                FROM games_legacy ORDER BY id
+            ''') as cursor:
+                legacy_rows = await cursor.fetchall()
+            
+            for row in legacy_rows:
+                game_id, opponent, color, result, moves, move_times, evaluations, pgn, duration = row
+                game_row, move_rows = self._game_rows({
+                    'game_id': game_id,
+                    'opponent': opponent,
+                    'color': color,
+                    'result': result,
+                    'moves': moves.split(',') if moves else [],
+                    'move_times': _parse_floats(move_times),
+                    'evaluations': _parse_floats(evaluations),
+                    'pgn': pgn,
+                    'duration': duration,
+                    'played_at': self._pgn_date(pgn),
+                })
+                await self._insert_game(game_row, move_rows)
+            
+            await self.connection.execute('DROP TABLE games_legacy')
             await self.connection.commit()
-            logger.info(f"Game {game_data['game_id']} saved to database")
+            logger.info(f"Migrated {len(legacy_rows)} games")
+        except Exception:
+            await self.connection.rollback()
+            raise
+    
+    @staticmethod
+    def _pgn_date(pgn: Optional[str]) -> Optional[str]:
+        """Recover a game date from the PGN Date header of legacy rows."""
+        if not pgn:
+            return None
+        for line in pgn.splitlines():
+            if line.startswith('[Date "'):
+                try:
+                    return datetime.strptime(line[7:17], "%Y.%m.%d").isoformat(timespec='seconds')
+                except ValueError:
+                    return None
+        return None
+    
+    @staticmethod
+    def _game_rows(game_data: Dict[str, Any]) -> Tuple[tuple, List[tuple]]:
+        """Split game data into the games row and its per-ply moves rows."""
+        game_id = game_data['game_id']
+        white = game_data['color'] == 'white'
+        move_times = iter(game_data.get('move_times', []))
+        evaluations = game_data.get('evaluations', [])
+        
+        board = chess.Board()
+        move_rows = []
+        for ply, uci in enumerate(game_data['moves']):
+            zobrist = _signed64(chess.polyglot.zobrist_hash(board))
+            # Move times are only recorded for our own moves
+            ours = (ply % 2 == 0) == white
+            move_time = next(move_times, None) if ours else None
+            evaluation = evaluations[ply] if ply < len(evaluations) else None
+            move_rows.append((game_id, ply, uci, evaluation, move_time, zobrist))
+            try:
+                board.push_uci(uci)
+            except ValueError:
+                break
+        
+        game_row = (
+            game_id,
+            game_data['opponent'],
+            game_data['color'],
+            game_data['result'],
+            game_data.get('time_control'),
+            game_data['pgn'],
+            game_data['duration'],
+            game_data.get('played_at') or datetime.now().isoformat(timespec='seconds'),
+        )
+        return game_row, move_rows
+    
+    async def _insert_game(self, game_row: tuple, move_rows: List[tuple]):
+        """Insert a game and its moves without committing."""
+        await self.connection.execute(GAME_INSERT, game_row)
+        await self.connection.executemany(MOVE_INSERT, move_rows)
+    
+    async def _update_statistics(self, game_row: tuple, summary: Tuple[float, int, float, int]):
+        """Apply one saved game to the materialized statistics and rollups (no commit)."""
+        game_id, opponent, color, result, time_control = game_row[:5]
+        played_at = game_row[7]
+        counts = _result_counts(result)
+        await self.connection.executemany(ROLLUP_UPSERT, [
+            (granularity, played_at[:width], *counts, *summary)
+            for granularity, width in ROLLUP_BUCKETS
+        ])
+        rows = [
+            ('all', '', *counts),
+            ('color', color or '', *counts),
+            ('opponent', opponent or '', *counts),
+            ('time_control', time_control or '', *counts),
+        ]
+        for window in ROLLING_WINDOWS:
+            rows.append((f'last_{window}', '', *counts))
+            # The game pushed out of the window is the window-th game before this one
+            async with self.connection.execute('''
+                SELECT result FROM games
+                WHERE id < (SELECT id FROM games WHERE game_id = ?)
+                ORDER BY id DESC LIMIT 1 OFFSET ?
+            ''', (game_id, window - 1)) as cursor:
+                expired = await cursor.fetchone()
+            if expired is not None:
+                rows.append((f'last_{window}', '', *_result_counts(expired[0], -1)))
+        await self.connection.executemany(STATS_UPSERT, rows)
+    
+    async def _rebuild_statistics(self):
+        """Recompute the materialized statistics from the games table."""
+        aggregates = '''
+            COUNT(*), SUM(result = 'win'), SUM(result = 'loss'), SUM(result = 'draw')
+        '''
+        async with self.writer() as connection:
+            await connection.execute('DELETE FROM bot_stats')
+            await connection.execute(f'''
+                INSERT INTO bot_stats SELECT 'all', '', {aggregates} FROM games HAVING COUNT(*) > 0
+            ''')
+            for scope, column in (('color', 'color'), ('opponent', 'opponent'),
+                                  ('time_control', 'time_control')):
+                await connection.execute(f'''
+                    INSERT INTO bot_stats
+                    SELECT '{scope}', COALESCE({column}, ''), {aggregates}
+                    FROM games GROUP BY COALESCE({column}, '')
+                ''')
+            for window in ROLLING_WINDOWS:
+                await connection.execute(f'''
+                    INSERT INTO bot_stats
+                    SELECT 'last_{window}', '', {aggregates}
+                    FROM (SELECT result FROM games ORDER BY id DESC LIMIT {window})
+                    HAVING COUNT(*) > 0
+                ''')
+            await self._rebuild_rollups()
+            await connection.commit()
+        logger.info("Bot statistics rebuilt from games table")
+    
+    async def _rebuild_rollups(self):
+        """Recompute the performance rollups from games and moves (inside a transaction)."""
+        await self.connection.execute('DELETE FROM performance_rollup')
+        async with self.connection.execute('''
+            SELECT g.game_id, g.color, g.result, g.played_at,
+                   m.ply, m.uci, m.evaluation, m.move_time, m.zobrist
+            FROM games g LEFT JOIN moves m ON m.game_id = g.game_id
+            WHERE g.played_at IS NOT NULL
+            ORDER BY g.id, m.ply
+        ''') as cursor:
+            rows = await cursor.fetchall()
+        
+        updates = []
+        for game_id, game_moves in itertools.groupby(rows, key=lambda row: row[0]):
+            game_moves = list(game_moves)
+            _, color, result, played_at = game_moves[0][:4]
+            move_rows = [(game_id, *row[4:]) for row in game_moves if row[4] is not None]
+            summary = _performance_summary(color, move_rows)
+            for granularity, width in ROLLUP_BUCKETS:
+                updates.append((granularity, played_at[:width], *_result_counts(result), *summary))
+        await self.connection.executemany(ROLLUP_UPSERT, updates)
+    
+    async def enqueue(self, sql: str, rows: List[tuple]):
+        """Buffer rows for an INSERT statement; they are written on the next flush."""
+        if not rows:
+            return
+        self._pending.setdefault(sql, []).extend(rows)
+        self._pending_count += len(rows)
+        if self.flush_interval <= 0 or self._pending_count >= self.flush_rows:
+            await self.flush()
+    
+    async def flush(self):
+        """
+        Write every buffered row in a single transaction. If the batch fails,
+        it is written again row by row and rows that still fail (e.g. a
+        duplicate game_id) are set aside in the dead-letter file, so one bad
+        row never blocks the rest of the buffer.
+        """
+        async with self.writer() as connection:
+            if not self._pending_count:
+                return
+            pending, stats = self._pending, self._pending_stats
+            count = self._pending_count
+            self._pending, self._pending_stats, self._pending_count = {}, [], 0
+            
+            start = time.perf_counter()
+            try:
+                try:
+                    for sql, rows in pending.items():
+                        await connection.executemany(sql, rows)
+                    for game_row, summary in stats:
+                        await self._update_statistics(game_row, summary)
+                    await connection.commit()
+                    rejected = 0
+                except sqlite3.IntegrityError as e:
+                    # A constraint violation (e.g. duplicate game_id) is specific to some
+                    # rows; transient errors (locked, I/O) fall through to the retry below
+                    await connection.rollback()
+                    self.write_metrics['failed_flushes'] += 1
+                    logger.warning(f"Flush of {count} buffered rows failed ({e}), retrying row by row")
+                    rejected = await self._flush_rows_isolated(pending, stats)
+            except Exception as e:
+                await connection.rollback()
+                self.write_metrics['failed_flushes'] += 1
+                self._flush_failures += 1
+                if self._flush_failures > self.flush_retries:
+                    logger.error(f"Giving up on {count} buffered rows after "
+                                 f"{self._flush_failures} failed flushes: {e}")
+                    self._reject_batch(pending, str(e))
+                    self._flush_failures = 0
+                    return
+                logger.error(f"Failed to flush {count} buffered rows "
+                             f"(attempt {self._flush_failures}/{self.flush_retries}): {e}")
+                # Put the batch back in front of anything queued meanwhile
+                for sql, rows in self._pending.items():
+                    pending.setdefault(sql, []).extend(rows)
+                self._pending = pending
+                self._pending_stats = stats + self._pending_stats
+                self._pending_count += count
+                raise
+            
+            self._flush_failures = 0
+            elapsed = time.perf_counter() - start
+            write_metrics = self.write_metrics
+            write_metrics['rows_written'] += count - rejected
+            write_metrics['flushes'] += 1
+            write_metrics['max_batch_rows'] = max(write_metrics['max_batch_rows'], count)
+            write_metrics['last_flush_ms'] = elapsed * 1000
+            metrics.observe('sophie_db_flush_seconds', elapsed)
+    
+    async def _flush_rows_isolated(self, pending: Dict[str, List[tuple]], stats: List[tuple]) -> int:
+        """Write a failed batch one row per savepoint; returns the number of rejected rows."""
+        connection = self.connection
+        rejected: List[Tuple[str, tuple, str]] = []
+        failed_games = set()
+        
+        async def attempt(sql: str, args: tuple) -> bool:
+            await connection.execute('SAVEPOINT flush_row')
+            try:
+                await connection.execute(sql, args)
+            except sqlite3.IntegrityError as e:
+                await connection.execute('ROLLBACK TO flush_row')
+                rejected.append((sql, args, str(e)))
+                return False
+            finally:
+                await connection.execute('RELEASE flush_row')
+            return True
+        
+        await connection.execute('BEGIN')
+        # Games first: the moves and statistics of a rejected game are dropped with it
+        for row in pending.get(GAME_INSERT, []):
+            if not await attempt(GAME_INSERT, row):
+                failed_games.add(row[0])
+        for sql, rows in pending.items():
+            if sql == GAME_INSERT:
+                continue
+            for row in rows:
+                if sql == MOVE_INSERT and row[0] in failed_games:
+                    rejected.append((sql, row, 'game rejected'))
+                    continue
+                await attempt(sql, row)
+        for game_row, summary in stats:
+            if game_row[0] not in failed_games:
+                await self._update_statistics(game_row, summary)
+        await connection.commit()
+        
+        if rejected:
+            self._write_dead_letters(rejected)
+        return len(rejected)
+    
+    def _reject_batch(self, pending: Dict[str, List[tuple]], error: str):
+        self._write_dead_letters([(sql, row, error) for sql, rows in pending.items() for row in rows])
+    
+    def _write_dead_letters(self, rejected: List[Tuple[str, tuple, str]]):
+        """Append rejected rows to the dead-letter file (one JSON object per line)."""
+        self.write_metrics['rejected_rows'] += len(rejected)
+        logger.error(f"{len(rejected)} rows rejected, saved to {self.dead_letter_path}")
+        try:
+            Path(self.dead_letter_path).parent.mkdir(parents=True, exist_ok=True)
+            with open(self.dead_letter_path, 'a', encoding='utf-8') as f:
+                for sql, row, error in rejected:
+                    f.write(json.dumps({'rejected_at': time.time(), 'statement': ' '.join(sql.split()[:3]),
+                                        'row': list(row), 'error': error}, default=str) + '\n')
+        except OSError as e:
+            logger.error(f"Could not write dead letters: {e}")
+    
+    async def _flush_loop(self):
+        """Flush the write-behind buffer periodically."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if time.monotonic() - self._last_event_prune > 300:
+                    await self.prune_events()
+            except Exception as e:
+                # Rows stay buffered and are retried up to DB_FLUSH_RETRIES times
+                logger.warning(f"Write-behind flush will be retried: {e}")
+    
+    def get_write_metrics(self) -> Dict[str, Any]:
+        """Return write-behind buffer metrics."""
+        return {**self.write_metrics, 'pending_rows': self._pending_count}
+    
+    def _metrics(self):
+        """Write buffer and pool state for the metrics endpoint."""
+        return [
+            ('sophie_db_pending_rows', 'gauge', {}, self._pending_count),
+            ('sophie_db_idle_readers', 'gauge', {}, self._readers.qsize()),
+            ('sophie_db_rows_written_total', 'counter', {}, self.write_metrics['rows_written']),
+            ('sophie_db_failed_flushes_total', 'counter', {}, self.write_metrics['failed_flushes']),
+            ('sophie_db_rejected_rows_total', 'counter', {}, self.write_metrics['rejected_rows']),
+        ]
+    
+    async def save_game(self, game_data: Dict[str, Any]):
+        """Queue a completed game (and its moves) for the next flush."""
+        game_row, move_rows = self._game_rows(game_data)
+        self._pending_stats.append((game_row, _performance_summary(game_row[2], move_rows)))
+        await self.enqueue(GAME_INSERT, [game_row])
+        await self.enqueue(MOVE_INSERT, move_rows)
+        logger.info(f"Game {game_data['game_id']} queued for saving")
+    
+    async def publish_event(self, event_type: str, payload: Dict[str, Any]):
+        """
+        Queue a live event for dashboards. Per-move events ride the next
+        write-behind flush; game_end and stats flush right away, together
+        with the game they report.
+        """
+        await self.enqueue(EVENT_INSERT, [(time.time(), event_type, json.dumps(payload))])
+        if event_type in FLUSHING_EVENTS:
+            await self.flush()
+    
+    async def get_events_since(self, last_id: int, limit: int = 500) -> List[Tuple[int, str, str]]:
+        """Retrieve (id, type, payload) events newer than last_id."""
+        async with self.reader() as connection:
+            async with connection.execute(
+                'SELECT id, type, payload FROM events WHERE id > ? ORDER BY id LIMIT ?',
+                (last_id, limit)
+            ) as cursor:
+                return await cursor.fetchall()
+    
+    async def get_last_event_id(self) -> int:
+        """Return the id of the newest event (0 if none)."""
+        async with self.reader() as connection:
+            async with connection.execute('SELECT COALESCE(MAX(id), 0) FROM events') as cursor:
+                return (await cursor.fetchone())[0]
+    
+    async def prune_events(self):
+        """Delete events older than the retention window."""
+        self._last_event_prune = time.monotonic()
+        async with self.writer() as connection:
+            await connection.execute('DELETE FROM events WHERE created_at < ?',
+                                     (time.time() - self.event_retention,))
+            await connection.commit()
+    
+    async def get_performance_series(self, granularity: str = 'day',
+                                     points: int = 30) -> Dict[str, list]:
+        """Retrieve the most recent rollup buckets as compact column arrays."""
+        async with self.reader() as connection:
+            async with connection.execute('''
+                SELECT bucket, games, wins, move_time_total, move_count, cp_loss_total, cp_loss_count
+                FROM performance_rollup
+                WHERE granularity = ?
+                ORDER BY bucket DESC
+                LIMIT ?
+            ''', (granularity, points)) as cursor:
+                rows = (await cursor.fetchall())[::-1]
+        return {
+            't': [row[0] for row in rows],
+            'games': [row[1] for row in rows],
+            'win_rate': [round(row[2] / row[1] * 100, 1) if row[1] else None for row in rows],
+            'avg_move_time': [round(row[3] / row[4], 3) if row[4] else None for row in rows],
+            'avg_cp_loss': [round(row[5] / row[6], 1) if row[6] else None for row in rows],
+        }
+    
+    async def get_recent_games(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Retrieve the most recently played games."""
+        async with self.reader() as connection:
+            async with connection.execute('''
+                SELECT game_id, opponent, result, color, duration, played_at
+                FROM games
+                ORDER BY played_at DESC
+                LIMIT ?
+            ''', (limit,)) as cursor:
+                rows = await cursor.fetchall()
+        return [
+            {
+                'game_id': row[0],
+                'opponent': row[1],
+                'result': row[2],
+                'color': row[3],
+                'duration': row[4],
+                'date': row[5],
+            }
+            for row in rows
+        ]
+    
+    async def get_game_moves(self, game_id: str) -> List[Dict[str, Any]]:
+        """Retrieve the per-ply moves of a game."""
+        async with self.reader() as connection:
+            async with connection.execute('''
+                SELECT ply, uci, evaluation, move_time, zobrist
+                FROM moves
+                WHERE game_id = ?
+                ORDER BY ply
+            ''', (game_id,)) as cursor:
+                rows = await cursor.fetchall()
+        return [
+            {'ply': row[0], 'uci': row[1], 'evaluation': row[2], 'move_time': row[3], 'zobrist': row[4]}
+            for row in rows
+        ]
+    
+    async def get_opponent_statistics(self, opponent: str) -> Dict[str, int]:
+        """Retrieve our results against a single opponent."""
+        async with self.reader() as connection:
+            async with connection.execute(
+                "SELECT games, wins, losses, draws FROM bot_stats WHERE scope = 'opponent' AND key = ?",
+                (opponent,)
+            ) as cursor:
+                return _stats_dict(await cursor.fetchone())
+    
+    async def get_training_positions(self, since: Optional[str] = None,
+                                     limit: Optional[int] = None) -> List[Tuple]:
+        """
+        Retrieve (game_id, ply, uci, evaluation, color, result) rows for
+        training, most recent games first.
+        """
+        query = '''
+            SELECT m.game_id, m.ply, m.uci, m.evaluation, g.color, g.result
+            FROM games g
+            JOIN moves m ON m.game_id = g.game_id
+        '''
+        params: list = []
+        if since is not None:
+            query += ' WHERE g.played_at >= ?'
+            params.append(since)
+        query += ' ORDER BY g.played_at DESC, m.game_id, m.ply'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        async with self.reader() as connection:
+            async with connection.execute(query, params) as cursor:
+                return await cursor.fetchall()
     
     async def get_bot_statistics(self) -> Dict[str, int]:
         """Retrieve aggregate statistics for the bot."""
-        async with self.connection.cursor() as cursor:
-            await cursor.execute('''
-                SELECT COUNT(*) as games_played,
-                       SUM(case when result = "win" then 1 else 0 end) as wins,
-                       SUM(case when result = "loss" then 1 else 0 end) as losses,
-                       SUM(case when result = "draw" then 1 else 0 end) as draws
-                FROM games
-            ''')
-            row = await cursor.fetchone()
-            # Garante que row não é None e converte para int
-            if row is None:
-                return {'games_played': 0, 'wins': 0, 'losses': 0, 'draws': 0}
-            def safe_int(val):
-                return int(val) if val is not None else 0
-            # Suporte para acesso por índice e por chave
-            if isinstance(row, dict):
-                return {
-                    'games_played': safe_int(row.get('games_played')),
-                    'wins': safe_int(row.get('wins')),
-                    'losses': safe_int(row.get('losses')),
-                    'draws': safe_int(row.get('draws')),
-                }
-            else:
-                # Caso row seja uma tupla
-                return {
-                    'games_played': safe_int(row[0]),
-                    'wins': safe_int(row[1]),
-                    'losses': safe_int(row[2]),
-                    'draws': safe_int(row[3]),
-                }
+        async with self.reader() as connection:
+            async with connection.execute(
+                "SELECT games, wins, losses, draws FROM bot_stats WHERE scope = 'all' AND key = ''"
+            ) as cursor:
+                return _stats_dict(await cursor.fetchone())
+    
+    async def get_statistics_breakdown(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """Retrieve statistics per color, opponent, time control and rolling window."""
+        async with self.reader() as connection:
+            async with connection.execute(
+                "SELECT scope, key, games, wins, losses, draws FROM bot_stats WHERE scope != 'all'"
+            ) as cursor:
+                rows = await cursor.fetchall()
+        breakdown: Dict[str, Dict[str, Dict[str, int]]] = {}
+        for scope, key, *counts in rows:
+            breakdown.setdefault(scope, {})[key] = _stats_dict(tuple(counts))
+        return breakdown
     
     async def close(self):
-        """Close the database connection."""
+        """Flush pending writes and close the database connection."""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        if self.connection:
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Final flush failed, setting {self._pending_count} rows aside: {e}")
+                self._reject_batch(self._pending, str(e))
+                self._pending, self._pending_stats, self._pending_count = {}, [], 0
+        for reader in self._reader_connections:
+            await reader.close()
+        self._reader_connections = []
         if self.connection:
             await self.connection.close()
             logger.info("Database connection closed")
@@ -0,0 +1,231 @@
+"""
+Game Exporter - Columnar exports of games and positions
+
+Streams games and their per-ply moves out of SQLite into date-partitioned
+Parquet or Arrow IPC files, incrementally from a watermark, so analytics
+and training can read column slices without going through SQLite.
+
+Each batch is written under hidden temporary names (ignored by readers),
+then the watermark is advanced, then the parts are renamed into place.
+Leftovers of an interrupted export are finished or discarded on the next
+run depending on the watermark, so no game is exported twice or lost.
+"""
+
+import asyncio
+import json
+import os
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    logger.warning("PyArrow not available, columnar exports disabled")
+    PYARROW_AVAILABLE = False
+
+FORMATS = {'parquet': 'parquet', 'arrow': 'ipc'}
+
+# Columns of DatabaseManager.get_training_positions rows
+TRAINING_COLUMNS = ['game_id', 'ply', 'uci', 'evaluation', 'color', 'result']
+
+if PYARROW_AVAILABLE:
+    GAMES_SCHEMA = pa.schema([
+        ('id', pa.int64()),
+        ('game_id', pa.string()),
+        ('opponent', pa.string()),
+        ('color', pa.string()),
+        ('result', pa.string()),
+        ('time_control', pa.string()),
+        ('duration', pa.float64()),
+        ('played_at', pa.string()),
+    ])
+
+    POSITIONS_SCHEMA = pa.schema([
+        ('game_id', pa.string()),
+        ('ply', pa.int16()),
+        ('uci', pa.string()),
+        ('evaluation', pa.float32()),
+        ('move_time', pa.float32()),
+        ('zobrist', pa.int64()),
+        ('ours', pa.bool_()),
+        ('color', pa.string()),
+        ('result', pa.string()),
+    ])
+
+
+def _partition(played_at: Optional[str]) -> str:
+    """Return the date partition of a game."""
+    return f"date={played_at[:10]}" if played_at else "date=unknown"
+
+
+class GameExporter:
+    """Exports games and positions to partitioned columnar files."""
+
+    def __init__(self, db_manager, output_dir: Optional[str] = None,
+                 fmt: str = 'parquet', batch_size: int = 5000):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format: {fmt}")
+        self.db_manager = db_manager
+        self.output_dir = Path(output_dir or os.getenv('EXPORT_DIR', 'data/exports')) / fmt
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.watermark_path = self.output_dir / "_watermark.json"
+
+    def _read_watermark(self) -> int:
+        """Return the id of the last exported game."""
+        if not self.watermark_path.exists():
+            return 0
+        with open(self.watermark_path, encoding='utf-8') as f:
+            return json.load(f)['last_game_id']
+
+    def _write_watermark(self, last_game_id: int):
+        """Atomically advance the watermark."""
+        tmp_path = self.watermark_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'last_game_id': last_game_id}, f)
+        os.replace(tmp_path, self.watermark_path)
+
+    async def export(self) -> Dict[str, int]:
+        """Export every game newer than the watermark. Returns row counts."""
+        if not PYARROW_AVAILABLE:
+            logger.warning("Cannot export: PyArrow not available")
+            return {'games': 0, 'positions': 0}
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        watermark = self._read_watermark()
+        self._recover(watermark)
+        totals = {'games': 0, 'positions': 0}
+
+        while True:
+            async with self.db_manager.reader() as connection:
+                async with connection.execute('''
+                    SELECT id, game_id, opponent, color, result, time_control, duration, played_at
+                    FROM games WHERE id > ? ORDER BY id LIMIT ?
+                ''', (watermark, self.batch_size)) as cursor:
+                    games = await cursor.fetchall()
+                if not games:
+                    break
+                async with connection.execute('''
+                    SELECT m.game_id, m.ply, m.uci, m.evaluation, m.move_time, m.zobrist,
+                           g.color, g.result, g.played_at
+                    FROM games g JOIN moves m ON m.game_id = g.game_id
+                    WHERE g.id > ? AND g.id <= ?
+                    ORDER BY g.id, m.ply
+                ''', (watermark, games[-1][0])) as cursor:
+                    moves = await cursor.fetchall()
+
+            parts = await asyncio.to_thread(self._write_batch, games, moves)
+            watermark = games[-1][0]
+            self._write_watermark(watermark)
+            self._publish_parts(parts)
+            totals['games'] += len(games)
+            totals['positions'] += len(moves)
+
+        logger.info(f"Exported {totals['games']} games and {totals['positions']} positions "
+                    f"to {self.output_dir} ({self.fmt})")
+        return totals
+
+    def _recover(self, watermark: int):
+        """Finish or discard the temporary parts of an interrupted export."""
+        for path in self.output_dir.glob('*/date=*/.part-*.tmp'):
+            last_game_id = int(path.name.split('.')[1].split('-')[2])
+            if last_game_id <= watermark:
+                self._publish_parts([path])
+            else:
+                # The watermark never moved past this batch: it is exported again
+                path.unlink()
+                logger.warning(f"Discarded unfinished export part {path}")
+
+    @staticmethod
+    def _publish_parts(paths: List[Path]):
+        """Rename temporary parts (.part-....tmp) to their visible names."""
+        for path in paths:
+            os.replace(path, path.with_name(path.name[1:-len('.tmp')]))
+
+    def _write_batch(self, games: List[tuple], moves: List[tuple]) -> List[Path]:
+        """
+        Write one batch of games and moves, split by date partition, under
+        temporary names; returns their paths.
+        """
+        part_name = f"part-{games[0][0]:010d}-{games[-1][0]:010d}"
+
+        game_columns: Dict[str, Dict[str, list]] = defaultdict(lambda: defaultdict(list))
+        for row in games:
+            columns = game_columns[_partition(row[7])]
+            for name, value in zip(GAMES_SCHEMA.names, row):
+                columns[name].append(value)
+
+        position_columns: Dict[str, Dict[str, list]] = defaultdict(lambda: defaultdict(list))
+        for game_id, ply, uci, evaluation, move_time, zobrist, color, result, played_at in moves:
+            columns = position_columns[_partition(played_at)]
+            columns['game_id'].append(game_id)
+            columns['ply'].append(ply)
+            columns['uci'].append(uci)
+            columns['evaluation'].append(evaluation)
+            columns['move_time'].append(move_time)
+            columns['zobrist'].append(zobrist)
+            columns['ours'].append((ply % 2 == 0) == (color == 'white'))
+            columns['color'].append(color)
+            columns['result'].append(result)
+
+        paths = []
+        for table_name, schema, partitions in (('games', GAMES_SCHEMA, game_columns),
+                                               ('positions', POSITIONS_SCHEMA, position_columns)):
+            for partition, columns in partitions.items():
+                table = pa.Table.from_pydict(dict(columns), schema=schema)
+                directory = self.output_dir / table_name / partition
+                directory.mkdir(parents=True, exist_ok=True)
+                # Dataset readers skip names starting with '.'
+                path = directory / f".{part_name}.{self.fmt}.tmp"
+                self._write_table(table, path)
+                paths.append(path)
+        return paths
+
+    def _write_table(self, table: "pa.Table", path: Path):
+        """Write a table in the configured format."""
+        if self.fmt == 'parquet':
+            pq.write_table(table, path, compression='zstd')
+        else:
+            with pa.OSFile(str(path), 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+
+
+def load_table(name: str, columns: Optional[List[str]] = None, filter_expression: Any = None,
+               output_dir: Optional[str] = None, fmt: str = 'parquet') -> "pa.Table":
+    """
+    Read an exported table ('games' or 'positions') as one Arrow table.
+    Only the requested columns are read; Arrow IPC files are memory-mapped.
+    The partition column `date` is a string ('unknown' for undated games).
+    """
+    path = Path(output_dir or os.getenv('EXPORT_DIR', 'data/exports')) / fmt / name
+    partitioning = ds.partitioning(pa.schema([('date', pa.string())]), flavor='hive')
+    filesystem = pafs.LocalFileSystem(use_mmap=fmt == 'arrow')
+    dataset = ds.dataset(str(path.resolve()), format=FORMATS[fmt], partitioning=partitioning,
+                         filesystem=filesystem)
+    return dataset.to_table(columns=columns, filter=filter_expression)
+
+
+def load_training_rows(limit: Optional[int] = None, output_dir: Optional[str] = None,
+                       fmt: str = 'parquet') -> List[tuple]:
+    """
+    Read exported positions as (game_id, ply, uci, evaluation, color, result)
+    rows, most recent dates first and undated games last, in the shape
+    DatabaseManager.get_training_positions returns.
+    """
+    table = load_table('positions', columns=TRAINING_COLUMNS + ['date'], output_dir=output_dir, fmt=fmt)
+    dates = table['date']
+    table = table.set_column(table.schema.get_field_index('date'), 'date',
+                             pc.if_else(pc.equal(dates, 'unknown'), '', dates))
+    table = table.sort_by([('date', 'descending'), ('game_id', 'ascending'), ('ply', 'ascending')])
+    if limit is not None:
+        table = table.slice(0, limit)
+    return list(zip(*(table[name].to_pylist() for name in TRAINING_COLUMNS)))
@@ -0,0 +1,367 @@
+"""
+Arena - Offline matches between checkpoints with SPRT gating
+
+Plays game pairs between two players in worker processes: ChessNet
+checkpoints searching with MCTS at a fixed playout count, or local
+Stockfish processes at a fixed node count. Each pair starts both games
+from the same position with colors swapped, and a sequential probability
+ratio test over the pair results stops the match as soon as it decides
+between "A is no better than elo0" and "A is at least elo1 stronger".
+No Lichess connection is involved.
+
+Both players are deterministic at a fixed search budget, so a repeated
+start would replay the same pair. Every pair gets a start position not
+used before (an opening plus a few random plies), checkpoints sample their
+first moves by visit count, and the match ends when no new start is left.
+"""
+
+import math
+import multiprocessing as mp
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import chess
+import chess.engine
+import chess.pgn
+import torch
+from loguru import logger
+from multiprocessing.util import Finalize
+
+from ..learning.neural_network import ChessNet, checkpoint_hidden_size
+from .mcts import MCTS
+
+# Pair scores for A: 0, 0.5, 1, 1.5 or 2 points out of the two games
+PAIR_SCORES = (0.0, 0.5, 1.0, 1.5, 2.0)
+
+
+def elo_to_score(elo: float) -> float:
+    """Expected score of a player `elo` points stronger (logistic model)."""
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def score_to_elo(score: float) -> float:
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return 400 * math.log10(score / (1 - score))
+
+
+@dataclass
+class SPRT:
+    """
+    Sequential probability ratio test on game pairs (pentanomial results).
+    H0: A's Elo advantage is elo0, H1: it is elo1. The log-likelihood ratio
+    uses the normal approximation over the per-pair score, so correlated
+    results of the two games from one opening are accounted for.
+    """
+    elo0: float = 0.0
+    elo1: float = 10.0
+    alpha: float = 0.05
+    beta: float = 0.05
+    pairs: List[int] = field(default_factory=lambda: [0] * len(PAIR_SCORES))
+
+    def add(self, pair_score: float):
+        self.pairs[PAIR_SCORES.index(pair_score)] += 1
+
+    @property
+    def count(self) -> int:
+        return sum(self.pairs)
+
+    @property
+    def bounds(self) -> Tuple[float, float]:
+        return math.log(self.beta / (1 - self.alpha)), math.log((1 - self.beta) / self.alpha)
+
+    def _moments(self, prior: bool = True) -> Tuple[float, float]:
+        """Mean and variance of the per-game score of a pair."""
+        # A prior of one pair spread over the outcomes keeps the variance
+        # from collapsing on the first few (or unanimous) results
+        counts = [count + prior / len(PAIR_SCORES) for count in self.pairs]
+        total = sum(counts)
+        scores = [score / 2 for score in PAIR_SCORES]
+        mean = sum(count * score for count, score in zip(counts, scores)) / total
+        variance = sum(count * (score - mean) ** 2 for count, score in zip(counts, scores)) / total
+        return mean, variance
+
+    def llr(self) -> float:
+        if not self.count:
+            return 0.0
+        mean, variance = self._moments()
+        score0, score1 = elo_to_score(self.elo0), elo_to_score(self.elo1)
+        return self.count * (score1 - score0) * (2 * mean - score0 - score1) / (2 * variance)
+
+    def status(self) -> Optional[str]:
+        """'H1' (A is stronger), 'H0' (it is not) or None while undecided."""
+        lower, upper = self.bounds
+        llr = self.llr()
+        if llr >= upper:
+            return 'H1'
+        if llr <= lower:
+            return 'H0'
+        return None
+
+    def elo(self) -> Tuple[float, float]:
+        """Elo difference estimate and its 95% margin."""
+        if not self.count:
+            return 0.0, float('inf')
+        mean, _ = self._moments(prior=False)
+        _, variance = self._moments()
+        margin = 1.96 * math.sqrt(variance / self.count)
+        low, high = score_to_elo(mean - margin), score_to_elo(mean + margin)
+        return score_to_elo(mean), (high - low) / 2
+
+
+def load_openings(path: Optional[str]) -> List[str]:
+    """
+    FENs to start games from: a PGN file (the position at the end of each
+    game's mainline) or one FEN/EPD per line. Without a file, only the
+    starting position (pairs then differ only by their random plies).
+    """
+    if not path:
+        logger.warning("No openings file, every pair starts with random plies from the initial position")
+        return [chess.STARTING_FEN]
+
+    fens = []
+    if path.endswith('.pgn'):
+        with open(path, encoding='utf-8', errors='replace') as f:
+            while (game := chess.pgn.read_game(f)) is not None:
+                fens.append(game.end().board().fen())
+    else:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                board = chess.Board()
+                try:
+                    board.set_fen(line)
+                except ValueError:
+                    board.set_epd(line)
+                fens.append(board.fen())
+    if not fens:
+        raise ValueError(f"No openings found in {path}")
+    return fens
+
+
+class ModelPlayer:
+    """
+    A ChessNet checkpoint choosing the most visited MCTS move, after
+    sampling in proportion to visit counts for its first temperature_plies.
+    """
+
+    def __init__(self, path: str, nodes: int, temperature_plies: int = 0):
+        self.model = ChessNet(hidden_size=checkpoint_hidden_size(path))
+        self.model.load_state_dict(torch.load(path)['model_state_dict'])
+        self.mcts = MCTS(self.model, nodes=nodes)
+        self.temperature_plies = temperature_plies
+        self.rng = random.Random()
+
+    def new_game(self, board: chess.Board):
+        self.mcts.reset(board)
+
+    def move(self, board: chess.Board) -> chess.Move:
+        best = self.mcts.search(board)
+        if len(board.move_stack) >= self.temperature_plies:
+            return best
+        moves, counts = zip(*self.mcts.visit_distribution().items())
+        return self.rng.choices(moves, weights=counts)[0]
+
+    def close(self):
+        pass
+
+
+class StockfishPlayer:
+    """A local Stockfish process searching a fixed number of nodes."""
+
+    def __init__(self, path: str, nodes: int):
+        self.engine = chess.engine.SimpleEngine.popen_uci(path)
+        self.engine.configure({'Threads': 1, 'Hash': 16})
+        self.limit = chess.engine.Limit(nodes=nodes)
+        self.game = None
+
+    def new_game(self, board: chess.Board):
+        # A new key makes python-chess send ucinewgame before the first search
+        self.game = object()
+
+    def move(self, board: chess.Board) -> chess.Move:
+        return self.engine.play(board, self.limit, game=self.game).move
+
+    def close(self):
+        self.engine.quit()
+
+
+def make_player(spec: Dict[str, Any]):
+    """{'kind': 'model' | 'stockfish', 'path': ..., 'nodes': ..., ['temperature_plies': ...]} -> player."""
+    if spec['kind'] == 'stockfish':
+        return StockfishPlayer(spec['path'], spec['nodes'])
+    return ModelPlayer(spec['path'], spec['nodes'], spec.get('temperature_plies', 0))
+
+
+def play_game(white, black, fen: str, max_plies: int) -> Tuple[float, int]:
+    """Play one game; returns White's score and its length in plies."""
+    board = chess.Board(fen)
+    for player in (white, black):
+        player.new_game(board)
+    while not board.is_game_over(claim_draw=True) and len(board.move_stack) < max_plies:
+        player = white if board.turn == chess.WHITE else black
+        board.push(player.move(board))
+    outcome = board.outcome(claim_draw=True)
+    if outcome is None or outcome.winner is None:
+        # Over max_plies is adjudicated a draw
+        return 0.5, len(board.move_stack)
+    return (1.0 if outcome.winner == chess.WHITE else 0.0), len(board.move_stack)
+
+
+# Worker side: each process keeps its two players between pairs
+_PLAYERS: Dict[str, Any] = {}
+
+
+def _close_players():
+    for player in _PLAYERS.values():
+        player.close()
+
+
+def _init_worker(spec_a: Dict[str, Any], spec_b: Dict[str, Any], threads: int):
+    # Per-move search logs from every worker would drown the match progress
+    logger.remove()
+    logger.add(sys.stderr, level='INFO')
+    torch.set_num_threads(threads)
+    _PLAYERS['a'] = make_player(spec_a)
+    _PLAYERS['b'] = make_player(spec_b)
+    # Pool workers leave through os._exit, which skips atexit but runs finalizers
+    Finalize(None, _close_players, exitpriority=10)
+
+
+def play_pair(fen: str, max_plies: int) -> Dict[str, Any]:
+    """Worker: two games from one opening, A playing White then Black."""
+    a, b = _PLAYERS['a'], _PLAYERS['b']
+    start = time.perf_counter()
+    first, plies_first = play_game(a, b, fen, max_plies)
+    second, plies_second = play_game(b, a, fen, max_plies)
+    return {
+        'fen': fen,
+        'scores': (first, 1.0 - second),
+        'plies': plies_first + plies_second,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+class Arena:
+    """Runs game pairs in parallel until the SPRT decides or max_pairs is reached."""
+
+    def __init__(self, player_a: Dict[str, Any], player_b: Dict[str, Any], openings: List[str],
+                 workers: Optional[int] = None, max_pairs: int = 5000, max_plies: int = 400,
+                 sprt: Optional[SPRT] = None, seed: int = 0, random_plies: int = 4):
+        self.player_a = player_a
+        self.player_b = player_b
+        self.openings = openings
+        self.random_plies = random_plies
+        self.workers = workers or int(os.getenv('ARENA_WORKERS', '0')) or os.cpu_count() or 1
+        self.max_pairs = max_pairs
+        self.max_plies = max_plies
+        self.sprt = sprt or SPRT()
+        self.rng = random.Random(seed)
+        self.results = {'wins': 0, 'draws': 0, 'losses': 0}
+
+    def _random_start(self, fen: str) -> Optional[str]:
+        """The opening followed by random_plies random moves (None if the game ends)."""
+        board = chess.Board(fen)
+        for _ in range(self.random_plies):
+            board.push(self.rng.choice(list(board.legal_moves)))
+            if board.is_game_over(claim_draw=True):
+                return None
+        return board.fen()
+
+    def _starts(self, attempts: int = 20):
+        """
+        Start positions never used before in this match: the openings in a
+        shuffled order, each with random plies. Openings are only cycled
+        while random plies can still produce new positions; a pass that
+        finds nothing new ends the match.
+        """
+        seen = set()
+        while True:
+            order = list(self.openings)
+            self.rng.shuffle(order)
+            fresh = False
+            for fen in order:
+                for _ in range(attempts if self.random_plies else 1):
+                    start = self._random_start(fen)
+                    if start is not None and start not in seen:
+                        seen.add(start)
+                        fresh = True
+                        yield start
+                        break
+            if not fresh or not self.random_plies:
+                return
+
+    def _record(self, pair: Dict[str, Any]):
+        for score in pair['scores']:
+            key = 'wins' if score == 1.0 else 'losses' if score == 0.0 else 'draws'
+            self.results[key] += 1
+        self.sprt.add(sum(pair['scores']))
+
+    def run(self) -> Dict[str, Any]:
+        """Play the match; returns the SPRT verdict and the result summary."""
+        threads = max(1, (os.cpu_count() or 1) // self.workers)
+        lower, upper = self.sprt.bounds
+        logger.info(f"Arena: {self.workers} workers, SPRT elo0={self.sprt.elo0} elo1={self.sprt.elo1} "
+                    f"alpha={self.sprt.alpha} beta={self.sprt.beta} (LLR bounds {lower:.2f}, {upper:.2f})")
+
+        starts = self._starts()
+        start = time.time()
+        plies = 0
+        submitted = 0
+        exhausted = False
+        status = None
+        context = mp.get_context('spawn')
+        pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=_init_worker,
+                                   initargs=(self.player_a, self.player_b, threads))
+        try:
+            pending = set()
+            while status is None and (pending or (submitted < self.max_pairs and not exhausted)):
+                # Two pairs in flight per worker keep every core busy
+                while submitted < self.max_pairs and not exhausted and len(pending) < 2 * self.workers:
+                    fen = next(starts, None)
+                    if fen is None:
+                        # A repeated start would replay a pair the SPRT has already counted
+                        logger.warning(f"Out of new start positions after {submitted} pairs")
+                        exhausted = True
+                        break
+                    pending.add(pool.submit(play_pair, fen, self.max_plies))
+                    submitted += 1
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pair = future.result()
+                    self._record(pair)
+                    plies += pair['plies']
+                status = self.sprt.status()
+                if self.sprt.count % 10 == 0 or status:
+                    elo, margin = self.sprt.elo()
+                    logger.info(f"{self.sprt.count} pairs: +{self.results['wins']} ={self.results['draws']} "
+                                f"-{self.results['losses']}, Elo {elo:+.1f} ±{margin:.1f}, "
+                                f"LLR {self.sprt.llr():.2f}")
+        finally:
+            # The verdict is in: drop the queued pairs instead of finishing them
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        elapsed = time.time() - start
+        elo, margin = self.sprt.elo()
+        summary = {
+            'status': status,
+            'pairs': self.sprt.count,
+            'openings_exhausted': exhausted,
+            'pentanomial': list(self.sprt.pairs),
+            **self.results,
+            'elo': elo,
+            'elo_margin': margin,
+            'llr': self.sprt.llr(),
+            'bounds': (lower, upper),
+            'seconds': elapsed,
+            'games_per_second': 2 * self.sprt.count / max(elapsed, 1e-9),
+            'plies': plies,
+        }
+        logger.info(f"Arena finished: {summary}")
+        return summary
@@ -0,0 +1,296 @@
+"""
+MCTS - PUCT Monte Carlo tree search over ChessNet
+
+Nodes live in flat numpy arrays (children of a node are one contiguous
+block), leaves are gathered with virtual loss and evaluated in batched
+forward passes, and the subtree under the moves actually played is kept
+between searches so earlier work is reused.
+"""
+
+import math
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import chess
+import numpy as np
+import torch
+from loguru import logger
+
+from ..learning.position_codec import POSITION_DTYPE, decode_features, encode_position, move_to_index
+
+UNEXPANDED, EXPANDED, TERMINAL = 0, 1, 2
+
+
+def encode_move(move: chess.Move) -> int:
+    """Pack a move into 16 bits: from, to and promotion piece."""
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def decode_move(code: int) -> chess.Move:
+    """Unpack a move packed by encode_move."""
+    return chess.Move(code & 63, (code >> 6) & 63, promotion=(code >> 12) or None)
+
+
+class MCTS:
+    """PUCT search with array-backed nodes and tree reuse between moves."""
+
+    def __init__(self, model, nodes: Optional[int] = None, batch_size: int = 32,
+                 c_puct: float = 1.5, virtual_loss: float = 1.0, capacity: int = 1 << 16,
+                 dirichlet_alpha: float = 0.0, dirichlet_fraction: float = 0.25):
+        self.model = model
+        self.nodes = nodes or int(os.getenv('MCTS_NODES', '800'))
+        self.batch_size = batch_size
+        self.c_puct = c_puct
+        self.virtual_loss = virtual_loss
+        self.dirichlet_alpha = dirichlet_alpha
+        self.dirichlet_fraction = dirichlet_fraction
+        self.last_search: Dict[str, float] = {}
+        self._allocate(capacity)
+        self.reset()
+
+    def _allocate(self, capacity: int):
+        """Create empty node arrays."""
+        self.capacity = capacity
+        # Visits and value sum are from the point of view of the player who moved into the node
+        self.visits = np.zeros(capacity, dtype=np.float32)
+        self.value_sum = np.zeros(capacity, dtype=np.float32)
+        self.prior = np.zeros(capacity, dtype=np.float32)
+        self.move = np.zeros(capacity, dtype=np.uint16)
+        self.first_child = np.zeros(capacity, dtype=np.int32)
+        self.num_children = np.zeros(capacity, dtype=np.int16)
+        self.state = np.zeros(capacity, dtype=np.int8)
+        self.terminal_value = np.zeros(capacity, dtype=np.float32)
+
+    def _arrays(self) -> List[str]:
+        return ['visits', 'value_sum', 'prior', 'move', 'first_child',
+                'num_children', 'state', 'terminal_value']
+
+    def _reserve(self, count: int):
+        """Make room for count more nodes, doubling the arrays when needed."""
+        if self.used + count <= self.capacity:
+            return
+        capacity = self.capacity
+        while self.used + count > capacity:
+            capacity *= 2
+        for name in self._arrays():
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.used] = old[:self.used]
+            setattr(self, name, new)
+        self.capacity = capacity
+
+    def reset(self, board: Optional[chess.Board] = None):
+        """Drop the tree and start from the given position."""
+        self.board = board.copy() if board is not None else chess.Board()
+        self.root = 0
+        self.used = 1
+        for name in self._arrays():
+            getattr(self, name)[0] = 0
+
+    def advance(self, move: chess.Move):
+        """Make a move at the root, keeping its subtree when it has one."""
+        self.board.push(move)
+        child = self._find_child(self.root, encode_move(move))
+        if child is None:
+            self.reset(self.board)
+            return
+        self.root = child
+        if self.used > self.capacity // 2:
+            self._compact()
+
+    def _find_child(self, node: int, code: int) -> Optional[int]:
+        if self.state[node] != EXPANDED:
+            return None
+        start = self.first_child[node]
+        matches = np.nonzero(self.move[start:start + self.num_children[node]] == code)[0]
+        return int(start + matches[0]) if len(matches) else None
+
+    def _compact(self):
+        """Copy the subtree under the root to the front of the arrays."""
+        old = {name: getattr(self, name)[:self.used].copy() for name in self._arrays()}
+        for name in self._arrays():
+            getattr(self, name)[0] = old[name][self.root]
+        self.used = 1
+        queue = deque([(self.root, 0)])
+        while queue:
+            old_node, new_node = queue.popleft()
+            if old['state'][old_node] != EXPANDED:
+                continue
+            start, count = int(old['first_child'][old_node]), int(old['num_children'][old_node])
+            for name in self._arrays():
+                getattr(self, name)[self.used:self.used + count] = old[name][start:start + count]
+            self.first_child[new_node] = self.used
+            queue.extend((start + i, self.used + i) for i in range(count))
+            self.used += count
+        self.root = 0
+
+    def _sync(self, board: chess.Board):
+        """Follow the moves played since the last search, or start over."""
+        played, known = board.move_stack, self.board.move_stack
+        if (len(played) >= len(known) and played[:len(known)] == known
+                and board.root() == self.board.root()):
+            for move in played[len(known):]:
+                self.advance(move)
+        else:
+            self.reset(board)
+
+    def _evaluate(self, records: List[tuple]) -> Tuple[np.ndarray, np.ndarray]:
+        """Run the network on a batch of encoded positions."""
+        self.model.eval()
+        with torch.no_grad():
+            values, policies = self.model(torch.from_numpy(
+                decode_features(np.array(records, dtype=POSITION_DTYPE))))
+        return values.numpy()[:, 0], policies.numpy()
+
+    def _select_child(self, node: int) -> int:
+        """Pick the child maximizing Q + U."""
+        start = self.first_child[node]
+        end = start + self.num_children[node]
+        visits = self.visits[start:end]
+        q = np.divide(self.value_sum[start:end], visits, out=np.zeros_like(visits), where=visits > 0)
+        u = self.c_puct * self.prior[start:end] * math.sqrt(self.visits[node] + 1) / (1 + visits)
+        return int(start + np.argmax(q + u))
+
+    def _expand(self, node: int, moves: List[chess.Move], policy: np.ndarray, noise: bool):
+        """Create the children of a leaf with priors from the policy head."""
+        self._reserve(len(moves))
+        start = self.used
+        end = start + len(moves)
+        priors = policy[[move_to_index(move) for move in moves]]
+        total = priors.sum()
+        self.prior[start:end] = priors / total if total > 0 else 1.0 / len(moves)
+        self.move[start:end] = [encode_move(move) for move in moves]
+        self.visits[start:end] = 0
+        self.value_sum[start:end] = 0
+        self.state[start:end] = UNEXPANDED
+        self.first_child[node] = start
+        self.num_children[node] = len(moves)
+        self.state[node] = EXPANDED
+        self.used = end
+        if noise:
+            self._add_noise(node)
+
+    def _add_noise(self, node: int):
+        """Mix Dirichlet noise into a node's priors (exploration for self-play)."""
+        if self.dirichlet_alpha <= 0 or self.state[node] != EXPANDED:
+            return
+        start = self.first_child[node]
+        end = start + self.num_children[node]
+        dirichlet = np.random.dirichlet([self.dirichlet_alpha] * (end - start))
+        self.prior[start:end] = ((1 - self.dirichlet_fraction) * self.prior[start:end]
+                                 + self.dirichlet_fraction * dirichlet)
+
+    def _backup(self, path: List[int], value: float):
+        """Add a leaf value (for the side to move at the leaf) along the path."""
+        for node in reversed(path):
+            # Each node stores results for the player who moved into it
+            value = -value
+            self.value_sum[node] += value
+            self.visits[node] += 1
+
+    def _terminal_value(self, board: chess.Board) -> Optional[float]:
+        """Value for the side to move if the game is over, else None."""
+        if board.is_checkmate():
+            return -1.0
+        if (board.is_stalemate() or board.is_insufficient_material()
+                or board.is_fifty_moves() or board.is_repetition(3)):
+            return 0.0
+        return None
+
+    def _gather(self, board: chess.Board) -> List[Tuple[List[int], List[chess.Move], tuple]]:
+        """Select up to batch_size distinct leaves, applying virtual loss along each path."""
+        pending = []
+        leaves = set()
+        for _ in range(self.batch_size):
+            node, path, depth = self.root, [self.root], 0
+            while self.state[node] == EXPANDED:
+                node = self._select_child(node)
+                board.push(decode_move(int(self.move[node])))
+                path.append(node)
+                depth += 1
+
+            if self.state[node] == UNEXPANDED and node != self.root:
+                value = self._terminal_value(board)
+                if value is not None:
+                    self.state[node] = TERMINAL
+                    self.terminal_value[node] = value
+
+            if self.state[node] == TERMINAL:
+                self._backup(path, float(self.terminal_value[node]))
+                self.playouts += 1
+            elif node in leaves:
+                # Collision: the batch is as wide as the tree allows right now
+                for _ in range(depth):
+                    board.pop()
+                break
+            else:
+                leaves.add(node)
+                self.visits[path] += self.virtual_loss
+                self.value_sum[path] -= self.virtual_loss
+                pending.append((path, list(board.legal_moves), encode_position(board)))
+            for _ in range(depth):
+                board.pop()
+        return pending
+
+    def search(self, board: chess.Board, nodes: Optional[int] = None,
+               time_limit: Optional[float] = None) -> Optional[chess.Move]:
+        """Run playouts from the position until the node or time budget is spent."""
+        if board.is_game_over():
+            return None
+        start = time.perf_counter()
+        deadline = start + time_limit if time_limit else math.inf
+        budget = nodes or self.nodes
+
+        self._sync(board)
+        if self.state[self.root] == TERMINAL:
+            # A claimable draw (repetition, fifty moves) ends the line as a
+            # node, but at the root the side to move still has to play
+            self.state[self.root] = UNEXPANDED
+        self._add_noise(self.root)
+        reused = int(self.visits[self.root])
+        self.playouts = 0
+        batches = 0
+        search_board = self.board.copy()
+        while self.playouts < budget and time.perf_counter() < deadline:
+            pending = self._gather(search_board)
+            if not pending:
+                continue
+            values, policies = self._evaluate([record for _, _, record in pending])
+            batches += 1
+            for (path, moves, _), value, policy in zip(pending, values.tolist(), policies):
+                self.visits[path] -= self.virtual_loss
+                self.value_sum[path] += self.virtual_loss
+                self._expand(path[-1], moves, policy, noise=path[-1] == self.root)
+                self._backup(path, value)
+                self.playouts += 1
+
+        if self.state[self.root] != EXPANDED:
+            # The time limit ran out before the first playout
+            return None
+        start_child = self.first_child[self.root]
+        children = slice(start_child, start_child + self.num_children[self.root])
+        best = start_child + int(np.argmax(self.visits[children]))
+        best_move = decode_move(int(self.move[best]))
+
+        elapsed = time.perf_counter() - start
+        self.last_search = {
+            'playouts': self.playouts,
+            'reused': reused,
+            'batches': batches,
+            'tree_size': self.used,
+            'time': elapsed,
+            'playouts_per_second': self.playouts / max(elapsed, 1e-9),
+            'value': float(self.value_sum[best] / max(self.visits[best], 1)),
+        }
+        logger.debug(f"MCTS: {best_move} after {self.playouts} playouts (+{reused} reused) "
+                     f"in {batches} batches ({self.last_search['playouts_per_second']:.0f} playouts/s)")
+        return best_move
+
+    def visit_distribution(self) -> Dict[chess.Move, int]:
+        """Visit counts of the root's children from the last search."""
+        start = self.first_child[self.root]
+        count = self.num_children[self.root] if self.state[self.root] == EXPANDED else 0
+        return {decode_move(int(self.move[start + i])): int(self.visits[start + i])
+                for i in range(count)}
@@ -0,0 +1,224 @@
+"""
+Neural Search - In-process alpha-beta search driven by ChessNet
+
+Iterative deepening negamax with a Zobrist transposition table. Moves are
+ordered by the policy head; the children of every depth-1 node are encoded
+together and evaluated by the value head in one batched forward pass.
+"""
+
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import chess
+import chess.polyglot
+import numpy as np
+import torch
+from loguru import logger
+
+from ..learning.position_codec import POSITION_DTYPE, decode_features, encode_position, move_to_index
+
+# Network values are in [-1, 1]; mates score beyond that, sooner mates higher
+MATE_SCORE = 10.0
+MATE_PLY_PENALTY = 0.01
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Policy moves remembered per evaluated position, for move ordering
+POLICY_TOP_K = 16
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget is spent."""
+
+
+class NeuralSearch:
+    """Alpha-beta searcher that evaluates positions with a ChessNet model."""
+
+    def __init__(self, model, max_depth: Optional[int] = None, tt_size: int = 1_000_000,
+                 eval_cache_size: int = 500_000):
+        self.model = model
+        self.max_depth = max_depth or int(os.getenv('SEARCH_MAX_DEPTH', '8'))
+        self.tt_size = tt_size
+        self.eval_cache_size = eval_cache_size
+        # zobrist -> (depth, score, flag, best move)
+        self.tt: Dict[int, Tuple[int, float, int, Optional[chess.Move]]] = {}
+        # zobrist -> (value for the side to move, top policy move indices)
+        self.evals: Dict[int, Tuple[float, np.ndarray]] = {}
+        self.deadline = 0.0
+        self.next_check = 0
+        self.nodes = 0
+        self.evaluated = 0
+        self.batches = 0
+        self.last_search: Dict[str, float] = {}
+
+    def evaluate_batch(self, records: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Run the network on encoded positions; returns (values, top policy indices)."""
+        self.model.eval()
+        with torch.no_grad():
+            values, policies = self.model(torch.from_numpy(decode_features(records)))
+        policies = policies.numpy()
+        top = np.argpartition(policies, -POLICY_TOP_K, axis=1)[:, -POLICY_TOP_K:]
+        order = np.argsort(-np.take_along_axis(policies, top, axis=1), axis=1)
+        self.evaluated += len(records)
+        self.batches += 1
+        return values.numpy()[:, 0], np.take_along_axis(top, order, axis=1).astype(np.uint16)
+
+    def _store_evals(self, keys: List[int], records: List[tuple]) -> List[float]:
+        """Evaluate positions in one batch, cache the results and return the values."""
+        if not records:
+            return []
+        if len(self.evals) + len(records) > self.eval_cache_size:
+            self.evals.clear()
+        values, tops = self.evaluate_batch(np.array(records, dtype=POSITION_DTYPE))
+        values = values.tolist()
+        for key, value, top in zip(keys, values, tops):
+            self.evals[key] = (value, top)
+        return values
+
+    def _ordered_moves(self, board: chess.Board, key: int,
+                       tt_move: Optional[chess.Move]) -> List[chess.Move]:
+        """Order moves: transposition table move, then policy rank, then captures."""
+        cached = self.evals.get(key)
+        if cached is None:
+            self._store_evals([key], [encode_position(board, key=key)])
+            cached = self.evals[key]
+        ranks = {index: rank for rank, index in enumerate(cached[1].tolist())}
+
+        def sort_key(move: chess.Move):
+            return (move != tt_move,
+                    ranks.get(move_to_index(move), POLICY_TOP_K),
+                    not board.is_capture(move))
+        return sorted(board.legal_moves, key=sort_key)
+
+    def _check_time(self):
+        if time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+    def _frontier(self, board: chess.Board, moves: List[chess.Move],
+                  ply: int) -> Tuple[float, chess.Move]:
+        """Score a depth-1 node by evaluating all of its children in one batch."""
+        scores: List[Optional[float]] = []
+        keys, records = [], []
+        for move in moves:
+            board.push(move)
+            if board.is_checkmate():
+                scores.append(MATE_SCORE - (ply + 1) * MATE_PLY_PENALTY)
+            elif board.is_stalemate() or board.is_insufficient_material() or board.is_repetition(2):
+                scores.append(0.0)
+            else:
+                key = chess.polyglot.zobrist_hash(board)
+                cached = self.evals.get(key)
+                if cached is not None:
+                    scores.append(-cached[0])
+                else:
+                    scores.append(None)
+                    keys.append(key)
+                    records.append(encode_position(board, key=key))
+            board.pop()
+        self.nodes += len(moves)
+
+        child_values = iter(self._store_evals(keys, records))
+        best_score, best_move = -MATE_SCORE * 2, moves[0]
+        for move, score in zip(moves, scores):
+            if score is None:
+                score = -next(child_values)
+            if score > best_score:
+                best_score, best_move = score, move
+        return best_score, best_move
+
+    def _negamax(self, board: chess.Board, depth: int, alpha: float, beta: float,
+                 ply: int) -> float:
+        """Fail-soft negamax alpha-beta; scores are for the side to move."""
+        self.nodes += 1
+        if self.nodes >= self.next_check:
+            self.next_check = self.nodes + 256
+            self._check_time()
+        if ply > 0 and (board.is_repetition(2) or board.is_fifty_moves()
+                        or board.is_insufficient_material()):
+            return 0.0
+
+        key = chess.polyglot.zobrist_hash(board)
+        alpha_original = alpha
+        tt_move = None
+        entry = self.tt.get(key)
+        if entry is not None:
+            entry_depth, entry_score, flag, tt_move = entry
+            if entry_depth >= depth and ply > 0:
+                if flag == EXACT:
+                    return entry_score
+                if flag == LOWER:
+                    alpha = max(alpha, entry_score)
+                elif flag == UPPER:
+                    beta = min(beta, entry_score)
+                if alpha >= beta:
+                    return entry_score
+
+        moves = self._ordered_moves(board, key, tt_move)
+        if not moves:
+            return -(MATE_SCORE - ply * MATE_PLY_PENALTY) if board.is_check() else 0.0
+
+        if depth <= 1:
+            best_score, best_move = self._frontier(board, moves, ply)
+        else:
+            best_score, best_move = -MATE_SCORE * 2, moves[0]
+            for move in moves:
+                board.push(move)
+                score = -self._negamax(board, depth - 1, -beta, -alpha, ply + 1)
+                board.pop()
+                if score > best_score:
+                    best_score, best_move = score, move
+                alpha = max(alpha, score)
+                if alpha >= beta:
+                    break
+
+        if best_score <= alpha_original:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        if len(self.tt) >= self.tt_size:
+            self.tt.clear()
+        self.tt[key] = (depth, best_score, flag, best_move)
+        return best_score
+
+    def search(self, board: chess.Board, time_limit: float = 1.0,
+               max_depth: Optional[int] = None) -> Optional[chess.Move]:
+        """Search the position with iterative deepening until the time runs out."""
+        start = time.perf_counter()
+        self.deadline = start + time_limit
+        self.nodes = self.evaluated = self.batches = self.next_check = 0
+        best_move, best_score, completed_depth = None, 0.0, 0
+
+        for depth in range(1, (max_depth or self.max_depth) + 1):
+            try:
+                score = self._negamax(board, depth, -MATE_SCORE * 2, MATE_SCORE * 2, 0)
+            except SearchTimeout:
+                break
+            entry = self.tt.get(chess.polyglot.zobrist_hash(board))
+            if entry is None or entry[3] is None:
+                break
+            best_move, best_score, completed_depth = entry[3], score, depth
+            if abs(score) >= MATE_SCORE - depth * MATE_PLY_PENALTY or time.perf_counter() > self.deadline:
+                break
+
+        if best_move is None and not board.is_game_over():
+            # Not even depth 1 finished in time: fall back to the policy's favourite
+            key = chess.polyglot.zobrist_hash(board)
+            best_move = self._ordered_moves(board, key, None)[0]
+
+        elapsed = time.perf_counter() - start
+        self.last_search = {
+            'depth': completed_depth,
+            'score': best_score,
+            'nodes': self.nodes,
+            'evaluated': self.evaluated,
+            'batches': self.batches,
+            'time': elapsed,
+            'nps': self.nodes / max(elapsed, 1e-9),
+        }
+        logger.debug(f"Neural search: {best_move} depth {completed_depth} score {best_score:.3f} "
+                     f"nodes {self.nodes} ({self.last_search['nps']:.0f} nps, "
+                     f"{self.evaluated} evals in {self.batches} batches)")
+        return best_move
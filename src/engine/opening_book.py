@@ -0,0 +1,163 @@
+"""
+Opening Book - Local opening book lookups
+
+Builds compact Polyglot books from our PGN corpus and serves book moves
+through memory-mapped binary search, with no network and no engine time.
+"""
+
+import os
+import random
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import chess
+import chess.pgn
+import chess.polyglot
+from loguru import logger
+
+ENTRY_STRUCT = chess.polyglot.ENTRY_STRUCT
+MAX_WEIGHT = 0xFFFF
+
+
+def encode_move(board: chess.Board, move: chess.Move) -> int:
+    """Encode a move in the raw Polyglot format (castling is king takes rook)."""
+    to_square = move.to_square
+    if board.is_castling(move):
+        rook_file = 7 if board.is_kingside_castling(move) else 0
+        to_square = chess.square(rook_file, chess.square_rank(move.from_square))
+    promotion = move.promotion - 1 if move.promotion else 0
+    return to_square | (move.from_square << 6) | (promotion << 12)
+
+
+class OpeningBookBuilder:
+    """Builds a Polyglot book from PGN games, indexed by Zobrist key."""
+
+    def __init__(self, max_ply: int = 24, min_games: int = 2):
+        self.max_ply = max_ply
+        self.min_games = min_games
+        self.games_added = 0
+        # key -> raw move -> [games, weight]
+        self.positions: Dict[int, Dict[int, List[int]]] = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+
+    def add_game(self, game: chess.pgn.Game):
+        """Add the opening moves of a game to the book."""
+        result = game.headers.get("Result", "*")
+        board = game.board()
+        for ply, move in enumerate(game.mainline_moves()):
+            if ply >= self.max_ply:
+                break
+            # Polyglot convention: 2 points for a win, 1 for a draw
+            if result == "1/2-1/2":
+                score = 1
+            elif (result == "1-0" and board.turn == chess.WHITE) or \
+                 (result == "0-1" and board.turn == chess.BLACK):
+                score = 2
+            else:
+                score = 0
+            stats = self.positions[chess.polyglot.zobrist_hash(board)][encode_move(board, move)]
+            stats[0] += 1
+            stats[1] += score
+            board.push(move)
+        self.games_added += 1
+
+    def add_pgn(self, pgn_path: str, min_elo: int = 0, max_games: Optional[int] = None) -> int:
+        """Add every game of a PGN file, optionally filtered by rating."""
+        added = 0
+        with open(pgn_path, encoding="utf-8", errors="ignore") as pgn:
+            while max_games is None or added < max_games:
+                game = chess.pgn.read_game(pgn)
+                if game is None:
+                    break
+                try:
+                    white_elo = int(game.headers.get("WhiteElo", 0))
+                    black_elo = int(game.headers.get("BlackElo", 0))
+                except ValueError:
+                    continue
+                if white_elo < min_elo or black_elo < min_elo:
+                    continue
+                self.add_game(game)
+                added += 1
+        logger.info(f"Added {added} games from {pgn_path} to the opening book")
+        return added
+
+    def write(self, book_path: str) -> int:
+        """Write the book as a sorted Polyglot .bin file and return the entry count."""
+        entries = []
+        for key, moves in self.positions.items():
+            candidates = [(raw_move, weight) for raw_move, (games, weight) in moves.items()
+                          if games >= self.min_games and weight > 0]
+            if not candidates:
+                continue
+            # Scale per position so the best move fits in 16 bits
+            top = max(weight for _, weight in candidates)
+            scale = MAX_WEIGHT / top if top > MAX_WEIGHT else 1.0
+            for raw_move, weight in candidates:
+                entries.append((key, max(1, int(weight * scale)), raw_move))
+
+        entries.sort(key=lambda entry: (entry[0], -entry[1]))
+
+        Path(book_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(book_path, "wb") as f:
+            for key, weight, raw_move in entries:
+                f.write(ENTRY_STRUCT.pack(key, raw_move, weight, 0))
+
+        logger.info(f"Opening book written to {book_path} ({len(entries)} entries)")
+        return len(entries)
+
+
+class OpeningBook:
+    """Serves book moves from one or more memory-mapped Polyglot files."""
+
+    def __init__(self, book_paths: Optional[List[str]] = None):
+        if book_paths is None:
+            book_paths = os.getenv('OPENING_BOOK_PATH', 'data/books/sophie.bin').split(os.pathsep)
+        self.book_paths = [path for path in book_paths if path]
+        self.readers = []
+        self.lookups = 0
+        self.hits = 0
+
+    def open(self):
+        """Open every book file that exists on disk."""
+        for path in self.book_paths:
+            if not Path(path).exists():
+                logger.info(f"Opening book not found: {path}")
+                continue
+            try:
+                self.readers.append(chess.polyglot.open_reader(path))
+                logger.info(f"Opening book loaded from {path}")
+            except Exception as e:
+                logger.error(f"Failed to load opening book {path}: {e}")
+
+    def is_ready(self) -> bool:
+        """Check if at least one book is loaded."""
+        return bool(self.readers)
+
+    def get_moves(self, board: chess.Board) -> List[Tuple[chess.Move, int]]:
+        """Return (move, weight) pairs for the position from the first book that knows it."""
+        for reader in self.readers:
+            moves = [(entry.move, entry.weight) for entry in reader.find_all(board)]
+            if moves:
+                return moves
+        return []
+
+    def get_move(self, board: chess.Board, weighted: bool = True) -> Optional[chess.Move]:
+        """Pick a book move, either weighted at random or the heaviest one."""
+        if not self.readers:
+            return None
+
+        self.lookups += 1
+        moves = self.get_moves(board)
+        if not moves:
+            return None
+        self.hits += 1
+
+        if not weighted:
+            return max(moves, key=lambda item: item[1])[0]
+        return random.choices([move for move, _ in moves], weights=[weight for _, weight in moves])[0]
+
+    def close(self):
+        """Close all book files."""
+        for reader in self.readers:
+            reader.close()
+        self.readers = []
@@ -6,11 +6,19 @@ Controls interactions with the Stockfish engine for move generation and evaluati
 
 import chess
 import asyncio
+import time
 from loguru import logger
-from typing import Optional
+from typing import AsyncIterator, Iterable, Optional, Tuple, Union
 import chess.engine
 import os
 
+from .. import metrics
+from .tablebase import SyzygyTablebase
+
+# Shared by every labeling search so the engine never receives ucinewgame
+# between positions and keeps its hash table
+LABELING_GAME = object()
+
 
 class StockfishEngine:
     """Handles interaction with the Stockfish chess engine."""
@@ -18,6 +26,9 @@ class StockfishEngine:
     def __init__(self):
         self.engine_path = os.getenv('STOCKFISH_PATH', 'stockfish')
         self.engine = None
+        self.tablebase = SyzygyTablebase()
+        self.label_nodes = int(os.getenv('LABEL_NODES', '2000'))
+        self.label_depth = int(os.getenv('LABEL_DEPTH', '0')) or None
     
     async def initialize(self):
         """Initialize the Stockfish engine."""
@@ -26,14 +37,24 @@ class StockfishEngine:
             
             self.engine = await chess.engine.popen_uci(self.engine_path)
             logger.info("Stockfish engine initialized")
+            
+            self.tablebase.open()
+            metrics.register_collector('tablebase', self._tablebase_metrics)
         except Exception as e:
             logger.error(f"Failed to initialize Stockfish engine: {e}")
             raise
     
     async def get_best_move(self, board: chess.Board, time_limit: float = 1.0) -> Optional[chess.Move]:
         """Get the best move for a given chess position."""
+        tablebase_move = self.get_tablebase_move(board)
+        if tablebase_move is not None:
+            return tablebase_move
+        
         try:
-            result = await self.engine.play(board, chess.engine.Limit(time=time_limit))
+            with metrics.span('sophie_engine_seconds', op='play'):
+                result = await self.engine.play(board, chess.engine.Limit(time=time_limit),
+                                                info=chess.engine.INFO_BASIC)
+            metrics.inc('sophie_engine_nodes_total', result.info.get('nodes', 0), op='play')
             # Garante que retorna apenas o objeto chess.Move
             if hasattr(result, 'move') and result.move is not None:
                 return result.move
@@ -46,15 +67,77 @@ class StockfishEngine:
     
     async def evaluate_position(self, board: chess.Board) -> float:
         """Evaluate the given board position."""
+        tablebase_score = self.tablebase.evaluate(board)
+        if tablebase_score is not None:
+            return tablebase_score
+        
         try:
-            info = await self.engine.analyse(board, chess.engine.Limit(depth=20))
+            with metrics.span('sophie_engine_seconds', op='evaluate'):
+                info = await self.engine.analyse(board, chess.engine.Limit(depth=20))
+            metrics.inc('sophie_engine_nodes_total', info.get('nodes', 0), op='evaluate')
             return info['score'].relative.score(mate_score=10000) / 100.0
         except Exception as e:
             logger.error(f"Error evaluating position: {e}")
             return 0.0
     
+    async def label_positions(self, positions: Iterable[Union[str, chess.Board]],
+                              nodes: Optional[int] = None, depth: Optional[int] = None,
+                              log_every: int = 10000) -> AsyncIterator[Tuple[chess.Board, float]]:
+        """
+        Evaluate a stream of FENs or boards with a small search budget,
+        yielding (board, evaluation in pawns for the side to move).
+        
+        One engine session is reused without ucinewgame, so related positions
+        (e.g. consecutive plies of a game) benefit from the hash table.
+        """
+        if depth is None and nodes is None:
+            # LABEL_DEPTH replaces the node budget rather than adding to it
+            depth = self.label_depth
+            nodes = None if depth else self.label_nodes
+        limit = chess.engine.Limit(nodes=nodes, depth=depth)
+        
+        labeled = 0
+        start = time.perf_counter()
+        for position in positions:
+            board = chess.Board(position) if isinstance(position, str) else position
+            score = self.tablebase.evaluate(board)
+            if score is None:
+                info = await self.engine.analyse(board, limit, game=LABELING_GAME,
+                                                 info=chess.engine.INFO_SCORE | chess.engine.INFO_BASIC)
+                metrics.inc('sophie_engine_nodes_total', info.get('nodes', 0), op='label')
+                score = info['score'].relative.score(mate_score=10000) / 100.0
+            labeled += 1
+            if log_every and labeled % log_every == 0:
+                elapsed = time.perf_counter() - start
+                logger.info(f"Labeled {labeled} positions ({labeled / elapsed:.0f} positions/s)")
+            yield board, score
+        
+        elapsed = time.perf_counter() - start
+        if labeled:
+            logger.info(f"Labeled {labeled} positions in {elapsed:.1f}s "
+                        f"({labeled / max(elapsed, 1e-9):.0f} positions/s, {limit})")
+    
+    def _tablebase_metrics(self):
+        """Tablebase counters for the metrics endpoint."""
+        return [
+            ('sophie_tablebase_probes_total', 'counter', {}, self.tablebase.probes),
+            ('sophie_tablebase_hits_total', 'counter', {}, self.tablebase.hits),
+            ('sophie_tablebase_cache_hits_total', 'counter', {}, self.tablebase.cache_hits),
+        ]
+    
+    def get_tablebase_move(self, board: chess.Board) -> Optional[chess.Move]:
+        """Get the tablebase move if the position is covered by Syzygy tables."""
+        try:
+            return self.tablebase.get_best_move(board)
+        except Exception as e:
+            logger.error(f"Error probing tablebase: {e}")
+            return None
+    
     async def shutdown(self):
         """Shut down the Stockfish engine."""
+        if self.tablebase.is_ready():
+            logger.info(f"Tablebase stats: {self.tablebase.get_stats()}")
+        self.tablebase.close()
         if self.engine:
             await self.engine.quit()
             logger.info("Stockfish engine shut down")
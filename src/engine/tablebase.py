@@ -0,0 +1,147 @@
+"""
+Syzygy Tablebase - Perfect endgame play from local tablebase files
+
+Probes WDL/DTZ tables through chess.syzygy so simple endgames are resolved
+without model inference or Stockfish searches.
+"""
+
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import chess
+import chess.polyglot
+import chess.syzygy
+from loguru import logger
+
+# Tablebase wins are reported just below the engine's mate score (10000 cp)
+TABLEBASE_WIN_SCORE = 90.0
+
+
+class SyzygyTablebase:
+    """Probes Syzygy tablebases with a small LRU cache of results."""
+
+    def __init__(self, path: Optional[str] = None, cache_size: int = 65536):
+        self.path = path or os.getenv('SYZYGY_PATH', 'data/syzygy')
+        self.cache_size = cache_size
+        self.cache: "OrderedDict[int, Optional[Tuple[int, int]]]" = OrderedDict()
+        self.tablebase = None
+        self.max_pieces = 0
+
+        self.probes = 0
+        self.hits = 0
+        self.cache_hits = 0
+
+    def open(self):
+        """Open every tablebase directory that exists on disk."""
+        for directory in self.path.split(os.pathsep):
+            if not directory or not Path(directory).is_dir():
+                continue
+            if self.tablebase is None:
+                self.tablebase = chess.syzygy.open_tablebase(directory)
+            else:
+                self.tablebase.add_directory(directory)
+
+        if self.tablebase is None or not self.tablebase.wdl:
+            logger.info(f"No Syzygy tablebases found at {self.path}")
+            return
+
+        # Table names look like "KRPvKR": every letter but the "v" is a piece
+        self.max_pieces = max(len(name) - 1 for name in self.tablebase.wdl)
+        logger.info(f"Syzygy tablebases loaded from {self.path} (up to {self.max_pieces} pieces)")
+
+    def is_ready(self) -> bool:
+        """Check if any tables are loaded."""
+        return self.max_pieces > 0
+
+    def covers(self, board: chess.Board) -> bool:
+        """Check if the position is within range of the loaded tables."""
+        return (self.max_pieces > 0
+                and chess.popcount(board.occupied) <= self.max_pieces
+                and not board.castling_rights)
+
+    def probe(self, board: chess.Board) -> Optional[Tuple[int, int]]:
+        """Return (wdl, dtz) for the side to move, or None if no table answers."""
+        if not self.covers(board):
+            return None
+
+        self.probes += 1
+        key = chess.polyglot.zobrist_hash(board)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.cache_hits += 1
+            result = self.cache[key]
+        else:
+            try:
+                result = (self.tablebase.probe_wdl(board), self.tablebase.probe_dtz(board))
+            except KeyError:
+                result = None
+            self.cache[key] = result
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+        if result is not None:
+            self.hits += 1
+        return result
+
+    def evaluate(self, board: chess.Board) -> Optional[float]:
+        """Evaluate the position in pawns for the side to move."""
+        result = self.probe(board)
+        if result is None:
+            return None
+        wdl, _ = result
+        # Cursed wins and blessed losses are draws under the 50-move rule
+        if wdl == 2:
+            return TABLEBASE_WIN_SCORE
+        if wdl == -2:
+            return -TABLEBASE_WIN_SCORE
+        return 0.0
+
+    def get_best_move(self, board: chess.Board) -> Optional[chess.Move]:
+        """Pick the DTZ-optimal move, or None if the position is not fully covered."""
+        if not self.covers(board):
+            return None
+
+        best_move = None
+        best_rank = None
+        for move in board.legal_moves:
+            zeroing = board.is_zeroing(move)
+            child = board.copy(stack=False)
+            child.push(move)
+            if child.is_checkmate():
+                return move
+
+            result = self.probe(child)
+            if result is None:
+                return None
+            child_wdl, child_dtz = result
+            wdl = -child_wdl
+
+            # Winning: convert as fast as possible. Losing: resist as long as possible.
+            if wdl > 0:
+                rank = (wdl, 0 if zeroing else -abs(child_dtz))
+            elif wdl < 0:
+                rank = (wdl, 0 if zeroing else abs(child_dtz))
+            else:
+                rank = (wdl, 0)
+
+            if best_rank is None or rank > best_rank:
+                best_move, best_rank = move, rank
+
+        return best_move
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return probe counters."""
+        return {
+            'probes': self.probes,
+            'hits': self.hits,
+            'cache_hits': self.cache_hits,
+        }
+
+    def close(self):
+        """Close the tablebase files."""
+        if self.tablebase is not None:
+            self.tablebase.close()
+            self.tablebase = None
+        self.max_pieces = 0
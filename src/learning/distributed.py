@@ -0,0 +1,157 @@
+"""
+Distributed Training - Data-parallel ChessTrainer over torch.distributed
+
+Every process trains a replica of ChessNet on its own slice of the
+positions (DistributedSampler) and DistributedDataParallel all-reduces the
+gradients with gloo during backward, so all replicas take identical
+optimizer steps on CPU. Only rank 0 writes checkpoints. Processes are
+spawned locally; several machines join through a rendezvous address
+(MASTER_ADDR/MASTER_PORT), or the worker can be started by torchrun.
+"""
+
+import os
+import socket
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from loguru import logger
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data.distributed import DistributedSampler
+
+from ..config import get_section
+from .neural_network import ChessNet, ChessTrainer, checkpoint_hidden_size
+from .position_codec import POSITION_DTYPE, decode_features, load_shard, shard_paths
+
+
+class ShardedRecords:
+    """Random access over several record arrays (memory-mapped shards) as one dataset."""
+
+    def __init__(self, arrays: List[np.ndarray]):
+        self.arrays = [array for array in arrays if len(array)]
+        self.offsets = np.cumsum([0] + [len(array) for array in self.arrays])
+
+    @classmethod
+    def from_path(cls, path: str) -> 'ShardedRecords':
+        """A shard directory (scripts/pgn_to_positions.py) or a single .bin file."""
+        paths = shard_paths(path) if os.path.isdir(path) else [path]
+        return cls([load_shard(shard) for shard in paths])
+
+    def __len__(self) -> int:
+        return int(self.offsets[-1])
+
+    def take(self, indices: np.ndarray) -> np.ndarray:
+        """Gather records by global index (sorted first so shard reads stay sequential)."""
+        indices = np.sort(indices)
+        shards = np.searchsorted(self.offsets, indices, side='right') - 1
+        records = np.empty(len(indices), dtype=POSITION_DTYPE)
+        for shard in np.unique(shards):
+            mask = shards == shard
+            records[mask] = self.arrays[shard][indices[mask] - self.offsets[shard]]
+        return records
+
+
+def train_worker(local_rank: int, options: Dict[str, Any]):
+    """One training process; options come from launch()."""
+    rank = options['rank_offset'] + local_rank
+    world_size = options['world_size']
+    torch.set_num_threads(options['threads'])
+    dist.init_process_group('gloo', init_method=f"tcp://{options['master_addr']}:{options['master_port']}",
+                            rank=rank, world_size=world_size)
+
+    try:
+        data = ShardedRecords.from_path(options['data'])
+        initial_model = options.get('initial_model')
+        model = ChessNet(hidden_size=checkpoint_hidden_size(initial_model) if initial_model else 512)
+        trainer = ChessTrainer(model, learning_rate=options['learning_rate'])
+        if initial_model and Path(initial_model).exists():
+            trainer.load_model(initial_model)
+        # Replicas start from rank 0's weights; train_step now all-reduces gradients
+        trainer.model = DistributedDataParallel(model)
+
+        # Padded so every rank runs the same number of steps (a missing all-reduce would hang)
+        sampler = DistributedSampler(data, num_replicas=world_size, rank=rank,
+                                     shuffle=True, seed=options['seed'])
+        batch_size = options['batch_size']
+        for epoch in range(options['epochs']):
+            sampler.set_epoch(epoch)
+            indices = np.fromiter(iter(sampler), dtype=np.int64)
+            start = time.perf_counter()
+            totals = torch.zeros(3, dtype=torch.float64)
+            trainer.model.train()
+            for offset in range(0, len(indices), batch_size):
+                records = data.take(indices[offset:offset + batch_size])
+                value_loss, policy_loss = trainer.train_step(
+                    torch.from_numpy(decode_features(records)),
+                    records['value'].astype(np.float32), records['move'].astype(np.int64))
+                totals += torch.tensor([value_loss, policy_loss, 1.0], dtype=torch.float64)
+
+            dist.all_reduce(totals)
+            if rank == 0:
+                elapsed = time.perf_counter() - start
+                batches = max(totals[2].item(), 1.0)
+                logger.info(f"Epoch {epoch + 1}/{options['epochs']} - "
+                            f"Value Loss: {totals[0].item() / batches:.4f}, "
+                            f"Policy Loss: {totals[1].item() / batches:.4f} "
+                            f"({len(indices) * world_size / elapsed:.0f} positions/s on {world_size} processes)")
+
+        trainer.model = model
+        if rank == 0:
+            Path(options['save_path']).parent.mkdir(parents=True, exist_ok=True)
+            trainer.save_model(options['save_path'])
+        dist.barrier()
+    finally:
+        dist.destroy_process_group()
+
+
+def free_port(host: str = '127.0.0.1') -> int:
+    """A TCP port nothing listens on right now, for a single-machine rendezvous."""
+    with socket.socket() as s:
+        s.bind((host, 0))
+        return s.getsockname()[1]
+
+
+def launch(data: str, save_path: str, procs: Optional[int] = None, nodes: int = 1, node_rank: int = 0,
+           master_addr: Optional[str] = None, master_port: Optional[int] = None, epochs: int = 1,
+           batch_size: int = 1024, learning_rate: float = 0.001,
+           initial_model: Optional[str] = None, seed: int = 0):
+    """
+    Train on `data` (shard directory or .bin file) with `procs` processes on
+    this machine (TRAIN_PROCS, default one per core) out of `nodes` machines,
+    and save the result to save_path. batch_size is per process. Unset
+    options come from the environment, then config.yaml's learning.distributed.
+    """
+    config = get_section('learning').get('distributed') or {}
+    procs = procs or int(os.getenv('TRAIN_PROCS', config.get('procs', 0))) or os.cpu_count() or 1
+    options = {
+        'data': data,
+        'save_path': save_path,
+        'epochs': epochs,
+        'batch_size': batch_size,
+        'learning_rate': learning_rate,
+        'initial_model': initial_model,
+        'seed': seed,
+        'master_addr': master_addr or os.getenv('MASTER_ADDR', config.get('master_addr', '127.0.0.1')),
+        'master_port': master_port or int(os.getenv('MASTER_PORT', config.get('master_port', 29500))),
+        'world_size': nodes * procs,
+        'rank_offset': node_rank * procs,
+        'threads': max(1, (os.cpu_count() or 1) // procs),
+    }
+
+    if 'LOCAL_RANK' in os.environ and 'WORLD_SIZE' in os.environ:
+        # Started by torchrun: this process is one worker and the rendezvous is in the environment
+        local_rank = int(os.environ['LOCAL_RANK'])
+        options.update(world_size=int(os.environ['WORLD_SIZE']),
+                       rank_offset=int(os.environ['RANK']) - local_rank,
+                       threads=max(1, (os.cpu_count() or 1) // int(os.getenv('LOCAL_WORLD_SIZE', '1'))))
+        train_worker(local_rank, options)
+        return
+
+    logger.info(f"Distributed training: {procs} processes on node {node_rank + 1}/{nodes} "
+                f"({options['threads']} threads each), rendezvous "
+                f"{options['master_addr']}:{options['master_port']}")
+    mp.spawn(train_worker, args=(options,), nprocs=procs, join=True)
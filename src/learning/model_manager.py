@@ -7,20 +7,65 @@ Coordinates training, evaluation, and predictions for the chess model.
 import os
 import chess
 import asyncio
+from itertools import groupby
 from loguru import logger
-from typing import Optional
+from typing import List, Optional, Tuple
 import numpy as np
 from pathlib import Path
 
+from .. import metrics
+from ..config import get_section
+from ..database.exporter import PYARROW_AVAILABLE, GameExporter, load_training_rows
+from .position_codec import POSITION_DTYPE, encode_position
+
 try:
     import torch
-    from .neural_network import ChessNet, PositionEncoder, ChessTrainer
+    from .neural_network import ChessNet, PositionEncoder, ChessTrainer, checkpoint_hidden_size
+    from ..engine.neural_search import NeuralSearch
+    from ..engine.mcts import MCTS
+    from .distributed import free_port, launch
     PYTORCH_AVAILABLE = True
 except ImportError:
     logger.warning("PyTorch not available, using fallback implementation")
     PYTORCH_AVAILABLE = False
 
 
+RESULT_VALUES = {'win': 1.0, 'loss': -1.0, 'draw': 0.0}
+
+
+def _retraining_records(rows: List[Tuple]) -> np.ndarray:
+    """
+    Replay (game_id, ply, uci, evaluation, color, result) rows into records:
+    the position after each ply, labeled with the next move and the stored
+    evaluation (pawns for the side to move, /10 as in initial training),
+    or the game result when the ply was not evaluated. Games with a move
+    that does not replay are skipped.
+    """
+    records = []
+    for game_id, game_rows in groupby(rows, key=lambda row: row[0]):
+        game_rows = list(game_rows)
+        color, result = game_rows[0][4], game_rows[0][5]
+        bot_result = RESULT_VALUES.get(result, 0.0)
+        board = chess.Board()
+        game_records = []
+        try:
+            for (_, _, uci, evaluation, _, _), next_row in zip(game_rows, game_rows[1:]):
+                board.push_uci(uci)
+                if evaluation is not None:
+                    value = float(np.clip(evaluation / 10.0, -1.0, 1.0))
+                else:
+                    value = bot_result if (board.turn == chess.WHITE) == (color == 'white') else -bot_result
+                next_move = chess.Move.from_uci(next_row[2])
+                if not board.is_legal(next_move):
+                    raise chess.IllegalMoveError(f"illegal move {next_row[2]} at ply {next_row[1]}")
+                game_records.append(encode_position(board, next_move, value))
+        except ValueError as e:
+            logger.warning(f"Skipping game {game_id} for retraining: {e}")
+            continue
+        records.extend(game_records)
+    return np.array(records, dtype=POSITION_DTYPE)
+
+
 class ModelManager:
     """Manages the machine learning models used by the chess bot."""
     
@@ -29,7 +74,17 @@ class ModelManager:
         self.model = None
         self.encoder = None
         self.trainer = None
+        self.search = None
+        self.mcts = None
         self.model_path = "models/chess_model_initial.pth"
+        distributed = get_section('learning').get('distributed') or {}
+        self.retrain_positions = int(os.getenv('RETRAIN_POSITIONS', distributed.get('retrain_positions', 20000)))
+        self.retrain_epochs = int(os.getenv('RETRAIN_EPOCHS', distributed.get('retrain_epochs', 1)))
+        # Few processes: retraining runs next to the games being played
+        self.retrain_procs = int(os.getenv('RETRAIN_PROCS', distributed.get('retrain_procs', 2)))
+        # 'export' reads positions from the columnar export instead of SQLite
+        self.retrain_source = os.getenv('RETRAIN_SOURCE', distributed.get('retrain_source', 'database'))
+        self.retrain_path = "data/retrain/recent.bin"
     
     async def initialize(self):
         """Initialize the model manager."""
@@ -49,9 +104,11 @@ class ModelManager:
     async def _load_model(self):
         """Load the trained model from disk."""
         try:
-            self.model = ChessNet()
+            self.model = ChessNet(hidden_size=checkpoint_hidden_size(self.model_path))
             self.trainer = ChessTrainer(self.model)
             self.trainer.load_model(self.model_path)
+            self.search = NeuralSearch(self.model)
+            self.mcts = MCTS(self.model)
             logger.info(f"Model loaded from {self.model_path}")
         except Exception as e:
             logger.error(f"Failed to load model: {e}")
@@ -67,14 +124,15 @@ class ModelManager:
             return None
         
         try:
-            # Encode the board position
-            position_tensor = self.encoder.board_to_tensor(board)
-            position_tensor = self.encoder.add_game_state_features(board, position_tensor)
-            
-            # Get model prediction
-            self.model.eval()
-            with torch.no_grad():
-                value, policy = self.model(position_tensor.unsqueeze(0))
+            with metrics.span('sophie_model_inference_seconds', method='policy'):
+                # Encode the board position
+                position_tensor = self.encoder.board_to_tensor(board)
+                position_tensor = self.encoder.add_game_state_features(board, position_tensor)
+                
+                # Get model prediction
+                self.model.eval()
+                with torch.no_grad():
+                    value, policy = self.model(position_tensor.unsqueeze(0))
             
             # Convert policy to move probabilities
             legal_moves = list(board.legal_moves)
@@ -96,6 +154,49 @@ class ModelManager:
             logger.error(f"Error in move prediction: {e}")
             return None
     
+    async def search_move(self, board: chess.Board, time_limit: float = 1.0) -> Optional[chess.Move]:
+        """Search the position with the model-driven alpha-beta engine."""
+        if not self.is_model_ready():
+            return None
+        
+        try:
+            # The search is CPU bound; keep the event loop (and the game stream) responsive
+            with metrics.span('sophie_model_inference_seconds', method='search'):
+                move = await asyncio.to_thread(self.search.search, board.copy(), time_limit)
+            stats = self.search.last_search
+            metrics.inc('sophie_search_nodes_total', stats['nodes'], search='alphabeta')
+            metrics.inc('sophie_model_evaluations_total', stats['evaluated'], search='alphabeta')
+            logger.debug(f"Search move: {move} (depth {stats['depth']}, {stats['nps']:.0f} nps)")
+            return move
+        except Exception as e:
+            logger.error(f"Error in model search: {e}")
+            return None
+    
+    async def mcts_move(self, board: chess.Board, time_limit: Optional[float] = None) -> Optional[chess.Move]:
+        """
+        Pick a move with MCTS, stopping at MCTS_NODES playouts or the time
+        limit. The tree follows the game, so the reply reuses earlier work.
+        """
+        if not self.is_model_ready():
+            return None
+        
+        try:
+            with metrics.span('sophie_model_inference_seconds', method='mcts'):
+                move = await asyncio.to_thread(self.mcts.search, board.copy(), None, time_limit)
+            stats = self.mcts.last_search
+            metrics.inc('sophie_search_nodes_total', stats['playouts'], search='mcts')
+            logger.debug(f"MCTS move: {move} ({stats['playouts']} playouts, "
+                         f"{stats['playouts_per_second']:.0f} playouts/s)")
+            return move
+        except Exception as e:
+            logger.error(f"Error in MCTS: {e}")
+            return None
+    
+    def new_game(self):
+        """Forget search trees from the previous game."""
+        if self.mcts is not None:
+            self.mcts.reset()
+    
     async def update_model(self):
         """Update the model with new training data."""
         if not PYTORCH_AVAILABLE:
@@ -105,16 +206,41 @@ class ModelManager:
         logger.info("Updating the machine learning model with new data...")
         
         try:
-            # Get recent games from database
-            # This is a simplified example - in reality you'd implement
-            # proper data loading and training loops
+            # Most recent games first; RETRAIN_POSITIONS bounds the plies read
+            rows = await self._training_rows()
+            records = await asyncio.to_thread(_retraining_records, rows)
+            if not len(records):
+                logger.info("No recorded moves to train on yet")
+                return
+            
+            Path(self.retrain_path).parent.mkdir(parents=True, exist_ok=True)
+            records.tofile(self.retrain_path)
             
-            # For now, just log that we would update the model
-            logger.info("Model update completed (placeholder implementation)")
+            # Data-parallel on this machine, continuing from the current weights; a
+            # fresh port keeps it clear of other trainings (and of a previous run's socket)
+            procs = max(1, min(self.retrain_procs, os.cpu_count() or 1))
+            await asyncio.to_thread(launch, self.retrain_path, self.model_path, procs=procs,
+                                    master_addr='127.0.0.1', master_port=free_port(),
+                                    epochs=self.retrain_epochs, batch_size=256,
+                                    initial_model=self.model_path)
+            await self._load_model()
+            logger.info(f"Model updated on {len(records)} positions from recent games")
             
         except Exception as e:
             logger.error(f"Error updating model: {e}")
     
+    async def _training_rows(self) -> List[Tuple]:
+        """Recent (game_id, ply, uci, evaluation, color, result) rows to retrain on."""
+        if self.retrain_source == 'export' and PYARROW_AVAILABLE:
+            # Bring the export up to date, then read only the columns training needs
+            exporter = GameExporter(self.db_manager)
+            await exporter.export()
+            if not (exporter.output_dir / 'positions').exists():
+                return []
+            return await asyncio.to_thread(load_training_rows, self.retrain_positions,
+                                           str(exporter.output_dir.parent), exporter.fmt)
+        return await self.db_manager.get_training_positions(limit=self.retrain_positions)
+    
     async def evaluate_move(self, board: chess.Board, move: chess.Move) -> float:
         """Evaluate a specific move using the model."""
         if not self.is_model_ready():
@@ -4,19 +4,22 @@ Neural Network - Chess position evaluation and move prediction
 Implements neural networks for chess position evaluation and move selection.
 """
 
+import os
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 import numpy as np
 import chess
-from typing import List, Tuple
+from typing import List, Sequence, Tuple, Union
 from loguru import logger
 
+from .position_codec import INPUT_SIZE, POLICY_SIZE
+
 
 class ChessNet(nn.Module):
     """Neural network for chess position evaluation and move prediction."""
     
-    def __init__(self, input_size=768, hidden_size=512):
+    def __init__(self, input_size=INPUT_SIZE, hidden_size=512):
         super(ChessNet, self).__init__()
         
         # Position encoder layers
@@ -41,7 +44,7 @@ class ChessNet(nn.Module):
         self.policy_head = nn.Sequential(
             nn.Linear(hidden_size, 256),
             nn.ReLU(),
-            nn.Linear(256, 4096),  # Max possible moves in chess
+            nn.Linear(256, POLICY_SIZE),  # Max possible moves in chess
             nn.Softmax(dim=1)
         )
     
@@ -53,6 +56,14 @@ class ChessNet(nn.Module):
         return value, policy
 
 
+def checkpoint_hidden_size(filepath: str, default: int = 512) -> int:
+    """Hidden size of a saved ChessNet (sweeps may choose another); default without a file."""
+    if not os.path.exists(filepath):
+        return default
+    state = torch.load(filepath)['model_state_dict']
+    return int(state['position_encoder.0.weight'].shape[0])
+
+
 class PositionEncoder:
     """Encodes chess positions into numerical features for the neural network."""
     
@@ -113,16 +124,16 @@ class ChessTrainer:
         self.value_criterion = nn.MSELoss()
         self.policy_criterion = nn.CrossEntropyLoss()
         
-    def train_step(self, positions: List[torch.Tensor], 
-                  values: List[float], 
-                  moves: List[int]) -> Tuple[float, float]:
-        """Perform one training step."""
+    def train_step(self, positions: Union[List[torch.Tensor], torch.Tensor], 
+                  values: Sequence[float], 
+                  moves: Sequence[int]) -> Tuple[float, float]:
+        """Perform one training step on a list of position tensors or a stacked batch."""
         self.optimizer.zero_grad()
         
         # Prepare batch
-        batch_positions = torch.stack(positions)
-        batch_values = torch.tensor(values, dtype=torch.float32).unsqueeze(1)
-        batch_moves = torch.tensor(moves, dtype=torch.long)
+        batch_positions = positions if isinstance(positions, torch.Tensor) else torch.stack(positions)
+        batch_values = torch.as_tensor(values, dtype=torch.float32).reshape(-1, 1)
+        batch_moves = torch.as_tensor(moves, dtype=torch.long)
         
         # Forward pass
         predicted_values, predicted_policies = self.model(batch_positions)
@@ -0,0 +1,332 @@
+"""
+PGN Corpus - Fast scanning and parallel parsing of large PGN files
+
+Splits a PGN byte stream into games with a single regex scan, filters them
+on raw header lines without building python-chess objects, and parses only
+the accepted games across a process pool. Plain files are indexed by byte
+offset; .zst and .bz2 dumps are decompressed as a stream.
+"""
+
+import bz2
+import io
+import os
+import queue
+import re
+import shutil
+import subprocess
+import threading
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import chess.pgn
+from loguru import logger
+from tqdm import tqdm
+
+try:
+    import zstandard
+    ZSTANDARD_AVAILABLE = True
+except ImportError:
+    ZSTANDARD_AVAILABLE = False
+
+PGN_SUFFIXES = ('.pgn', '.pgn.zst', '.pgn.bz2')
+
+# External decompressors that use several cores, in order of preference
+PARALLEL_DECOMPRESSORS = {
+    '.bz2': (['lbzip2', '-dc'], ['pbzip2', '-dc']),
+    '.zst': (['pzstd', '-dc'],),
+}
+
+# A game starts at a header line that follows a blank line or a result token
+GAME_BOUNDARY = re.compile(
+    rb'(?:\n[ \t\r]*\n|(?:(?<=1-0)|(?<=0-1)|(?<=1/2)|(?<=\*))[ \t]*\r?\n)(?=\[)'
+)
+HEADER_LINE = re.compile(rb'^\[(\w+)\s+"(.*)"\]\s*$', re.MULTILINE)
+HEADERS_END = re.compile(rb'\n[ \t\r]*\n')
+
+# Boundaries split across two reads are found by rescanning this many bytes
+BOUNDARY_OVERLAP = 64
+
+
+class ReadAheadStream(io.RawIOBase):
+    """
+    Binary stream that reads (and decompresses) its source on a background
+    thread, keeping at most max_chunks blocks of read-ahead in memory.
+    """
+
+    def __init__(self, source: BinaryIO, chunk_size: int = 1 << 22, max_chunks: int = 8,
+                 process: Optional[subprocess.Popen] = None):
+        super().__init__()
+        self.source = source
+        self.chunk_size = chunk_size
+        self.process = process
+        self.chunks: "queue.Queue" = queue.Queue(maxsize=max_chunks)
+        self.leftover = b''
+        self.eof = False
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._produce, daemon=True)
+        self.thread.start()
+
+    def _produce(self):
+        """Read ahead until EOF; errors are handed to the consumer."""
+        try:
+            while not self.stopped.is_set():
+                chunk = self.source.read(self.chunk_size)
+                self._put(chunk)
+                if not chunk:
+                    break
+        except Exception as e:
+            self._put(e)
+
+    def _put(self, item):
+        """Block on the bounded queue, giving up if the stream is closed."""
+        while not self.stopped.is_set():
+            try:
+                self.chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        if not self.leftover and not self.eof:
+            item = self.chunks.get()
+            if isinstance(item, Exception):
+                raise item
+            self.leftover = item
+            self.eof = not item
+        if size is None or size < 0:
+            size = len(self.leftover)
+        data, self.leftover = self.leftover[:size], self.leftover[size:]
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        if self.closed:
+            return
+        self.stopped.set()
+        if self.process is not None:
+            self.process.kill()
+        self.thread.join()
+        self.source.close()
+        if self.process is not None:
+            self.process.wait()
+        super().close()
+
+
+def open_pgn(pgn_path: str, parallel: bool = False, read_ahead: int = 8) -> BinaryIO:
+    """
+    Open a .pgn, .pgn.zst or .pgn.bz2 file as a binary stream. Compressed
+    files are decompressed on the fly without temporary files; with
+    parallel=True a multi-core external decompressor is used when installed.
+    """
+    suffix = os.path.splitext(pgn_path)[1]
+    if suffix not in PARALLEL_DECOMPRESSORS:
+        return open(pgn_path, 'rb')
+
+    if parallel:
+        for command in PARALLEL_DECOMPRESSORS[suffix]:
+            if shutil.which(command[0]):
+                process = subprocess.Popen(command + [pgn_path], stdout=subprocess.PIPE)
+                return ReadAheadStream(process.stdout, max_chunks=read_ahead, process=process)
+        logger.info(f"No parallel decompressor found for {suffix}, decompressing in-process")
+
+    if suffix == '.bz2':
+        source = bz2.open(pgn_path, 'rb')
+    elif ZSTANDARD_AVAILABLE:
+        # Lichess dumps are compressed with long-distance matching
+        decompressor = zstandard.ZstdDecompressor(max_window_size=2 ** 31)
+        source = decompressor.stream_reader(open(pgn_path, 'rb'), closefd=True)
+    else:
+        raise RuntimeError(f"zstandard is required to read {pgn_path}")
+    return ReadAheadStream(source, max_chunks=read_ahead)
+
+
+def scan_games(stream: BinaryIO, chunk_size: int = 1 << 23) -> Iterator[Tuple[int, bytes]]:
+    """Yield (byte offset, raw game) for every game in a binary PGN stream."""
+    buffer = b''
+    base = 0
+    scan_from = 0
+    started = False
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        buffer += chunk
+        if not started:
+            # Skip anything before the first header
+            first = buffer.find(b'[')
+            if first < 0:
+                base += len(buffer)
+                buffer = b''
+                continue
+            base += first
+            buffer = buffer[first:]
+            started = True
+
+        start = 0
+        for match in GAME_BOUNDARY.finditer(buffer, scan_from):
+            yield base + start, buffer[start:match.start()]
+            start = match.end()
+        buffer = buffer[start:]
+        base += start
+        scan_from = max(0, len(buffer) - BOUNDARY_OVERLAP)
+
+    if buffer.strip():
+        yield base, buffer.rstrip()
+
+
+def parse_headers(raw_game: bytes) -> Dict[str, str]:
+    """Read the tag pairs of a raw game without parsing its moves."""
+    end = HEADERS_END.search(raw_game)
+    header_block = raw_game[:end.start()] if end else raw_game
+    return {
+        key.decode('ascii'): value.decode('utf-8', errors='ignore')
+        for key, value in HEADER_LINE.findall(header_block)
+    }
+
+
+def min_elo_filter(min_elo: int) -> Callable[[Dict[str, str]], bool]:
+    """Accept games where both players are rated at least min_elo."""
+    def accept(headers: Dict[str, str]) -> bool:
+        try:
+            return (int(headers.get('WhiteElo', 0)) >= min_elo
+                    and int(headers.get('BlackElo', 0)) >= min_elo)
+        except ValueError:
+            return False
+    return accept
+
+
+def build_index(pgn_path: str, accept: Optional[Callable[[Dict[str, str]], bool]] = None,
+                max_games: Optional[int] = None) -> Tuple[array, array, int]:
+    """
+    Scan a PGN file once and return (offsets, lengths, total games) where
+    offsets and lengths locate every game accepted by the header filter.
+    """
+    offsets, lengths = array('q'), array('q')
+    total = 0
+    with open(pgn_path, 'rb') as pgn:
+        for offset, raw_game in scan_games(pgn):
+            total += 1
+            if accept is not None and not accept(parse_headers(raw_game)):
+                continue
+            offsets.append(offset)
+            lengths.append(len(raw_game))
+            if max_games and len(offsets) >= max_games:
+                break
+    return offsets, lengths, total
+
+
+def parse_game(raw_game: bytes) -> Optional[chess.pgn.Game]:
+    """Parse one raw game with python-chess."""
+    return chess.pgn.read_game(io.StringIO(raw_game.decode('utf-8', errors='ignore')))
+
+
+def _export_span(pgn_path: str, offsets: array, lengths: array) -> List[str]:
+    """Worker: parse the indexed games and return them re-exported as PGN."""
+    games = []
+    with open(pgn_path, 'rb') as pgn:
+        for offset, length in zip(offsets, lengths):
+            pgn.seek(offset)
+            game = parse_game(pgn.read(length))
+            if game is not None:
+                games.append(str(game))
+    return games
+
+
+def _export_games(raw_games: List[bytes]) -> List[str]:
+    """Worker: parse raw games and return them re-exported as PGN."""
+    games = []
+    for raw_game in raw_games:
+        game = parse_game(raw_game)
+        if game is not None:
+            games.append(str(game))
+    return games
+
+
+def _write_games(out, games: List[str], progress: tqdm) -> int:
+    """Append exported games to the output file."""
+    for game in games:
+        out.write(game + "\n\n")
+    progress.update(len(games))
+    return len(games)
+
+
+def iter_game_batches(pgn_path: str, accept: Optional[Callable[[Dict[str, str]], bool]] = None,
+                      max_games: Optional[int] = None, batch_size: int = 2000,
+                      counts: Optional[Dict[str, int]] = None,
+                      parallel: bool = False) -> Iterator[List[bytes]]:
+    """Stream a (compressed) PGN file as batches of accepted raw games."""
+    counts = counts if counts is not None else {'total': 0, 'accepted': 0}
+    batch = []
+    with open_pgn(pgn_path, parallel=parallel) as stream:
+        for _, raw_game in scan_games(stream):
+            counts['total'] += 1
+            if accept is not None and not accept(parse_headers(raw_game)):
+                continue
+            batch.append(raw_game)
+            counts['accepted'] += 1
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+            if max_games and counts['accepted'] >= max_games:
+                break
+    if batch:
+        yield batch
+
+
+def map_ordered(executor: ProcessPoolExecutor, tasks: Iterable[tuple], window: int) -> Iterator[Any]:
+    """
+    Run (function, *args) tasks on the pool and yield their results in task
+    order, with at most window tasks in flight so memory stays bounded.
+    """
+    pending = deque()
+    for task in tasks:
+        pending.append(executor.submit(*task))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def process_pgn(pgn_path: str, output_path: str, min_elo: int = 0,
+                max_games: Optional[int] = None, workers: Optional[int] = None,
+                span_size: int = 2000, parallel_decompress: bool = False) -> int:
+    """
+    Filter a PGN file by rating into output_path, parsing the accepted games
+    on a process pool. Games keep their original order. Returns games written.
+
+    Plain .pgn files are indexed first and workers read their own spans;
+    compressed dumps are streamed and accepted games are shipped to workers.
+    """
+    accept = min_elo_filter(min_elo)
+    if pgn_path.endswith('.pgn'):
+        offsets, lengths, total = build_index(pgn_path, accept, max_games)
+        counts = {'total': total, 'accepted': len(offsets)}
+        tasks = ((_export_span, pgn_path, offsets[i:i + span_size], lengths[i:i + span_size])
+                 for i in range(0, len(offsets), span_size))
+        expected = len(offsets)
+    else:
+        counts = {'total': 0, 'accepted': 0}
+        tasks = ((_export_games, batch) for batch in
+                 iter_game_batches(pgn_path, accept, max_games, span_size, counts, parallel_decompress))
+        expected = None
+
+    workers = workers or os.cpu_count()
+    written = 0
+    with open(output_path, 'w', encoding='utf-8') as out, \
+            ProcessPoolExecutor(max_workers=workers) as executor, \
+            tqdm(total=expected, desc=f"Processando {os.path.basename(pgn_path)}") as progress:
+        for games in map_ordered(executor, tasks, 2 * workers):
+            written += _write_games(out, games, progress)
+
+    print(f"{counts['total']} jogos no arquivo, {counts['accepted']} aceitos, "
+          f"{written} salvos em {output_path}")
+    return written
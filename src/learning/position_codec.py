@@ -0,0 +1,200 @@
+"""
+Position Codec - Compact binary training positions
+
+Packs a position as 12 piece bitboards plus game state, together with its
+policy label (played move) and value label, into a fixed-size numpy record.
+Records are stored in sharded .bin files and decoded in batches into the
+same features PositionEncoder produces.
+"""
+
+import os
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+import chess
+import chess.polyglot
+import numpy as np
+from loguru import logger
+
+from .pgn_corpus import parse_game
+
+# 12 piece planes of 64 squares plus the 8 game state features
+INPUT_SIZE = 12 * 64 + 8
+
+# Policy outputs are indexed by from_square * 64 + to_square
+POLICY_SIZE = 64 * 64
+
+# Plane order matches PositionEncoder.board_to_tensor
+PIECE_PLANES = [(color, piece_type)
+                for color in (chess.WHITE, chess.BLACK)
+                for piece_type in (chess.PAWN, chess.ROOK, chess.KNIGHT,
+                                   chess.BISHOP, chess.QUEEN, chess.KING)]
+
+FLAG_WHITE_KINGSIDE = 1
+FLAG_WHITE_QUEENSIDE = 2
+FLAG_BLACK_KINGSIDE = 4
+FLAG_BLACK_QUEENSIDE = 8
+FLAG_EN_PASSANT = 16
+FLAG_WHITE_TO_MOVE = 32
+
+POSITION_DTYPE = np.dtype([
+    ('bitboards', '<u8', (12,)),
+    ('flags', 'u1'),
+    ('halfmove', 'u1'),
+    ('fullmove', '<u2'),
+    ('move', '<u2'),
+    ('value', '<f2'),
+    ('key', '<u8'),
+])
+
+RESULT_VALUES = {'1-0': 1.0, '0-1': -1.0, '1/2-1/2': 0.0}
+
+_SQUARE_BITS = np.uint64(1) << np.arange(64, dtype=np.uint64)
+
+
+def move_to_index(move: chess.Move) -> int:
+    """Map a move to its policy index (promotions share the plain move's index)."""
+    return move.from_square * 64 + move.to_square
+
+
+def encode_position(board: chess.Board, move: Optional[chess.Move] = None,
+                    value: float = 0.0, key: Optional[int] = None) -> tuple:
+    """Pack a position and its labels into a POSITION_DTYPE record."""
+    flags = (
+        FLAG_WHITE_KINGSIDE * board.has_kingside_castling_rights(chess.WHITE)
+        | FLAG_WHITE_QUEENSIDE * board.has_queenside_castling_rights(chess.WHITE)
+        | FLAG_BLACK_KINGSIDE * board.has_kingside_castling_rights(chess.BLACK)
+        | FLAG_BLACK_QUEENSIDE * board.has_queenside_castling_rights(chess.BLACK)
+        | FLAG_EN_PASSANT * (board.ep_square is not None)
+        | FLAG_WHITE_TO_MOVE * (board.turn == chess.WHITE)
+    )
+    return (
+        [board.pieces_mask(piece_type, color) for color, piece_type in PIECE_PLANES],
+        flags,
+        min(board.halfmove_clock, 255),
+        min(board.fullmove_number, 65535),
+        move_to_index(move) if move is not None else 0,
+        value,
+        chess.polyglot.zobrist_hash(board) if key is None else key,
+    )
+
+
+def decode_features(records: np.ndarray) -> np.ndarray:
+    """Unpack records into an (N, INPUT_SIZE) float32 feature matrix."""
+    planes = (records['bitboards'][:, :, None] & _SQUARE_BITS) != 0
+    features = np.empty((len(records), INPUT_SIZE), dtype=np.float32)
+    features[:, :768] = planes.reshape(len(records), 768)
+    flags = records['flags']
+    for column, flag in enumerate((FLAG_WHITE_KINGSIDE, FLAG_WHITE_QUEENSIDE,
+                                   FLAG_BLACK_KINGSIDE, FLAG_BLACK_QUEENSIDE,
+                                   FLAG_EN_PASSANT, FLAG_WHITE_TO_MOVE)):
+        features[:, 768 + column] = (flags & flag) != 0
+    features[:, 774] = records['halfmove'] / 50.0
+    features[:, 775] = np.minimum(records['fullmove'] / 50.0, 1.0)
+    return features
+
+
+def game_positions(raw_game: bytes, min_ply: int = 0) -> np.ndarray:
+    """
+    Replay one raw PGN game into records labeled with the move played and
+    the final result from the side to move's point of view.
+    """
+    game = parse_game(raw_game)
+    if game is None or game.errors:
+        return np.empty(0, dtype=POSITION_DTYPE)
+    result = RESULT_VALUES.get(game.headers.get('Result'))
+    if result is None:
+        return np.empty(0, dtype=POSITION_DTYPE)
+
+    board = game.board()
+    records = []
+    for ply, move in enumerate(game.mainline_moves()):
+        if ply >= min_ply:
+            value = result if board.turn == chess.WHITE else -result
+            records.append(encode_position(board, move, value))
+        board.push(move)
+    return np.array(records, dtype=POSITION_DTYPE)
+
+
+def games_to_positions(raw_games: List[bytes], min_ply: int = 0) -> np.ndarray:
+    """Worker: encode a batch of raw games into one record array."""
+    arrays = [game_positions(raw_game, min_ply) for raw_game in raw_games]
+    return np.concatenate(arrays) if arrays else np.empty(0, dtype=POSITION_DTYPE)
+
+
+class ShardWriter:
+    """Writes records to fixed-size .bin shards, dropping repeated Zobrist keys."""
+
+    def __init__(self, output_dir: str, shard_size: int = 1_000_000, prefix: str = 'positions'):
+        self.output_dir = Path(output_dir)
+        self.shard_size = shard_size
+        self.prefix = prefix
+        self.seen = set()
+        self.buffer: List[np.ndarray] = []
+        self.buffered = 0
+        self.shards = 0
+        self.written = 0
+        self.duplicates = 0
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+    def add(self, records: np.ndarray):
+        """Queue records, keeping only the first occurrence of each position."""
+        keys = records['key'].tolist()
+        keep = np.zeros(len(records), dtype=bool)
+        for i, key in enumerate(keys):
+            if key not in self.seen:
+                self.seen.add(key)
+                keep[i] = True
+        self.duplicates += len(records) - int(keep.sum())
+        unique = records[keep]
+        self.buffer.append(unique)
+        self.buffered += len(unique)
+        while self.buffered >= self.shard_size:
+            self._write(self.shard_size)
+
+    def _write(self, count: int):
+        """Write the first count buffered records as the next shard."""
+        records = np.concatenate(self.buffer)
+        shard, rest = records[:count], records[count:]
+        path = self.output_dir / f"{self.prefix}-{self.shards:05d}.bin"
+        shard.tofile(path)
+        self.shards += 1
+        self.written += len(shard)
+        self.buffer = [rest]
+        self.buffered = len(rest)
+
+    def close(self):
+        """Write the final partial shard."""
+        if self.buffered:
+            self._write(self.buffered)
+        logger.info(f"Wrote {self.written} positions to {self.shards} shards in {self.output_dir} "
+                    f"({self.duplicates} duplicates dropped)")
+
+
+def shard_paths(shard_dir: str) -> List[str]:
+    """List the shards of a directory in write order."""
+    return sorted(str(path) for path in Path(shard_dir).glob('*.bin'))
+
+
+def load_shard(path: str, mmap: bool = True) -> np.ndarray:
+    """Open one shard as a record array, memory-mapped by default."""
+    if mmap:
+        if os.path.getsize(path) == 0:
+            return np.empty(0, dtype=POSITION_DTYPE)
+        return np.memmap(path, dtype=POSITION_DTYPE, mode='r')
+    return np.fromfile(path, dtype=POSITION_DTYPE)
+
+
+def iter_batches(shard_dir: str, batch_size: int = 1024, shuffle: bool = True,
+                 rng: Optional[np.random.Generator] = None) -> Iterator[np.ndarray]:
+    """Yield record batches from every shard, shuffled within each shard."""
+    rng = rng or np.random.default_rng()
+    paths = shard_paths(shard_dir)
+    if shuffle:
+        rng.shuffle(paths)
+    for path in paths:
+        records = load_shard(path)
+        order = rng.permutation(len(records)) if shuffle else np.arange(len(records))
+        for start in range(0, len(records), batch_size):
+            # Sorted indices keep reads from the memory map sequential
+            yield np.asarray(records[np.sort(order[start:start + batch_size])])
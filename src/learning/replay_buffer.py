@@ -0,0 +1,92 @@
+"""
+Replay Buffer - Fixed-capacity ring buffer of training positions
+
+Stores packed position records (bitboards, uint16 move index, float16
+value) in one preallocated NumPy array, or in a memory-mapped file, with
+O(1) appends that overwrite the oldest positions once full.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+
+from .position_codec import POSITION_DTYPE
+
+
+class ReplayBuffer:
+    """Ring buffer of POSITION_DTYPE records with vectorized sampling."""
+
+    def __init__(self, capacity: int, path: Optional[str] = None):
+        self.capacity = capacity
+        self.path = Path(path) if path else None
+        self.size = 0
+        self.cursor = 0
+        if self.path is None:
+            self.records = np.zeros(capacity, dtype=POSITION_DTYPE)
+        else:
+            self._open_memmap()
+
+    @property
+    def _meta_path(self) -> Path:
+        return self.path.with_suffix(self.path.suffix + '.json')
+
+    def _open_memmap(self):
+        """Map the spill file, resuming its contents when the capacity matches."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        expected = self.capacity * POSITION_DTYPE.itemsize
+        resume = (self.path.exists() and os.path.getsize(self.path) == expected
+                  and self._meta_path.exists())
+        self.records = np.memmap(self.path, dtype=POSITION_DTYPE, mode='r+' if resume else 'w+',
+                                 shape=(self.capacity,))
+        if resume:
+            with open(self._meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            self.size, self.cursor = meta['size'], meta['cursor']
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def nbytes(self) -> int:
+        return self.records.nbytes
+
+    def append(self, record: tuple):
+        """Add one record, overwriting the oldest when full."""
+        self.records[self.cursor] = record
+        self.cursor = (self.cursor + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def extend(self, records: np.ndarray):
+        """Add many records at once (only the newest capacity records are kept)."""
+        records = records[-self.capacity:]
+        count = len(records)
+        first = min(count, self.capacity - self.cursor)
+        self.records[self.cursor:self.cursor + first] = records[:first]
+        self.records[:count - first] = records[first:]
+        self.cursor = (self.cursor + count) % self.capacity
+        self.size = min(self.size + count, self.capacity)
+
+    def sample(self, batch_size: int, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """Draw a uniform random batch (with replacement)."""
+        if not self.size:
+            raise ValueError("Cannot sample from an empty replay buffer")
+        rng = rng or np.random.default_rng()
+        return self.records[rng.integers(0, self.size, batch_size)]
+
+    def iter_batches(self, batch_size: int, rng: Optional[np.random.Generator] = None) -> Iterator[np.ndarray]:
+        """One shuffled pass over every stored record."""
+        rng = rng or np.random.default_rng()
+        order = rng.permutation(self.size)
+        for start in range(0, self.size, batch_size):
+            yield self.records[order[start:start + batch_size]]
+
+    def flush(self):
+        """Persist a memory-mapped buffer so it can be reopened."""
+        if self.path is None:
+            return
+        self.records.flush()
+        with open(self._meta_path, 'w', encoding='utf-8') as f:
+            json.dump({'size': self.size, 'cursor': self.cursor}, f)
@@ -0,0 +1,222 @@
+"""
+Self Play - Offline reinforcement learning from games against itself
+
+Actor processes play MCTS games with the current ChessNet weights and
+stream (position, policy, outcome) samples to a learner process, which
+trains on a sliding window of recent samples and publishes new weights
+that the actors load between games. No Lichess connection is involved.
+"""
+
+import multiprocessing as mp
+import os
+import queue
+import random
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import chess
+import numpy as np
+import torch
+from loguru import logger
+
+from ..config import get_section
+from ..engine.mcts import MCTS
+from .neural_network import ChessNet, ChessTrainer, checkpoint_hidden_size
+from .position_codec import POSITION_DTYPE, decode_features, encode_position
+from .replay_buffer import ReplayBuffer
+
+DEFAULT_SETTINGS = {
+    'actors': 0,             # 0 = one per core, minus one for the learner
+    'mcts_nodes': 200,
+    'max_plies': 300,
+    'train_every': 4096,     # new positions between training phases
+    'train_steps': 64,
+    'batch_size': 256,
+    'window': 500_000,       # most recent positions the learner samples from
+    'replay_path': None,     # spill the window to a memory-mapped file
+    'dirichlet_alpha': 0.3,
+    'exploration_rate': 0.1,
+    'discount_factor': 0.99,
+}
+
+
+def load_settings(**overrides) -> Dict[str, Any]:
+    """Self-play settings from config.yaml's learning section, then overrides."""
+    learning = get_section('learning')
+    settings = dict(DEFAULT_SETTINGS)
+    for key in ('exploration_rate', 'discount_factor'):
+        if key in learning:
+            settings[key] = learning[key]
+    settings.update(learning.get('self_play') or {})
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+    if not settings['actors']:
+        settings['actors'] = max(1, (os.cpu_count() or 2) - 1)
+    return settings
+
+
+def play_game(mcts: MCTS, exploration_rate: float, discount_factor: float,
+              max_plies: int) -> np.ndarray:
+    """
+    Play one game against itself. Each position is labeled with the most
+    visited move (policy) and the final result from the side to move's
+    point of view, discounted by the number of plies left (outcome).
+    """
+    board = chess.Board()
+    mcts.reset(board)
+    records = []
+    while not board.is_game_over(claim_draw=True) and board.ply() < max_plies:
+        mcts.search(board)
+        visits = mcts.visit_distribution()
+        if not visits:
+            break
+        target = max(visits, key=visits.get)
+        move = target
+        if random.random() < exploration_rate:
+            moves, counts = zip(*visits.items())
+            move = random.choices(moves, weights=counts)[0]
+        records.append(encode_position(board, target))
+        board.push(move)
+
+    outcome = board.outcome(claim_draw=True)
+    white_result = 0.0
+    if outcome is not None and outcome.winner is not None:
+        white_result = 1.0 if outcome.winner == chess.WHITE else -1.0
+
+    records = np.array(records, dtype=POSITION_DTYPE)
+    plies = np.arange(len(records))
+    side = np.where(plies % 2 == 0, 1.0, -1.0)
+    records['value'] = white_result * side * discount_factor ** (len(records) - 1 - plies)
+    return records
+
+
+def _actor(actor_id: int, weights_path: str, samples: "mp.Queue", stop: "mp.Event",
+           settings: Dict[str, Any]):
+    """Actor process: play games with the latest published weights."""
+    torch.set_num_threads(1)
+    random.seed(os.getpid())
+    np.random.seed(os.getpid() % (2 ** 32))
+
+    # The learner publishes its first weights before starting the actors
+    model = ChessNet(hidden_size=checkpoint_hidden_size(weights_path))
+    mcts = MCTS(model, nodes=settings['mcts_nodes'], dirichlet_alpha=settings['dirichlet_alpha'])
+    version, loaded_mtime = -1, None
+    while not stop.is_set():
+        mtime = os.stat(weights_path).st_mtime_ns
+        if mtime != loaded_mtime:
+            checkpoint = torch.load(weights_path)
+            model.load_state_dict(checkpoint['model_state_dict'])
+            version, loaded_mtime = checkpoint['version'], mtime
+
+        start = time.time()
+        records = play_game(mcts, settings['exploration_rate'], settings['discount_factor'],
+                            settings['max_plies'])
+        result = (actor_id, version, records, time.time() - start)
+        while not stop.is_set():
+            try:
+                samples.put(result, timeout=1.0)
+                break
+            except queue.Full:
+                continue
+
+
+class SelfPlayLearner:
+    """Runs actor processes and trains the network on their games."""
+
+    def __init__(self, output_dir: Optional[str] = None, initial_model: Optional[str] = None,
+                 **overrides):
+        self.settings = load_settings(**overrides)
+        self.output_dir = Path(output_dir or os.getenv('SELF_PLAY_DIR', 'data/self_play'))
+        self.weights_path = self.output_dir / 'weights.pth'
+        self.initial_model = initial_model or 'models/chess_model_initial.pth'
+        self.model = ChessNet(hidden_size=checkpoint_hidden_size(self.initial_model))
+        self.trainer = ChessTrainer(self.model)
+        self.version = 0
+        self.replay = ReplayBuffer(self.settings['window'], self.settings['replay_path'])
+        self.games = 0
+        self.positions = 0
+
+    def _publish_weights(self):
+        """Atomically replace the weights file the actors read."""
+        tmp_path = self.weights_path.with_suffix('.tmp')
+        torch.save({'version': self.version, 'model_state_dict': self.model.state_dict()}, tmp_path)
+        os.replace(tmp_path, self.weights_path)
+
+    def _train(self) -> float:
+        """Train on random batches from the replay window; returns the mean total loss."""
+        batch_size = min(self.settings['batch_size'], len(self.replay))
+        self.model.train()
+        losses = []
+        for _ in range(self.settings['train_steps']):
+            batch = self.replay.sample(batch_size)
+            value_loss, policy_loss = self.trainer.train_step(
+                torch.from_numpy(decode_features(batch)),
+                batch['value'].astype(np.float32), batch['move'].astype(np.int64))
+            losses.append(value_loss + policy_loss)
+        return float(np.mean(losses))
+
+    def run(self, max_games: Optional[int] = None, max_hours: Optional[float] = None,
+            save_path: str = 'models/chess_model_selfplay.pth') -> Dict[str, float]:
+        """Play and train until max_games or max_hours is reached."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        if Path(self.initial_model).exists():
+            self.trainer.load_model(self.initial_model)
+        self._publish_weights()
+
+        actors = self.settings['actors']
+        context = mp.get_context('spawn')
+        samples = context.Queue(maxsize=actors * 4)
+        stop = context.Event()
+        processes = [context.Process(target=_actor, daemon=True,
+                                     args=(i, str(self.weights_path), samples, stop, self.settings))
+                     for i in range(actors)]
+        for process in processes:
+            process.start()
+        logger.info(f"Self-play started with {actors} actors "
+                    f"({self.settings['mcts_nodes']} playouts per move)")
+
+        start = time.time()
+        deadline = start + max_hours * 3600 if max_hours else float('inf')
+        new_positions = 0
+        try:
+            while (max_games is None or self.games < max_games) and time.time() < deadline:
+                try:
+                    _, _, records, _ = samples.get(timeout=1.0)
+                except queue.Empty:
+                    continue
+                self.games += 1
+                self.positions += len(records)
+                new_positions += len(records)
+                self.replay.extend(records)
+
+                if new_positions >= self.settings['train_every']:
+                    loss = self._train()
+                    self.version += 1
+                    self._publish_weights()
+                    new_positions = 0
+                    logger.info(f"Weights v{self.version}: loss {loss:.4f}, "
+                                f"{self.games} games, {self.positions} positions, "
+                                f"{self._games_per_hour_per_core(start):.1f} games/hour/core")
+        finally:
+            stop.set()
+            for process in processes:
+                process.join(timeout=10)
+                if process.is_alive():
+                    process.terminate()
+
+        self.replay.flush()
+        Path(save_path).parent.mkdir(parents=True, exist_ok=True)
+        self.trainer.save_model(save_path)
+        stats = {
+            'games': self.games,
+            'positions': self.positions,
+            'version': self.version,
+            'hours': (time.time() - start) / 3600,
+            'games_per_hour_per_core': self._games_per_hour_per_core(start),
+        }
+        logger.info(f"Self-play finished: {stats}")
+        return stats
+
+    def _games_per_hour_per_core(self, start: float) -> float:
+        hours = max(time.time() - start, 1e-9) / 3600
+        return self.games / hours / self.settings['actors']
@@ -0,0 +1,347 @@
+"""
+Sweep - Parallel hyperparameter search for ChessTrainer
+
+Samples trial configurations from a search space (learning.sweep.space in
+config.yaml) and trains them in a process pool. Every worker reads the
+same memory-mapped position shards, so the dataset is in the page cache
+once rather than copied per trial. Successive halving runs all trials for
+a few epochs, keeps the best 1/eta by validation loss and trains those
+further, so most of the compute goes to promising configurations. Trials
+and per-epoch metrics are recorded in SQLite.
+"""
+
+import json
+import math
+import multiprocessing as mp
+import os
+import random
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import torch
+from loguru import logger
+
+from ..config import get_section
+from .distributed import ShardedRecords
+from .neural_network import ChessNet, ChessTrainer
+from .position_codec import decode_features
+
+DEFAULT_SETTINGS = {
+    'trials': 27,
+    'workers': 0,              # 0 = one per core
+    'min_epochs': 1,           # budget of the first rung
+    'max_epochs': 9,
+    'eta': 3,                  # keep 1/eta of the trials at each rung
+    'validation_split': 0.2,
+    'train_positions': 0,      # positions sampled per epoch (0 = the whole training split)
+    'val_positions': 50_000,
+    'seed': 0,
+    'space': {
+        'learning_rate': {'log_uniform': [1e-4, 1e-2]},
+        'batch_size': [128, 256, 512, 1024],
+        'hidden_size': [256, 512],
+    },
+}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS sweeps (
+    sweep_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    created TEXT NOT NULL,
+    data TEXT NOT NULL,
+    settings TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trials (
+    sweep_id INTEGER NOT NULL,
+    trial_id INTEGER NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,          -- running, stopped (not promoted), completed, failed
+    rung INTEGER NOT NULL DEFAULT 0,
+    epochs INTEGER NOT NULL DEFAULT 0,
+    val_loss REAL,
+    checkpoint TEXT,
+    PRIMARY KEY (sweep_id, trial_id)
+);
+CREATE TABLE IF NOT EXISTS trial_epochs (
+    sweep_id INTEGER NOT NULL,
+    trial_id INTEGER NOT NULL,
+    epoch INTEGER NOT NULL,
+    value_loss REAL,
+    policy_loss REAL,
+    val_value_loss REAL,
+    val_policy_loss REAL,
+    val_loss REAL,
+    val_accuracy REAL,
+    seconds REAL,
+    positions_per_second REAL,
+    PRIMARY KEY (sweep_id, trial_id, epoch)
+);
+'''
+
+
+def load_settings(**overrides) -> Dict[str, Any]:
+    """Sweep settings from config.yaml's learning.sweep section, then overrides."""
+    learning = get_section('learning')
+    settings = dict(DEFAULT_SETTINGS)
+    if 'validation_split' in learning:
+        settings['validation_split'] = learning['validation_split']
+    settings.update(learning.get('sweep') or {})
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+    if not settings['workers']:
+        settings['workers'] = os.cpu_count() or 1
+    return settings
+
+
+def sample_params(space: Dict[str, Any], rng: random.Random) -> Dict[str, Any]:
+    """
+    Draw one configuration. A list is a choice, {'uniform': [lo, hi]} and
+    {'log_uniform': [lo, hi]} are continuous ranges, {'int': [lo, hi]} is an
+    inclusive integer range and any other value is fixed.
+    """
+    params = {}
+    for name, spec in space.items():
+        if isinstance(spec, list):
+            params[name] = rng.choice(spec)
+        elif isinstance(spec, dict) and 'log_uniform' in spec:
+            low, high = spec['log_uniform']
+            params[name] = math.exp(rng.uniform(math.log(low), math.log(high)))
+        elif isinstance(spec, dict) and 'uniform' in spec:
+            params[name] = rng.uniform(*spec['uniform'])
+        elif isinstance(spec, dict) and 'int' in spec:
+            params[name] = rng.randint(*spec['int'])
+        else:
+            params[name] = spec
+    return params
+
+
+def rung_budgets(min_epochs: int, max_epochs: int, eta: int) -> List[int]:
+    """Cumulative epochs per rung: min_epochs * eta^k, ending at max_epochs."""
+    budgets = []
+    epochs = min_epochs
+    while epochs < max_epochs:
+        budgets.append(epochs)
+        epochs *= eta
+    budgets.append(max_epochs)
+    return budgets
+
+
+# Worker side: one dataset handle per process, shared by the trials it runs
+_DATA: Dict[str, ShardedRecords] = {}
+
+
+def _dataset(path: str) -> ShardedRecords:
+    if path not in _DATA:
+        _DATA[path] = ShardedRecords.from_path(path)
+    return _DATA[path]
+
+
+def _evaluate(trainer: ChessTrainer, data: ShardedRecords, indices: np.ndarray,
+              batch_size: int = 4096) -> Dict[str, float]:
+    trainer.model.eval()
+    value_loss = policy_loss = correct = 0.0
+    with torch.no_grad():
+        for offset in range(0, len(indices), batch_size):
+            records = data.take(indices[offset:offset + batch_size])
+            values, policies = trainer.model(torch.from_numpy(decode_features(records)))
+            targets = torch.from_numpy(records['move'].astype(np.int64))
+            weight = len(records)
+            value_loss += weight * trainer.value_criterion(
+                values, torch.from_numpy(records['value'].astype(np.float32)).reshape(-1, 1)).item()
+            policy_loss += weight * trainer.policy_criterion(policies, targets).item()
+            correct += (policies.argmax(dim=1) == targets).sum().item()
+    count = max(len(indices), 1)
+    return {
+        'val_value_loss': value_loss / count,
+        'val_policy_loss': policy_loss / count,
+        'val_loss': (value_loss + policy_loss) / count,
+        'val_accuracy': correct / count,
+    }
+
+
+def train_trial(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Worker: train one trial from task['start_epoch'] to task['end_epoch'],
+    resuming from its checkpoint, and return the per-epoch metrics.
+    """
+    torch.set_num_threads(task['threads'])
+    torch.manual_seed(task['seed'] + task['trial_id'])
+    params = task['params']
+    data = _dataset(task['data'])
+
+    # Validation is the tail of the data: shards are in game order, so the
+    # positions of one game stay on one side of the split
+    split = int(len(data) * (1 - task['validation_split']))
+    val_indices = np.arange(split, len(data))
+    if task['val_positions'] and len(val_indices) > task['val_positions']:
+        val_indices = val_indices[np.linspace(0, len(val_indices) - 1, task['val_positions']).astype(np.int64)]
+
+    model = ChessNet(hidden_size=int(params.get('hidden_size', 512)))
+    trainer = ChessTrainer(model, learning_rate=float(params.get('learning_rate', 0.001)))
+    if task['start_epoch'] > 0:
+        trainer.load_model(task['checkpoint'])
+    batch_size = int(params.get('batch_size', 1024))
+
+    epochs = []
+    for epoch in range(task['start_epoch'], task['end_epoch']):
+        rng = np.random.default_rng((task['seed'], task['trial_id'], epoch))
+        if task['train_positions']:
+            indices = rng.integers(0, split, task['train_positions'])
+        else:
+            indices = rng.permutation(split)
+
+        start = time.perf_counter()
+        model.train()
+        totals = np.zeros(2)
+        batches = 0
+        for offset in range(0, len(indices), batch_size):
+            records = data.take(indices[offset:offset + batch_size])
+            totals += trainer.train_step(
+                torch.from_numpy(decode_features(records)),
+                records['value'].astype(np.float32), records['move'].astype(np.int64))
+            batches += 1
+        seconds = time.perf_counter() - start
+
+        metrics = {
+            'epoch': epoch + 1,
+            'value_loss': totals[0] / max(batches, 1),
+            'policy_loss': totals[1] / max(batches, 1),
+            'seconds': seconds,
+            'positions_per_second': len(indices) / seconds if seconds else 0.0,
+            **_evaluate(trainer, data, val_indices),
+        }
+        epochs.append(metrics)
+        if not math.isfinite(metrics['val_loss']):
+            return {'trial_id': task['trial_id'], 'epochs': epochs, 'failed': True}
+
+    trainer.save_model(task['checkpoint'])
+    return {'trial_id': task['trial_id'], 'epochs': epochs, 'failed': False}
+
+
+class SweepRunner:
+    """Runs a successive-halving sweep over a process pool and records it in SQLite."""
+
+    def __init__(self, data: str, db_path: Optional[str] = None, output_dir: Optional[str] = None,
+                 space: Optional[Dict[str, Any]] = None, **overrides):
+        self.settings = load_settings(**overrides)
+        if space is not None:
+            self.settings['space'] = space
+        self.data = str(data)
+        self.output_dir = Path(output_dir or os.getenv('SWEEP_DIR', 'data/sweeps'))
+        self.db_path = db_path or str(self.output_dir / 'sweeps.db')
+        self.sweep_id: Optional[int] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.db_path)
+        connection.executescript(SCHEMA)
+        return connection
+
+    def _record(self, connection: sqlite3.Connection, result: Dict[str, Any], rung: int):
+        trial_id = result['trial_id']
+        for metrics in result['epochs']:
+            connection.execute(
+                'INSERT OR REPLACE INTO trial_epochs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (self.sweep_id, trial_id, metrics['epoch'], metrics['value_loss'], metrics['policy_loss'],
+                 metrics['val_value_loss'], metrics['val_policy_loss'], metrics['val_loss'],
+                 metrics['val_accuracy'], metrics['seconds'], metrics['positions_per_second']))
+        last = result['epochs'][-1] if result['epochs'] else {}
+        connection.execute(
+            'UPDATE trials SET status = ?, rung = ?, epochs = ?, val_loss = ? WHERE sweep_id = ? AND trial_id = ?',
+            ('failed' if result['failed'] else 'running', rung, last.get('epoch', 0),
+             last.get('val_loss'), self.sweep_id, trial_id))
+        connection.commit()
+
+    def run(self, name: Optional[str] = None) -> Dict[str, Any]:
+        """Run the sweep; returns the best trial (params, val_loss, checkpoint)."""
+        settings = self.settings
+        if not len(ShardedRecords.from_path(self.data)):
+            raise ValueError(f"No positions found in {self.data}")
+
+        rng = random.Random(settings['seed'])
+        trials = {trial_id: sample_params(settings['space'], rng) for trial_id in range(settings['trials'])}
+        budgets = rung_budgets(settings['min_epochs'], settings['max_epochs'], settings['eta'])
+        workers = min(settings['workers'], len(trials))
+        threads = max(1, (os.cpu_count() or 1) // workers)
+
+        connection = self._connect()
+        cursor = connection.execute(
+            'INSERT INTO sweeps (name, created, data, settings) VALUES (?, ?, ?, ?)',
+            (name, datetime.now().isoformat(timespec='seconds'), self.data, json.dumps(settings)))
+        self.sweep_id = cursor.lastrowid
+        checkpoint_dir = self.output_dir / f'sweep-{self.sweep_id}'
+        checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        checkpoints = {trial_id: str(checkpoint_dir / f'trial-{trial_id}.pth') for trial_id in trials}
+        connection.executemany(
+            'INSERT INTO trials (sweep_id, trial_id, params, status, checkpoint) VALUES (?, ?, ?, ?, ?)',
+            [(self.sweep_id, trial_id, json.dumps(params), 'running', checkpoints[trial_id])
+             for trial_id, params in trials.items()])
+        connection.commit()
+        logger.info(f"Sweep {self.sweep_id}: {len(trials)} trials, rungs at {budgets} epochs, "
+                    f"{workers} workers ({threads} threads each)")
+
+        start = time.time()
+        survivors = list(trials)
+        trained = {trial_id: 0 for trial_id in trials}
+        val_loss: Dict[int, float] = {}
+        epochs_run = 0
+        context = mp.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            for rung, budget in enumerate(budgets):
+                tasks = [{
+                    'trial_id': trial_id, 'params': trials[trial_id], 'data': self.data,
+                    'checkpoint': checkpoints[trial_id], 'start_epoch': trained[trial_id],
+                    'end_epoch': budget, 'threads': threads, 'seed': settings['seed'],
+                    'validation_split': settings['validation_split'],
+                    'train_positions': settings['train_positions'],
+                    'val_positions': settings['val_positions'],
+                } for trial_id in survivors]
+                for result in pool.map(train_trial, tasks):
+                    trial_id = result['trial_id']
+                    self._record(connection, result, rung)
+                    epochs_run += len(result['epochs'])
+                    trained[trial_id] = budget
+                    if result['failed']:
+                        survivors.remove(trial_id)
+                        logger.warning(f"Trial {trial_id} diverged: {trials[trial_id]}")
+                    else:
+                        val_loss[trial_id] = result['epochs'][-1]['val_loss']
+
+                survivors.sort(key=lambda trial_id: val_loss[trial_id])
+                if not survivors:
+                    break
+                logger.info(f"Rung {rung} ({budget} epochs): best val loss "
+                            f"{val_loss[survivors[0]]:.4f} {trials[survivors[0]]}")
+                if rung + 1 < len(budgets):
+                    keep = max(1, len(survivors) // settings['eta'])
+                    stopped, survivors = survivors[keep:], survivors[:keep]
+                    connection.executemany(
+                        "UPDATE trials SET status = 'stopped' WHERE sweep_id = ? AND trial_id = ?",
+                        [(self.sweep_id, trial_id) for trial_id in stopped])
+                    connection.commit()
+
+        connection.executemany(
+            "UPDATE trials SET status = 'completed' WHERE sweep_id = ? AND trial_id = ?",
+            [(self.sweep_id, trial_id) for trial_id in survivors])
+        connection.commit()
+        connection.close()
+
+        full_budget = len(trials) * settings['max_epochs']
+        logger.info(f"Sweep {self.sweep_id} finished in {time.time() - start:.0f}s: "
+                    f"{epochs_run} trial epochs instead of {full_budget} without early stopping")
+        if not survivors:
+            raise RuntimeError(f"Every trial of sweep {self.sweep_id} diverged")
+        best = survivors[0]
+        return {
+            'sweep_id': self.sweep_id,
+            'trial_id': best,
+            'params': trials[best],
+            'val_loss': val_loss[best],
+            'checkpoint': checkpoints[best],
+            'epochs_run': epochs_run,
+            'full_budget': full_budget,
+        }
@@ -0,0 +1,240 @@
+"""
+Metrics - Latency spans, histograms and counters for the bot
+
+Components time their work with span() (a context manager that works in
+sync and async code, and from worker threads) and count events with inc().
+Collectors expose counters components already keep (write buffer, opening
+book, tablebase) at scrape time. MetricsServer serves everything in the
+Prometheus text format on METRICS_PORT, so tail latency can be alerted on
+with histogram_quantile() over the *_seconds histograms.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from aiohttp import web
+from loguru import logger
+
+# Seconds; spans from sub-millisecond cache hits up to long opponent waits
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_HELP = {
+    'sophie_move_stage_seconds': 'Time spent per ply stage (think, evaluate, submit, opponent_wait)',
+    'sophie_moves_total': 'Moves played by the bot per move source',
+    'sophie_games_total': 'Finished games per result',
+    'sophie_model_inference_seconds': 'Model move selection latency per method',
+    'sophie_search_nodes_total': 'Nodes visited by the model-driven searches',
+    'sophie_model_evaluations_total': 'Positions evaluated by the network during searches',
+    'sophie_engine_seconds': 'Stockfish call latency per operation',
+    'sophie_engine_nodes_total': 'Nodes searched by Stockfish per operation',
+    'sophie_lichess_request_seconds': 'Lichess API latency per endpoint',
+    'sophie_lichess_errors_total': 'Failed Lichess API calls per endpoint',
+    'sophie_db_flush_seconds': 'Write-behind flush latency',
+    'sophie_db_pending_rows': 'Rows waiting in the write-behind buffer',
+    'sophie_db_idle_readers': 'Read-only connections available in the pool',
+    'sophie_db_rows_written_total': 'Rows written by write-behind flushes',
+    'sophie_db_failed_flushes_total': 'Write-behind flushes that were rolled back',
+    'sophie_db_rejected_rows_total': 'Buffered rows set aside in the dead-letter file',
+    'sophie_book_lookups_total': 'Opening book lookups',
+    'sophie_book_hits_total': 'Opening book lookups that returned a move',
+    'sophie_tablebase_probes_total': 'Syzygy probes',
+    'sophie_tablebase_hits_total': 'Syzygy probes answered by a table',
+    'sophie_tablebase_cache_hits_total': 'Syzygy probes answered from the LRU cache',
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+# (name, 'counter' | 'gauge', labels, value)
+Sample = Tuple[str, str, Dict[str, str], float]
+
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (inf past the last bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class MetricsRegistry:
+    """Thread-safe store of histograms, counters, gauges and collectors."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.gauges: Dict[Tuple[str, Labels], float] = {}
+        self.collectors: Dict[str, Callable[[], Iterable[Sample]]] = {}
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self.gauges[(name, _labels(labels))] = value
+
+    @contextmanager
+    def span(self, name: str, **labels) -> Iterator[None]:
+        """Time the body into the histogram `name`, even when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def register_collector(self, key: str, collector: Callable[[], Iterable[Sample]]):
+        """Add (or replace) a callback read at every scrape."""
+        with self._lock:
+            self.collectors[key] = collector
+
+    def histogram(self, name: str, **labels) -> Optional[Histogram]:
+        return self.histograms.get((name, _labels(labels)))
+
+    def _collected(self) -> List[Tuple[str, str, Labels, float]]:
+        samples = []
+        for key, collector in list(self.collectors.items()):
+            try:
+                for name, kind, labels, value in collector():
+                    samples.append((name, kind, _labels(labels), float(value)))
+            except Exception as e:
+                logger.warning(f"Metrics collector {key} failed: {e}")
+        return samples
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        families: Dict[str, Tuple[str, List[str]]] = {}
+
+        def family(name: str, kind: str) -> List[str]:
+            return families.setdefault(name, (kind, []))[1]
+
+        with self._lock:
+            histograms = [(key, list(h.counts), h.sum, h.count, h.buckets)
+                          for key, h in self.histograms.items()]
+            scalars = ([(name, 'counter', labels, value) for (name, labels), value in self.counters.items()]
+                       + [(name, 'gauge', labels, value) for (name, labels), value in self.gauges.items()])
+
+        for (name, labels), counts, total, count, buckets in sorted(histograms):
+            lines = family(name, 'histogram')
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{_format_labels(labels, ("le", repr(bound)))} {cumulative}')
+            lines.append(f'{name}_bucket{_format_labels(labels, ("le", "+Inf"))} {count}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {total}')
+            lines.append(f'{name}_count{_format_labels(labels)} {count}')
+
+        for name, kind, labels, value in sorted(scalars + self._collected()):
+            family(name, kind).append(f'{name}{_format_labels(labels)} {value:g}')
+
+        output = []
+        for name, (kind, lines) in families.items():
+            if name in METRIC_HELP:
+                output.append(f'# HELP {name} {METRIC_HELP[name]}')
+            output.append(f'# TYPE {name} {kind}')
+            output.extend(lines)
+        return '\n'.join(output) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+span = REGISTRY.span
+observe = REGISTRY.observe
+inc = REGISTRY.inc
+set_gauge = REGISTRY.set_gauge
+register_collector = REGISTRY.register_collector
+
+
+class MetricsServer:
+    """
+    Serves /metrics for Prometheus on METRICS_HOST:METRICS_PORT (0 disables
+    it). With a profiler, GET /profile reports its status and POST
+    /profile/start and /profile/stop control it.
+    """
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, host: Optional[str] = None,
+                 port: Optional[int] = None, profiler=None):
+        self.registry = registry
+        self.profiler = profiler
+        self.host = host or os.getenv('METRICS_HOST', '127.0.0.1')
+        self.port = int(os.getenv('METRICS_PORT', '9108')) if port is None else port
+        self.runner: Optional[web.AppRunner] = None
+
+    async def _metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.registry.render(), content_type='text/plain',
+                            charset='utf-8', headers={'X-Prometheus-Format': '0.0.4'})
+
+    async def _profile_status(self, request: web.Request) -> web.Response:
+        return web.json_response(self.profiler.status())
+
+    async def _profile_start(self, request: web.Request) -> web.Response:
+        self.profiler.start()
+        return web.json_response(self.profiler.status())
+
+    async def _profile_stop(self, request: web.Request) -> web.Response:
+        # Writing the files is quick compared with the run; keep it on the loop
+        paths = self.profiler.stop()
+        return web.json_response({**self.profiler.status(), 'files': paths})
+
+    async def start(self):
+        if not self.port:
+            logger.info("Metrics endpoint disabled (METRICS_PORT=0)")
+            return
+        app = web.Application()
+        app.router.add_get('/metrics', self._metrics)
+        if self.profiler is not None:
+            app.router.add_get('/profile', self._profile_status)
+            app.router.add_post('/profile/start', self._profile_start)
+            app.router.add_post('/profile/stop', self._profile_stop)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        logger.info(f"Metrics available at http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
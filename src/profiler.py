@@ -0,0 +1,248 @@
+"""
+Profiler - On-demand sampling profiler for the running bot
+
+A background thread samples the stacks of every thread (the asyncio loop
+and the to_thread workers running searches) with sys._current_frames().
+While it runs, event loop callbacks are timed to find slow ones, and task
+counts are tracked. On stop, results are written to data/logs/ as
+collapsed stacks (flamegraph.pl, speedscope), speedscope JSON and an
+asyncio report.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+# (function, file, first line) from the root of the stack down
+Stack = Tuple[Tuple[str, str, int], ...]
+
+
+def _describe_callback(handle: asyncio.Handle) -> str:
+    """Readable name for a loop callback, naming the coroutine for task steps."""
+    callback = getattr(handle, '_callback', None)
+    owner = getattr(callback, '__self__', None)
+    if isinstance(owner, asyncio.Task):
+        coro = owner.get_coro()
+        return f"task {getattr(coro, '__qualname__', repr(coro))}"
+    return getattr(callback, '__qualname__', repr(callback))
+
+
+class SamplingProfiler:
+    """Samples all thread stacks and loop callback timings between start() and stop()."""
+
+    def __init__(self, interval: Optional[float] = None, output_dir: Optional[str] = None,
+                 slow_callback_ms: Optional[float] = None, max_duration: Optional[float] = None):
+        self.interval = interval or float(os.getenv('PROFILE_INTERVAL', '0.005'))
+        self.output_dir = Path(output_dir or os.getenv('PROFILE_DIR', 'data/logs'))
+        self.slow_callback = (slow_callback_ms or float(os.getenv('PROFILE_SLOW_CALLBACK_MS', '50'))) / 1000
+        self.max_duration = max_duration or float(os.getenv('PROFILE_MAX_SECONDS', '600'))
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._original_handle_run = None
+        self._reset()
+
+    def _reset(self):
+        self.stacks: Dict[str, Counter] = defaultdict(Counter)
+        self.samples = 0
+        self.started = 0.0
+        self.elapsed = 0.0
+        self.callbacks = 0
+        self.callback_time = 0.0
+        self.slow_callbacks: Dict[str, List[float]] = defaultdict(list)
+        self.max_tasks = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Start sampling; call from the event loop thread to also time its callbacks."""
+        if self.running:
+            return
+        self._reset()
+        try:
+            self.loop = loop or asyncio.get_running_loop()
+        except RuntimeError:
+            self.loop = None
+        self._stop_event.clear()
+        self.started = time.perf_counter()
+        if self.loop is not None:
+            self._install_callback_timer()
+            self.loop.call_soon(self._count_tasks)
+        self._thread = threading.Thread(target=self._sample_loop, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        logger.info(f"Profiler started (every {self.interval * 1000:.1f} ms, "
+                    f"slow callbacks over {self.slow_callback * 1000:.0f} ms)")
+
+    def stop(self) -> Dict[str, str]:
+        """Stop sampling and write the results; returns the written paths."""
+        if not self.running:
+            return {}
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        self._remove_callback_timer()
+        self.elapsed = time.perf_counter() - self.started
+        paths = self.write()
+        logger.info(f"Profiler stopped: {self.samples} samples in {self.elapsed:.1f}s -> {paths['collapsed']}")
+        return paths
+
+    def toggle(self) -> Dict[str, str]:
+        if self.running:
+            return self.stop()
+        self.start()
+        return {}
+
+    def status(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started if self.running else self.elapsed
+        return {
+            'running': self.running,
+            'samples': self.samples,
+            'seconds': elapsed,
+            'interval': self.interval,
+            'slow_callbacks': sum(len(times) for times in self.slow_callbacks.values()),
+        }
+
+    # Sampling
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        deadline = self.started + self.max_duration
+        while not self._stop_event.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                    frame = frame.f_back
+                self.stacks[names.get(ident, str(ident))][tuple(reversed(stack))] += 1
+            self.samples += 1
+            if time.perf_counter() > deadline:
+                logger.warning(f"Profiler reached PROFILE_MAX_SECONDS ({self.max_duration:.0f}s), stopping")
+                if self.loop is not None and self.loop.is_running():
+                    self.loop.call_soon_threadsafe(self.stop)
+                break
+
+    # Event loop instrumentation
+
+    def _install_callback_timer(self):
+        """Time every Handle._run (callbacks and task steps) while profiling."""
+        original = asyncio.events.Handle._run
+        profiler = self
+
+        def _run(handle):
+            start = time.perf_counter()
+            try:
+                return original(handle)
+            finally:
+                elapsed = time.perf_counter() - start
+                profiler.callbacks += 1
+                profiler.callback_time += elapsed
+                if elapsed >= profiler.slow_callback:
+                    profiler.slow_callbacks[_describe_callback(handle)].append(elapsed)
+
+        self._original_handle_run = original
+        asyncio.events.Handle._run = _run
+
+    def _remove_callback_timer(self):
+        if self._original_handle_run is not None:
+            asyncio.events.Handle._run = self._original_handle_run
+            self._original_handle_run = None
+
+    def _count_tasks(self):
+        if not self.running or self.loop is None:
+            return
+        self.max_tasks = max(self.max_tasks, len(asyncio.all_tasks(self.loop)))
+        self.loop.call_later(1.0, self._count_tasks)
+
+    def asyncio_report(self) -> Dict[str, Any]:
+        """Task and callback statistics gathered during the run."""
+        tasks = Counter()
+        if self.loop is not None and not self.loop.is_closed():
+            for task in asyncio.all_tasks(self.loop):
+                coro = task.get_coro()
+                tasks[getattr(coro, '__qualname__', repr(coro))] += 1
+        slow = sorted(((name, times) for name, times in self.slow_callbacks.items()),
+                      key=lambda item: -sum(item[1]))
+        return {
+            'seconds': self.elapsed,
+            'callbacks': self.callbacks,
+            'callback_seconds': self.callback_time,
+            'loop_busy_pct': 100 * self.callback_time / self.elapsed if self.elapsed else 0.0,
+            'slow_callback_ms': self.slow_callback * 1000,
+            'slow_callbacks': [{'callback': name, 'count': len(times), 'total_ms': 1000 * sum(times),
+                                'max_ms': 1000 * max(times)} for name, times in slow[:50]],
+            'max_tasks': self.max_tasks,
+            'tasks': dict(tasks.most_common()),
+        }
+
+    # Output
+
+    @staticmethod
+    def _frame_name(frame: Tuple[str, str, int]) -> str:
+        name, filename, line = frame
+        return f"{name} ({os.path.basename(filename)}:{line})"
+
+    def collapsed(self) -> List[str]:
+        """One 'thread;frame;frame count' line per distinct stack."""
+        lines = []
+        for thread, stacks in self.stacks.items():
+            for stack, count in stacks.most_common():
+                frames = ';'.join(self._frame_name(frame) for frame in stack)
+                lines.append(f"{thread};{frames} {count}")
+        return lines
+
+    def speedscope(self) -> Dict[str, Any]:
+        """Sampled profiles, one per thread, in the speedscope file format."""
+        frames: List[Dict[str, Any]] = []
+        index: Dict[Tuple[str, str, int], int] = {}
+        profiles = []
+        for thread, stacks in self.stacks.items():
+            samples, weights = [], []
+            for stack, count in stacks.items():
+                for frame in stack:
+                    if frame not in index:
+                        index[frame] = len(frames)
+                        frames.append({'name': frame[0], 'file': frame[1], 'line': frame[2]})
+                samples.append([index[frame] for frame in stack])
+                weights.append(count * self.interval)
+            profiles.append({'type': 'sampled', 'name': thread, 'unit': 'seconds',
+                             'startValue': 0, 'endValue': sum(weights),
+                             'samples': samples, 'weights': weights})
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': f'SophieBot profile ({self.samples} samples)',
+            'exporter': 'src.profiler',
+            'shared': {'frames': frames},
+            'profiles': profiles,
+        }
+
+    def write(self) -> Dict[str, str]:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        # Millisecond stamp: a quick start/stop pair must not overwrite the previous run
+        stem = self.output_dir / f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')[:-3]}"
+        paths = {
+            'collapsed': f"{stem}.collapsed",
+            'speedscope': f"{stem}.speedscope.json",
+            'asyncio': f"{stem}-asyncio.json",
+        }
+        with open(paths['collapsed'], 'w', encoding='utf-8') as f:
+            f.write('\n'.join(self.collapsed()) + '\n')
+        with open(paths['speedscope'], 'w', encoding='utf-8') as f:
+            json.dump(self.speedscope(), f)
+        with open(paths['asyncio'], 'w', encoding='utf-8') as f:
+            json.dump(self.asyncio_report(), f, indent=2)
+        return paths
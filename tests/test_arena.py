@@ -0,0 +1,121 @@
+import random
+
+import chess
+import torch
+
+from src.engine.arena import SPRT, Arena, ModelPlayer, elo_to_score, load_openings, score_to_elo
+from src.learning.neural_network import ChessNet, ChessTrainer
+
+
+def _simulate(sprt, elo, rng, max_pairs=20000):
+    """Feed pairs of games with a true Elo advantage until the test decides."""
+    win = elo_to_score(elo) - 0.2
+    while sprt.status() is None and sprt.count < max_pairs:
+        pair = 0.0
+        for _ in range(2):
+            r = rng.random()
+            pair += 1.0 if r < win else 0.5 if r < win + 0.4 else 0.0
+        sprt.add(pair)
+    return sprt.status()
+
+
+def test_sprt_decides_for_clear_differences():
+    rng = random.Random(0)
+    assert _simulate(SPRT(elo0=0, elo1=10), 60, rng) == 'H1'
+    assert _simulate(SPRT(elo0=0, elo1=10), -60, rng) == 'H0'
+    assert _simulate(SPRT(elo0=0, elo1=10), 0, rng) == 'H0'
+
+
+def test_sprt_bounds_and_estimate():
+    sprt = SPRT(alpha=0.05, beta=0.05)
+    lower, upper = sprt.bounds
+    assert abs(lower + 2.944) < 1e-3 and abs(upper - 2.944) < 1e-3
+    assert sprt.status() is None and sprt.llr() == 0.0
+
+    for score in (2.0, 1.0, 1.5, 1.0, 0.5, 1.5):
+        sprt.add(score)
+    elo, margin = sprt.elo()
+    assert abs(elo - score_to_elo(7.5 / 12)) < 1.0 and margin > 0
+    assert sprt.status() is None
+
+    sprt = SPRT()
+    for _ in range(200):
+        sprt.add(2.0)
+    assert sprt.status() == 'H1'
+
+
+def test_load_openings(tmp_path):
+    board = chess.Board()
+    board.push_san('e4')
+    path = tmp_path / "openings.epd"
+    path.write_text(f"# comment\n{board.epd()}\n{chess.STARTING_FEN}\n")
+    fens = load_openings(str(path))
+    assert fens == [board.fen(), chess.STARTING_FEN]
+    assert load_openings(None) == [chess.STARTING_FEN]
+
+
+def _checkpoints(tmp_path):
+    paths = []
+    for seed in (0, 1):
+        torch.manual_seed(seed)
+        path = tmp_path / f"model{seed}.pth"
+        ChessTrainer(ChessNet(hidden_size=32)).save_model(str(path))
+        paths.append(str(path))
+    return paths
+
+
+def test_start_positions_are_never_repeated():
+    board = chess.Board()
+    board.push_san('e4')
+    openings = [chess.STARTING_FEN, board.fen()]
+
+    # Without random plies each opening is played once
+    arena = Arena({}, {}, openings, random_plies=0)
+    assert sorted(arena._starts()) == sorted(openings)
+
+    # One random ply: replies to each opening until random tries find nothing new
+    arena = Arena({}, {}, openings, random_plies=1)
+    starts = list(arena._starts())
+    replies = set()
+    for fen in openings:
+        for move in chess.Board(fen).legal_moves:
+            child = chess.Board(fen)
+            child.push(move)
+            replies.add(child.fen())
+    assert len(starts) == len(set(starts)) and set(starts) <= replies
+    assert len(starts) > 30
+
+
+def test_checkpoints_sample_their_first_moves(tmp_path):
+    path = _checkpoints(tmp_path)[0]
+    board = chess.Board()
+
+    def first_moves(temperature_plies):
+        player = ModelPlayer(path, nodes=16, temperature_plies=temperature_plies)
+        moves = set()
+        for _ in range(10):
+            player.new_game(board)
+            moves.add(player.move(board))
+        return moves
+
+    assert len(first_moves(0)) == 1
+    assert len(first_moves(8)) > 1
+
+
+def test_arena_match_between_checkpoints(tmp_path):
+    paths = _checkpoints(tmp_path)
+    arena = Arena({'kind': 'model', 'path': paths[0], 'nodes': 4},
+                  {'kind': 'model', 'path': paths[1], 'nodes': 4},
+                  [chess.STARTING_FEN], workers=2, max_pairs=3, max_plies=12)
+    summary = arena.run()
+    assert summary['pairs'] == 3 and sum(summary['pentanomial']) == 3
+    assert summary['wins'] + summary['draws'] + summary['losses'] == 6
+
+
+def test_arena_stops_when_start_positions_run_out(tmp_path):
+    paths = _checkpoints(tmp_path)
+    arena = Arena({'kind': 'model', 'path': paths[0], 'nodes': 4},
+                  {'kind': 'model', 'path': paths[1], 'nodes': 4},
+                  [chess.STARTING_FEN], workers=1, max_pairs=3, max_plies=8, random_plies=0)
+    summary = arena.run()
+    assert summary['pairs'] == 1 and summary['openings_exhausted']
@@ -0,0 +1,31 @@
+from benchmarks.harness import BENCHMARKS, Case, SkipBenchmark, benchmark, compare, run, select
+
+
+def test_harness_times_cases_records_skips_and_flags_regressions():
+    torn_down = []
+
+    @benchmark('toy.sum')
+    async def toy():
+        yield Case(lambda: {'items_per_second': 1000.0}, ops=10)
+        torn_down.append(True)
+
+    @benchmark('toy.skipped')
+    async def skipped():
+        raise SkipBenchmark("no binary")
+        yield
+
+    try:
+        results = run(select(['toy.*']), repeat=3)
+    finally:
+        BENCHMARKS.pop('toy.sum')
+        BENCHMARKS.pop('toy.skipped')
+
+    entry = results['benchmarks']['toy.sum']
+    assert torn_down and entry['repeat'] == 3 and entry['seconds_per_op'] > 0
+    assert results['skipped'] == {'toy.skipped': 'no binary'}
+
+    slower = {'benchmarks': {'toy.sum': {**entry, 'seconds_per_op': entry['seconds_per_op'] * 1.5,
+                                         'metrics': {'items_per_second': 2000.0}}}}
+    rows = {(name, metric): regressed for name, metric, _, _, _, regressed in compare(results, slower)}
+    assert rows == {('toy.sum', 'seconds_per_op'): True, ('toy.sum', 'items_per_second'): False}
+    assert not any(row[5] for row in compare(results, results))
@@ -0,0 +1,195 @@
+import asyncio
+import json
+
+import pytest
+import pytest_asyncio
+from aiohttp.test_utils import TestClient, TestServer
+
+from dashboard import EventBroadcaster, ResponseCache, create_app
+from src.database.db_manager import DatabaseManager
+
+
+def _game(game_id, result='win'):
+    return {
+        'game_id': game_id,
+        'opponent': 'Maia1',
+        'color': 'white',
+        'result': result,
+        'time_control': '5+0',
+        'moves': ['e2e4', 'e7e5'],
+        'move_times': [0.5],
+        'evaluations': [0.3, 0.2],
+        'pgn': '1. e4 e5 *',
+        'duration': 60.0,
+    }
+
+
+@pytest_asyncio.fixture
+async def bot_db(tmp_path, monkeypatch):
+    """The bot's side: writes games and events to the database the dashboard reads."""
+    monkeypatch.setenv('DB_PATH', str(tmp_path / 'bot.db'))
+    monkeypatch.setenv('DB_FLUSH_INTERVAL', '0')
+    monkeypatch.setenv('DASHBOARD_POLL_INTERVAL', '0.01')
+    manager = DatabaseManager()
+    await manager.initialize()
+    for i in range(3):
+        await manager.save_game(_game(f'g{i}', result='win' if i else 'loss'))
+    yield manager
+    await manager.close()
+
+
+@pytest_asyncio.fixture
+async def client(bot_db):
+    client = TestClient(TestServer(create_app()))
+    await client.start_server()
+    yield client
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_stats_and_recent_games(client):
+    response = await client.get('/api/stats')
+    assert response.status == 200
+    stats = await response.json()
+    assert stats['total_games'] == 3 and stats['wins'] == 2 and stats['losses'] == 1
+
+    response = await client.get('/api/recent-games', params={'limit': '2'})
+    assert len(await response.json()) == 2
+
+    # Not modified while the cached body is unchanged
+    etag = response.headers['ETag']
+    response = await client.get('/api/recent-games?limit=2', headers={'If-None-Match': etag})
+    assert response.status == 304
+
+
+@pytest.mark.asyncio
+async def test_query_parameters_are_validated_and_clamped(client):
+    for path in ('/api/recent-games?limit=abc', '/api/timeseries?points=1.5', '/api/timeseries?bucket=week'):
+        response = await client.get(path)
+        assert response.status == 400, path
+
+    # Negative limits no longer mean "no limit"
+    response = await client.get('/api/recent-games?limit=-1')
+    assert response.status == 200 and len(await response.json()) == 1
+    response = await client.get('/api/recent-games?limit=100000')
+    assert len(await response.json()) == 3
+
+
+@pytest.mark.asyncio
+async def test_cache_is_keyed_on_normalized_parameters(client):
+    cache = client.app['cache']
+    for query in ('', '?limit=10', '?limit=10&x=1', '?limit=010', '?x=2'):
+        assert (await client.get('/api/recent-games' + query)).status == 200
+    for query in ('?limit=500', '?limit=100'):
+        assert (await client.get('/api/recent-games' + query)).status == 200
+    assert sorted(cache.entries) == ['recent-games?limit=10', 'recent-games?limit=100']
+
+
+@pytest.mark.asyncio
+async def test_cache_evicts_beyond_max_entries():
+    cache = ResponseCache(max_entries=2)
+
+    async def produce():
+        return {'ok': True}
+
+    for key in ('a', 'b', 'c'):
+        await cache.get(key, 60, produce)
+    assert list(cache.entries) == ['b', 'c']
+
+    # Expired entries go before live ones
+    await cache.get('d', -1, produce)
+    await cache.get('e', 60, produce)
+    assert list(cache.entries) == ['c', 'e']
+
+
+@pytest.mark.asyncio
+async def test_dashboard_opens_the_database_read_only(client):
+    db = client.app['db']
+    assert db.connection is None
+    with pytest.raises(Exception, match='readonly'):
+        async with db.reader() as connection:
+            await connection.execute("DELETE FROM games")
+
+
+class FakeEvents:
+    """Stands in for the database behind an EventBroadcaster."""
+
+    def __init__(self):
+        self.events = []
+
+    def add(self, event_type, **payload):
+        self.events.append((len(self.events) + 1, event_type, json.dumps(payload)))
+
+    async def get_last_event_id(self):
+        return 0
+
+    async def get_events_since(self, last_id, limit=500):
+        return [event for event in self.events if event[0] > last_id][:limit]
+
+
+async def _drain(queue, count):
+    return [await asyncio.wait_for(queue.get(), 1) for _ in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_broadcaster_fans_out_and_drops_slow_viewers():
+    events = FakeEvents()
+    cache = ResponseCache()
+    cache.entries['stats'] = (float('inf'), b'{}', '"etag"')
+    broadcaster = EventBroadcaster(events, cache, poll_interval=0.01)
+    await broadcaster.start()
+    fast, slow = broadcaster.subscribe(), broadcaster.subscribe()
+
+    for ply in range(200):
+        events.add('move', ply=ply)
+    assert [event[0] for event in await _drain(fast, 200)] == list(range(1, 201))
+    assert (await _drain(slow, 1))[0][0] == 1
+    assert 'stats' in cache.entries
+
+    # The slow viewer overflows its queue and is told to go away; the fast one keeps up
+    for ply in range(200, 300):
+        events.add('move', ply=ply)
+    events.add('game_end', result='win')
+    assert [event[0] for event in await _drain(fast, 101)][-1] == 301
+    assert slow not in broadcaster.subscribers and slow.get_nowait() is None
+    assert fast in broadcaster.subscribers
+    # A finished game invalidates the cached aggregates
+    assert not cache.entries
+    await broadcaster.stop()
+
+
+async def _read_events(response, count):
+    events = []
+    while len(events) < count:
+        block = (await asyncio.wait_for(response.content.readuntil(b'\n\n'), 2)).decode()
+        if block.startswith(':'):
+            continue
+        fields = dict(line.split(': ', 1) for line in block.strip().split('\n'))
+        events.append((int(fields['id']), fields['event'], json.loads(fields['data'])))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_events_replay_without_duplicates(client, bot_db, monkeypatch):
+    for ply in range(3):
+        await bot_db.publish_event('move', {'ply': ply})
+    first = (await bot_db.get_events_since(0))[0][0]
+
+    # The last event reached the viewer's queue as well as the replay
+    broadcaster = client.app['events']
+    subscribe = broadcaster.subscribe
+    already_queued = (await bot_db.get_events_since(first + 1))[0]
+
+    def subscribe_with_overlap():
+        queue = subscribe()
+        queue.put_nowait(already_queued)
+        return queue
+
+    monkeypatch.setattr(broadcaster, 'subscribe', subscribe_with_overlap)
+    response = await client.get('/api/events', headers={'Last-Event-ID': str(first)})
+    assert [event[2]['ply'] for event in await _read_events(response, 2)] == [1, 2]
+
+    # A game_end event is committed by publish_event and reaches the open stream
+    await bot_db.publish_event('game_end', {'game_id': 'g9'})
+    assert await _read_events(response, 1) == [(first + 3, 'game_end', {'game_id': 'g9'})]
+    response.close()
@@ -0,0 +1,219 @@
+import sqlite3
+
+import pytest
+import pytest_asyncio
+
+from src.database.db_manager import DatabaseManager
+
+LEGACY_SCHEMA = '''
+    CREATE TABLE games (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        game_id TEXT UNIQUE,
+        opponent TEXT,
+        color TEXT,
+        result TEXT,
+        moves TEXT,
+        move_times TEXT,
+        evaluations TEXT,
+        pgn TEXT,
+        duration REAL
+    )
+'''
+
+
+def _game(game_id, result='win', color='white', opponent='Maia1'):
+    return {
+        'game_id': game_id,
+        'opponent': opponent,
+        'color': color,
+        'result': result,
+        'time_control': '5+0',
+        'moves': ['e2e4', 'e7e5', 'g1f3'],
+        'move_times': [0.5, 0.7],
+        'evaluations': [0.3, 0.2, 0.4],
+        'pgn': '[Date "2024.05.01"]\n\n1. e4 e5 2. Nf3 *',
+        'duration': 120.0,
+    }
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path, monkeypatch):
+    monkeypatch.setenv('DB_PATH', str(tmp_path / 'bot.db'))
+    manager = DatabaseManager()
+    await manager.initialize()
+    yield manager
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_save_game_stores_moves_per_ply(db):
+    await db.save_game(_game('g1'))
+    await db.flush()
+    moves = await db.get_game_moves('g1')
+    assert [m['uci'] for m in moves] == ['e2e4', 'e7e5', 'g1f3']
+    # Only our (white) plies carry move times
+    assert [m['move_time'] for m in moves] == [0.5, None, 0.7]
+    assert moves[0]['zobrist'] != moves[1]['zobrist']
+
+    recent = await db.get_recent_games()
+    assert recent[0]['game_id'] == 'g1' and recent[0]['date'] is not None
+    assert (await db.get_opponent_statistics('Maia1'))['wins'] == 1
+
+
+@pytest.mark.asyncio
+async def test_legacy_database_is_migrated(tmp_path, monkeypatch):
+    path = tmp_path / 'legacy.db'
+    conn = sqlite3.connect(path)
+    conn.execute(LEGACY_SCHEMA)
+    conn.execute(
+        'INSERT INTO games (game_id, opponent, color, result, moves, move_times, evaluations, pgn, duration) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        ('old', 'Maia5', 'black', 'loss', 'e2e4,e7e5', '1.5', '0.3,0.1',
+         '[Date "2024.05.01"]\n\n1. e4 e5 *', 60.0)
+    )
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setenv('DB_PATH', str(path))
+    manager = DatabaseManager()
+    await manager.initialize()
+    try:
+        moves = await manager.get_game_moves('old')
+        assert [(m['uci'], m['move_time'], m['evaluation']) for m in moves] == [
+            ('e2e4', None, 0.3), ('e7e5', 1.5, 0.1)
+        ]
+        recent = await manager.get_recent_games()
+        assert recent[0]['date'] == '2024-05-01T00:00:00'
+        await manager.save_game(_game('new'))
+        await manager.flush()
+        assert (await manager.get_bot_statistics())['games_played'] == 2
+    finally:
+        await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_incremental_statistics_match_rebuild(db):
+    results = ['win', 'loss', 'draw', 'win', 'unknown'] * 3
+    for i, result in enumerate(results):
+        color = 'white' if i % 2 == 0 else 'black'
+        await db.save_game(_game(f'g{i}', result=result, color=color, opponent=f'bot{i % 2}'))
+    await db.flush()
+    assert db.get_write_metrics()['pending_rows'] == 0
+
+    stats = await db.get_bot_statistics()
+    assert stats == {'games_played': 15, 'wins': 6, 'losses': 3, 'draws': 3}
+    breakdown = await db.get_statistics_breakdown()
+    assert breakdown['last_10']['']['games_played'] == 10
+    assert breakdown['last_10']['']['wins'] == 4
+    assert breakdown['color']['white']['games_played'] == 8
+
+    await db._rebuild_statistics()
+    assert await db.get_bot_statistics() == stats
+    assert await db.get_statistics_breakdown() == breakdown
+
+
+@pytest.mark.asyncio
+async def test_writes_are_buffered_until_flush(db):
+    await db.save_game(_game('g1'))
+    assert await db.get_recent_games() == []
+    assert db.get_write_metrics()['pending_rows'] == 4
+
+    await db.flush()
+    metrics = db.get_write_metrics()
+    assert metrics['pending_rows'] == 0 and metrics['rows_written'] == 4 and metrics['flushes'] == 1
+    assert len(await db.get_recent_games()) == 1
+
+
+@pytest.mark.asyncio
+async def test_rejected_game_does_not_block_later_saves(db):
+    await db.save_game(_game('g1'))
+    await db.flush()
+    # A duplicate game_id violates the UNIQUE constraint on games
+    await db.save_game(_game('g1'))
+    await db.save_game(_game('g2', result='loss'))
+    await db.flush()
+
+    metrics = db.get_write_metrics()
+    assert metrics['pending_rows'] == 0 and metrics['rejected_rows'] == 4
+    assert [g['game_id'] for g in await db.get_recent_games()] == ['g2', 'g1']
+    assert [m['uci'] for m in await db.get_game_moves('g2')] == ['e2e4', 'e7e5', 'g1f3']
+    # The duplicate neither doubled g1's moves nor its statistics
+    assert len(await db.get_game_moves('g1')) == 3
+    stats = await db.get_opponent_statistics('Maia1')
+    assert stats['games_played'] == 2 and stats['wins'] == 1 and stats['losses'] == 1
+
+    with open(db.dead_letter_path) as f:
+        assert len(f.readlines()) == 4
+
+    await db.save_game(_game('g3'))
+    await db.close()
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_requeue_the_batch(db, monkeypatch):
+    executemany = db.connection.executemany
+    failures = [2]
+
+    async def flaky_executemany(sql, rows):
+        if failures[0]:
+            failures[0] -= 1
+            raise sqlite3.OperationalError('database is locked')
+        return await executemany(sql, rows)
+
+    monkeypatch.setattr(db.connection, 'executemany', flaky_executemany)
+    await db.save_game(_game('g1'))
+    for _ in range(2):
+        with pytest.raises(sqlite3.OperationalError):
+            await db.flush()
+    # Nothing was set aside: the batch waits in the buffer for the next flush
+    metrics = db.get_write_metrics()
+    assert metrics['pending_rows'] == 4 and metrics['rejected_rows'] == 0 and metrics['failed_flushes'] == 2
+
+    await db.flush()
+    metrics = db.get_write_metrics()
+    assert metrics['pending_rows'] == 0 and metrics['rows_written'] == 4
+    assert [g['game_id'] for g in await db.get_recent_games()] == ['g1']
+
+    # A lock that never clears: the batch goes to the dead-letter file after DB_FLUSH_RETRIES
+    failures[0] = 100
+    await db.save_game(_game('g2'))
+    for _ in range(db.flush_retries):
+        with pytest.raises(sqlite3.OperationalError):
+            await db.flush()
+    await db.flush()
+    metrics = db.get_write_metrics()
+    assert metrics['pending_rows'] == 0 and metrics['rejected_rows'] == 4
+
+
+@pytest.mark.asyncio
+async def test_move_events_wait_for_the_flush_and_game_end_flushes(db):
+    await db.publish_event('move', {'ply': 1})
+    await db.save_game(_game('g1'))
+    assert await db.get_last_event_id() == 0 and db.get_write_metrics()['pending_rows'] == 5
+
+    await db.publish_event('game_end', {'game_id': 'g1'})
+    assert db.get_write_metrics()['pending_rows'] == 0
+    assert [event[1] for event in await db.get_events_since(0)] == ['move', 'game_end']
+    assert len(await db.get_recent_games()) == 1
+
+
+@pytest.mark.asyncio
+async def test_performance_rollups_match_rebuild(db):
+    for i, result in enumerate(['win', 'loss', 'win']):
+        game = _game(f'g{i}', result=result)
+        game['played_at'] = f'2024-05-0{1 + i // 2}T1{i}:00:00'
+        await db.save_game(game)
+    await db.flush()
+
+    series = await db.get_performance_series('day')
+    assert series['t'] == ['2024-05-01', '2024-05-02']
+    assert series['games'] == [2, 1] and series['win_rate'] == [50.0, 100.0]
+    assert series['avg_move_time'] == [0.6, 0.6]
+    # White's second move takes the eval from +0.2 (for us) to +0.4 for them
+    assert series['avg_cp_loss'] == [60.0, 60.0]
+    hourly = await db.get_performance_series('hour')
+    assert hourly['t'] == ['2024-05-01T10', '2024-05-01T11', '2024-05-02T12']
+
+    await db._rebuild_statistics()
+    assert await db.get_performance_series('day') == series
+    assert await db.get_performance_series('hour') == hourly
@@ -0,0 +1,89 @@
+import chess
+import numpy as np
+import pytest
+import torch
+
+from src.learning.distributed import ShardedRecords, free_port, launch
+from src.learning.model_manager import ModelManager, _retraining_records
+from src.learning.neural_network import ChessNet, ChessTrainer, checkpoint_hidden_size
+from src.learning.position_codec import POSITION_DTYPE, encode_position
+
+
+def _records(values):
+    records = np.zeros(len(values), dtype=POSITION_DTYPE)
+    records['key'] = values
+    return records
+
+
+def test_sharded_records_take_across_shards():
+    data = ShardedRecords([_records([0, 1, 2]), _records([]), _records([3, 4]), _records([5])])
+    assert len(data) == 6
+    assert data.take(np.array([5, 0, 3, 2]))['key'].tolist() == [0, 2, 3, 5]
+
+
+def test_retraining_records_replay_games():
+    rows = [
+        ('g1', 0, 'e2e4', 0.3, 'white', 'win'),
+        ('g1', 1, 'e7e5', None, 'white', 'win'),
+        ('g1', 2, 'g1f3', 50.0, 'white', 'win'),
+        ('g2', 0, 'd2d4', None, 'black', 'win'),
+        ('g2', 1, 'd7d5', 0.0, 'black', 'win'),
+    ]
+    records = _retraining_records(rows)
+    assert len(records) == 3
+    # Black to move after 1.e4; labeled with the reply and the stored evaluation
+    board = chess.Board()
+    board.push_uci('e2e4')
+    expected = np.array([encode_position(board, chess.Move.from_uci('e7e5'), 0.03)], dtype=POSITION_DTYPE)
+    assert records[0]['key'] == expected[0]['key'] and records[0]['move'] == expected[0]['move']
+    assert abs(records[0]['value'] - 0.03) < 1e-6
+    # Unevaluated: the bot (white) won and white is to move
+    assert records[1]['value'] == 1.0
+    # Unevaluated in the game the bot played as black, which black won; black to move
+    assert records[2]['value'] == 1.0
+
+
+def test_retraining_records_skip_games_that_do_not_replay():
+    rows = [
+        ('bad', 0, 'e2e4', None, 'white', 'win'),
+        ('bad', 1, 'e2e4', None, 'white', 'win'),
+        ('bad', 2, 'g1f3', None, 'white', 'win'),
+        ('garbled', 0, 'e2e4', None, 'white', 'win'),
+        ('garbled', 1, 'zz99', None, 'white', 'win'),
+        ('ok', 0, 'd2d4', None, 'white', 'draw'),
+        ('ok', 1, 'd7d5', None, 'white', 'draw'),
+    ]
+    records = _retraining_records(rows)
+    assert len(records) == 1 and records[0]['value'] == 0.0
+
+
+def test_two_process_training_saves_loadable_checkpoint(tmp_path):
+    board = chess.Board()
+    positions = []
+    for move in list(board.legal_moves)[:16]:
+        positions.append(encode_position(board, move, 0.5))
+    data = tmp_path / "positions.bin"
+    np.array(positions * 4, dtype=POSITION_DTYPE).tofile(data)
+
+    # Continues from a checkpoint with a non-default hidden size, as a sweep may pick
+    initial = tmp_path / "initial.pth"
+    ChessTrainer(ChessNet(hidden_size=32)).save_model(str(initial))
+    save_path = tmp_path / "model.pth"
+    launch(str(data), str(save_path), procs=2, master_port=free_port(), epochs=1, batch_size=8,
+           initial_model=str(initial))
+
+    assert save_path.exists()
+    assert checkpoint_hidden_size(str(save_path)) == 32
+    trainer = ChessTrainer(ChessNet(hidden_size=32))
+    trainer.load_model(str(save_path))
+    assert all(torch.isfinite(p).all() for p in trainer.model.parameters())
+
+
+@pytest.mark.asyncio
+async def test_model_manager_loads_the_checkpoint_hidden_size(tmp_path):
+    path = tmp_path / "model.pth"
+    ChessTrainer(ChessNet(hidden_size=32)).save_model(str(path))
+    manager = ModelManager(db_manager=None)
+    manager.model_path = str(path)
+    await manager._load_model()
+    assert manager.is_model_ready() and manager.model.position_encoder[0].out_features == 32
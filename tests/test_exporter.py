@@ -0,0 +1,151 @@
+import json
+
+import pyarrow.dataset as ds
+import pytest
+import pytest_asyncio
+
+from src.database.db_manager import DatabaseManager
+from src.database.exporter import GameExporter, load_table, load_training_rows
+from src.learning.model_manager import ModelManager
+
+
+def _game(game_id, played_at, result='win', color='white'):
+    return {
+        'game_id': game_id,
+        'opponent': 'Maia1',
+        'color': color,
+        'result': result,
+        'time_control': '5+0',
+        'moves': ['e2e4', 'e7e5', 'g1f3'],
+        'move_times': [0.5, 0.7],
+        'evaluations': [0.3, 0.2, 0.4],
+        'pgn': '1. e4 e5 2. Nf3 *',
+        'duration': 120.0,
+        'played_at': played_at,
+    }
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path, monkeypatch):
+    monkeypatch.setenv('DB_PATH', str(tmp_path / 'bot.db'))
+    monkeypatch.setenv('DB_FLUSH_INTERVAL', '0')
+    manager = DatabaseManager()
+    await manager.initialize()
+    yield manager
+    await manager.close()
+
+
+async def _save_undated(db, game_id):
+    """Legacy rows have no played_at; they land in the date=unknown partition."""
+    await db.save_game(_game(game_id, None))
+    async with db.writer() as connection:
+        await connection.execute('UPDATE games SET played_at = NULL WHERE game_id = ?', (game_id,))
+        await connection.commit()
+
+
+@pytest.mark.asyncio
+async def test_export_is_incremental_from_the_watermark(db, tmp_path):
+    exporter = GameExporter(db, output_dir=str(tmp_path / 'exports'))
+    await db.save_game(_game('g1', '2024-05-01T10:00:00'))
+    await db.save_game(_game('g2', '2024-05-01T11:00:00'))
+    assert await exporter.export() == {'games': 2, 'positions': 6}
+    assert await exporter.export() == {'games': 0, 'positions': 0}
+
+    await db.save_game(_game('g3', '2024-05-02T09:00:00'))
+    assert await exporter.export() == {'games': 1, 'positions': 3}
+    with open(exporter.watermark_path) as f:
+        assert json.load(f) == {'last_game_id': 3}
+
+    games = load_table('games', columns=['game_id'], output_dir=str(tmp_path / 'exports'))
+    assert sorted(games['game_id'].to_pylist()) == ['g1', 'g2', 'g3']
+
+
+@pytest.mark.asyncio
+async def test_interrupted_export_neither_duplicates_nor_loses_games(db, tmp_path, monkeypatch):
+    output_dir = str(tmp_path / 'exports')
+    await db.save_game(_game('g1', '2024-05-01T10:00:00'))
+    await db.save_game(_game('g2', '2024-05-02T10:00:00'))
+
+    # Crash after the parts are written, before the watermark moves
+    exporter = GameExporter(db, output_dir=output_dir)
+    monkeypatch.setattr(exporter, '_write_watermark', lambda last_game_id: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        await exporter.export()
+    assert list((tmp_path / 'exports').rglob('.part-*.tmp'))
+
+    await db.save_game(_game('g3', '2024-05-02T11:00:00'))
+    assert await GameExporter(db, output_dir=output_dir).export() == {'games': 3, 'positions': 9}
+    games = load_table('games', columns=['game_id'], output_dir=output_dir)
+    assert sorted(games['game_id'].to_pylist()) == ['g1', 'g2', 'g3']
+
+    # Crash after the watermark moved, before the rename: the next run finishes it
+    await db.save_game(_game('g4', '2024-05-03T10:00:00'))
+    exporter = GameExporter(db, output_dir=output_dir)
+    monkeypatch.setattr(exporter, '_publish_parts', lambda paths: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        await exporter.export()
+    assert await GameExporter(db, output_dir=output_dir).export() == {'games': 0, 'positions': 0}
+    games = load_table('games', columns=['game_id'], output_dir=output_dir)
+    assert sorted(games['game_id'].to_pylist()) == ['g1', 'g2', 'g3', 'g4']
+    assert not list((tmp_path / 'exports').rglob('.part-*.tmp'))
+
+
+@pytest.mark.asyncio
+async def test_partitions_mix_unknown_and_real_dates(db, tmp_path):
+    output_dir = str(tmp_path / 'exports')
+    await _save_undated(db, 'old')
+    await db.save_game(_game('g1', '2024-05-01T10:00:00'))
+    await db.save_game(_game('g2', '2024-05-03T10:00:00', result='loss', color='black'))
+    await GameExporter(db, output_dir=output_dir).export()
+
+    partitions = sorted(p.name for p in (tmp_path / 'exports' / 'parquet' / 'positions').iterdir())
+    assert partitions[:2] == ['date=2024-05-01', 'date=2024-05-03'] and 'date=unknown' in partitions
+
+    table = load_table('games', columns=['game_id', 'date'], output_dir=output_dir,
+                       filter_expression=ds.field('date') == 'unknown')
+    assert table['game_id'].to_pylist() == ['old']
+
+    # Training rows: newest date first, undated games last, plies in order
+    rows = load_training_rows(output_dir=output_dir)
+    assert [row[0] for row in rows[:3]] == ['g2'] * 3
+    assert [row[1] for row in rows[:3]] == [0, 1, 2]
+    assert rows[-1][0] == 'old'
+    assert rows[0][2:] == ('e2e4', pytest.approx(0.3), 'black', 'loss')
+    assert len(load_training_rows(limit=4, output_dir=output_dir)) == 4
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('fmt', ['parquet', 'arrow'])
+async def test_round_trip(db, tmp_path, fmt):
+    output_dir = str(tmp_path / 'exports')
+    await db.save_game(_game('g1', '2024-05-01T10:00:00'))
+    await GameExporter(db, output_dir=output_dir, fmt=fmt).export()
+
+    games = load_table('games', output_dir=output_dir, fmt=fmt).to_pylist()
+    assert len(games) == 1
+    assert {key: games[0][key] for key in ('game_id', 'opponent', 'color', 'result', 'date')} == {
+        'game_id': 'g1', 'opponent': 'Maia1', 'color': 'white', 'result': 'win', 'date': '2024-05-01'}
+
+    positions = load_table('positions', output_dir=output_dir, fmt=fmt).to_pylist()
+    assert [p['uci'] for p in positions] == ['e2e4', 'e7e5', 'g1f3']
+    assert [p['ours'] for p in positions] == [True, False, True]
+    moves = await db.get_game_moves('g1')
+    assert [p['zobrist'] for p in positions] == [m['zobrist'] for m in moves]
+    # The training loader sees what SQLite would have returned
+    exported = load_training_rows(output_dir=output_dir, fmt=fmt)
+    stored = await db.get_training_positions()
+    assert [row[:3] + row[4:] for row in exported] == [tuple(row[:3]) + tuple(row[4:]) for row in stored]
+    assert [row[3] for row in exported] == pytest.approx([row[3] for row in stored])
+
+
+@pytest.mark.asyncio
+async def test_retraining_reads_the_export(db, tmp_path, monkeypatch):
+    monkeypatch.setenv('EXPORT_DIR', str(tmp_path / 'exports'))
+    monkeypatch.setenv('RETRAIN_SOURCE', 'export')
+    manager = ModelManager(db)
+    assert await manager._training_rows() == []
+
+    await db.save_game(_game('g1', '2024-05-01T10:00:00'))
+    rows = await manager._training_rows()
+    assert [row[2] for row in rows] == ['e2e4', 'e7e5', 'g1f3']
+    assert (tmp_path / 'exports' / 'parquet' / '_watermark.json').exists()
@@ -0,0 +1,64 @@
+import chess
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from src.engine.mcts import MCTS, TERMINAL, decode_move, encode_move
+from src.learning.neural_network import ChessNet
+
+
+def test_move_codes_round_trip():
+    for uci in ("e2e4", "e7e8q", "a2a1n"):
+        move = chess.Move.from_uci(uci)
+        assert decode_move(encode_move(move)) == move
+
+
+def test_mcts_finds_mate_and_reuses_its_tree():
+    torch.manual_seed(0)
+    mcts = MCTS(ChessNet(), nodes=400, batch_size=16)
+    board = chess.Board()
+    move = mcts.search(board)
+    assert move in board.legal_moves and mcts.last_search['playouts'] >= 400
+
+    # The opponent's most explored reply keeps its subtree
+    board.push(move)
+    mcts.advance(move)
+    reply = max(mcts.visit_distribution().items(), key=lambda item: item[1])[0]
+    board.push(reply)
+    mcts.search(board)
+    assert mcts.last_search['reused'] > 0 and mcts.last_search['playouts_per_second'] > 0
+
+    board = chess.Board("r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4")
+    assert mcts.search(board) == chess.Move.from_uci("h5f7")
+
+
+def test_compaction_keeps_the_subtree_and_a_plain_node_count():
+    torch.manual_seed(0)
+    mcts = MCTS(ChessNet(), nodes=200, batch_size=16, capacity=1024)
+    board = chess.Board()
+    move = mcts.search(board)
+    visits = mcts.visit_distribution()[move]
+    mcts.advance(move)
+    assert mcts.root == 0 and type(mcts.used) is int
+    assert int(mcts.visits[mcts.root]) == visits
+
+
+@pytest.mark.parametrize("moves, fen", [
+    # Threefold repetition and the fifty-move rule are draws only once claimed
+    (["g1f3", "g8f6", "f3g1", "f6g8"] * 2, chess.STARTING_FEN),
+    ([], "4k3/8/8/8/8/8/8/4K2R w - - 100 80"),
+])
+def test_search_moves_from_a_claimable_draw(moves, fen):
+    torch.manual_seed(0)
+    mcts = MCTS(ChessNet(), nodes=50, batch_size=8)
+    board = chess.Board(fen)
+    for uci in moves:
+        board.push_uci(uci)
+    assert board.can_claim_draw() and not board.is_game_over()
+
+    move = mcts.search(board)
+    assert move in board.legal_moves and mcts.visit_distribution()
+    # The next root comes from the reused tree, where it was a terminal leaf
+    assert mcts.state[mcts.first_child[mcts.root] + list(mcts.visit_distribution()).index(move)] == TERMINAL
+    board.push(move)
+    assert mcts.search(board) in board.legal_moves
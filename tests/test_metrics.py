@@ -0,0 +1,46 @@
+import socket
+
+import aiohttp
+import pytest
+
+from src.metrics import MetricsRegistry, MetricsServer
+
+
+def test_spans_counters_and_collectors_render_as_prometheus_text():
+    registry = MetricsRegistry()
+    for _ in range(9):
+        with registry.span('sophie_move_stage_seconds', stage='think'):
+            pass
+    registry.observe('sophie_move_stage_seconds', 3.0, stage='think')
+    registry.inc('sophie_moves_total', source='book')
+    registry.inc('sophie_moves_total', 2, source='book')
+    registry.register_collector('db', lambda: [('sophie_db_pending_rows', 'gauge', {}, 7)])
+
+    histogram = registry.histogram('sophie_move_stage_seconds', stage='think')
+    assert histogram.count == 10 and histogram.quantile(0.5) == 0.001 and histogram.quantile(0.99) == 5.0
+
+    text = registry.render()
+    assert '# TYPE sophie_move_stage_seconds histogram' in text
+    assert 'sophie_move_stage_seconds_bucket{stage="think",le="0.001"} 9' in text
+    assert 'sophie_move_stage_seconds_bucket{stage="think",le="+Inf"} 10' in text
+    assert 'sophie_move_stage_seconds_count{stage="think"} 10' in text
+    assert 'sophie_moves_total{source="book"} 3' in text
+    assert '# TYPE sophie_db_pending_rows gauge\nsophie_db_pending_rows 7' in text
+
+
+@pytest.mark.asyncio
+async def test_metrics_server_serves_the_registry():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    registry = MetricsRegistry()
+    registry.inc('sophie_games_total', result='win')
+    server = MetricsServer(registry, host='127.0.0.1', port=port)
+    await server.start()
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f'http://127.0.0.1:{port}/metrics') as resp:
+                assert resp.status == 200
+                assert 'sophie_games_total{result="win"} 1' in await resp.text()
+    finally:
+        await server.stop()
@@ -0,0 +1,99 @@
+import chess
+import chess.polyglot
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from src.engine.neural_search import MATE_SCORE, NeuralSearch
+from src.learning.neural_network import ChessNet
+from src.learning.position_codec import (POLICY_SIZE, POSITION_DTYPE, decode_features, encode_position,
+                                         move_to_index)
+
+
+def test_search_finds_forced_mate():
+    torch.manual_seed(0)
+    search = NeuralSearch(ChessNet(), max_depth=3)
+    # 1. Qxf7# ends the game; a mate in one beats any network value
+    board = chess.Board("r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4")
+    assert search.search(board, time_limit=5.0) == chess.Move.from_uci("h5f7")
+    assert search.last_search['score'] > MATE_SCORE - 1
+    assert search.last_search['nodes'] > 0 and search.last_search['nps'] > 0
+    # The board is left as it was
+    assert board.fen() == "r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4"
+
+
+class FixedPolicyNet(torch.nn.Module):
+    """Value 0 everywhere; the policy prefers the given moves, in order."""
+
+    def __init__(self, preferred):
+        super().__init__()
+        self.logits = torch.zeros(POLICY_SIZE)
+        for rank, uci in enumerate(preferred):
+            self.logits[move_to_index(chess.Move.from_uci(uci))] = 10.0 - rank
+
+    def forward(self, x):
+        return torch.zeros(len(x), 1), self.logits.expand(len(x), -1)
+
+
+def test_moves_are_ordered_by_tt_move_then_policy():
+    search = NeuralSearch(FixedPolicyNet(["g1f3", "d2d4", "e2e4"]), max_depth=2)
+    board = chess.Board()
+    key = chess.polyglot.zobrist_hash(board)
+    ordered = search._ordered_moves(board, key, None)
+    assert [move.uci() for move in ordered[:3]] == ["g1f3", "d2d4", "e2e4"]
+    # The transposition table move goes first; the policy orders the rest
+    ordered = search._ordered_moves(board, key, chess.Move.from_uci("a2a3"))
+    assert [move.uci() for move in ordered[:4]] == ["a2a3", "g1f3", "d2d4", "e2e4"]
+    assert sorted(ordered, key=lambda move: move.uci()) == sorted(board.legal_moves, key=lambda move: move.uci())
+
+
+def test_re_search_is_served_by_the_transposition_table():
+    torch.manual_seed(0)
+    search = NeuralSearch(ChessNet(), max_depth=3)
+    board = chess.Board()
+    first = search.search(board, time_limit=30.0)
+    cold = dict(search.last_search)
+    assert cold['depth'] == 3 and len(search.tt) > 0
+
+    second = search.search(board, time_limit=30.0)
+    warm = search.last_search
+    assert second == first and warm['score'] == pytest.approx(cold['score'])
+    # Stored entries cut the tree and every position is already evaluated
+    assert warm['nodes'] < cold['nodes'] and warm['evaluated'] == 0
+
+
+def _minimax(model, board, depth):
+    """Plain minimax evaluating one position per forward pass."""
+    if depth == 0:
+        features = torch.from_numpy(decode_features(np.array([encode_position(board)], dtype=POSITION_DTYPE)))
+        with torch.no_grad():
+            return model(features)[0].item()
+    best = -MATE_SCORE * 2
+    for move in list(board.legal_moves):
+        board.push(move)
+        best = max(best, -_minimax(model, board, depth - 1))
+        board.pop()
+    return best
+
+
+def test_batched_frontier_matches_unbatched_minimax():
+    torch.manual_seed(1)
+    model = ChessNet()
+    model.eval()
+    board = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3")
+
+    search = NeuralSearch(model, max_depth=2)
+    move = search.search(board, time_limit=60.0)
+    assert search.last_search['depth'] == 2
+    # Far fewer forward passes than positions evaluated
+    assert search.last_search['batches'] * 10 < search.last_search['evaluated']
+
+    scores = {}
+    for candidate in board.legal_moves:
+        board.push(candidate)
+        scores[candidate] = -_minimax(model, board, 1)
+        board.pop()
+    best = max(scores.values())
+    assert search.last_search['score'] == pytest.approx(best, abs=1e-5)
+    assert scores[move] == pytest.approx(best, abs=1e-5)
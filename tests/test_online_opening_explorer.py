@@ -0,0 +1,141 @@
+import asyncio
+
+import chess
+import pytest
+
+from src.bot import online_opening_explorer
+from src.bot.online_opening_explorer import OnlineOpeningExplorer, normalize_fen
+
+
+class FakeResponse:
+    def __init__(self, moves):
+        self.status = 200
+        self.moves = moves
+
+    async def json(self):
+        return {'moves': [{'uci': uci} for uci in self.moves]}
+
+
+class FakeRequest:
+    def __init__(self, session, fen):
+        self.session = session
+        self.fen = fen
+
+    async def __aenter__(self):
+        self.session.calls.append(self.fen)
+        if self.session.gate is not None:
+            await self.session.gate.wait()
+        if len(self.session.calls) > self.session.hang_after:
+            await asyncio.Event().wait()
+        board = chess.Board(self.fen)
+        # The legal moves in a stable order stand in for the explorer's answer
+        return FakeResponse(sorted(move.uci() for move in board.legal_moves)[:3])
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    """Answers explorer queries locally and counts them."""
+
+    def __init__(self, gate=None, hang_after=1000):
+        self.calls = []
+        self.gate = gate
+        self.hang_after = hang_after
+
+    def get(self, url, params):
+        return FakeRequest(self, params['fen'])
+
+    async def close(self):
+        pass
+
+
+async def _explorer(tmp_path, session, **kwargs):
+    explorer = OnlineOpeningExplorer(cache_path=str(tmp_path / "explorer.db"), **kwargs)
+    await explorer.initialize()
+    await explorer.session.close()
+    explorer.session = session
+    return explorer
+
+
+def _fens(count):
+    board = chess.Board()
+    fens = []
+    for move in list(board.legal_moves)[:count]:
+        child = board.copy()
+        child.push(move)
+        fens.append(child.fen())
+    return fens
+
+
+@pytest.mark.asyncio
+async def test_memory_lru_evicts_to_the_disk_cache(tmp_path):
+    session = FakeSession()
+    explorer = await _explorer(tmp_path, session, cache_size=2)
+    a, b, c = _fens(3)
+    for fen in (a, b, c):
+        await explorer.get_moves(fen)
+    assert list(explorer.memory) == [normalize_fen(b), normalize_fen(c)]
+
+    # The evicted position comes back from SQLite without a request
+    await explorer.get_moves(a)
+    await explorer.get_moves(c)
+    stats = explorer.get_cache_stats()
+    assert stats['requests'] == 3 and stats['disk_hits'] == 1 and stats['memory_hits'] == 1
+    await explorer.close()
+
+
+@pytest.mark.asyncio
+async def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(online_opening_explorer.time, 'time', lambda: now[0])
+    session = FakeSession()
+    explorer = await _explorer(tmp_path, session, ttl=60)
+    fen = _fens(1)[0]
+
+    await explorer.get_moves(fen)
+    now[0] += 30
+    await explorer.get_moves(fen)
+    assert explorer.requests == 1 and explorer.memory_hits == 1
+
+    # Stale in memory and on disk: fetched again
+    now[0] += 60
+    await explorer.get_moves(fen)
+    assert explorer.requests == 2 and explorer.memory[normalize_fen(fen)][1] == now[0]
+    await explorer.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_request(tmp_path):
+    gate = asyncio.Event()
+    session = FakeSession(gate=gate)
+    explorer = await _explorer(tmp_path, session)
+    fen = _fens(1)[0]
+
+    lookups = [asyncio.ensure_future(explorer.get_moves(fen)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    gate.set()
+    results = await asyncio.gather(*lookups)
+    assert results[0] == results[1] == results[2] and results[0]
+    assert explorer.requests == 1 and explorer.coalesced == 2 and not explorer.inflight
+    await explorer.close()
+
+
+@pytest.mark.asyncio
+async def test_longest_line_stops_at_the_deadline(tmp_path):
+    session = FakeSession(hang_after=4)
+    explorer = await _explorer(tmp_path, session)
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    line = await explorer.find_longest_line(chess.Board(), max_time=0.3, prefetch=0)
+    assert loop.time() - start < 1.0
+    assert len(line) == 4
+    board = chess.Board()
+    for uci in line:
+        board.push_uci(uci)  # raises if the line is not playable
+    # The lookup stuck at the deadline is cancelled on close
+    assert explorer.inflight
+    await explorer.close()
+    await asyncio.sleep(0)
+    assert not explorer.inflight
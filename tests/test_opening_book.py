@@ -0,0 +1,56 @@
+import io
+
+import chess
+import chess.pgn
+
+from src.engine.opening_book import OpeningBook, OpeningBookBuilder
+
+PGN = """
+[Result "1-0"]
+
+1. e4 e5 2. Nf3 Nc6 3. Bc4 Nf6 4. O-O 1-0
+
+[Result "1-0"]
+
+1. e4 e5 2. Nf3 Nc6 3. Bc4 Nf6 4. O-O 1-0
+
+[Result "0-1"]
+
+1. d4 d5 0-1
+"""
+
+
+def _build_book(tmp_path, min_games=1):
+    builder = OpeningBookBuilder(min_games=min_games)
+    pgn = io.StringIO(PGN)
+    while (game := chess.pgn.read_game(pgn)) is not None:
+        builder.add_game(game)
+    path = tmp_path / "book.bin"
+    builder.write(str(path))
+    book = OpeningBook([str(path)])
+    book.open()
+    return book
+
+
+def test_book_prefers_winning_moves(tmp_path):
+    book = _build_book(tmp_path)
+    assert book.get_move(chess.Board(), weighted=False) == chess.Move.from_uci("e2e4")
+    assert book.lookups == 1 and book.hits == 1
+    book.close()
+
+
+def test_book_castling_roundtrip(tmp_path):
+    book = _build_book(tmp_path)
+    board = chess.Board()
+    for uci in ["e2e4", "e7e5", "g1f3", "b8c6", "f1c4", "g8f6"]:
+        board.push_uci(uci)
+    assert book.get_move(board) == chess.Move.from_uci("e1g1")
+    book.close()
+
+
+def test_min_games_filters_rare_lines(tmp_path):
+    book = _build_book(tmp_path, min_games=2)
+    board = chess.Board()
+    board.push_uci("d2d4")
+    assert book.get_move(board) is None
+    book.close()
@@ -0,0 +1,57 @@
+import io
+
+from src.learning.pgn_corpus import (build_index, min_elo_filter, open_pgn, parse_game,
+                                     parse_headers, process_pgn, scan_games)
+
+PGN = b"""[Event "A"]
+[WhiteElo "1600"]
+[BlackElo "1700"]
+
+1. e4 e5 2. Nf3 { [%clk 0:01:00] } Nc6 1-0
+
+[Event "B"]
+[WhiteElo "1200"]
+[BlackElo "1800"]
+
+1. d4 d5 0-1
+
+[Event "C"]
+[WhiteElo "2000"]
+[BlackElo "?"]
+
+1. c4 1/2-1/2
+"""
+
+
+def test_scan_games_finds_boundaries_across_reads():
+    for chunk_size in (7, 64, 1 << 20):
+        games = list(scan_games(io.BytesIO(PGN), chunk_size=chunk_size))
+        assert [parse_headers(raw)['Event'] for _, raw in games] == ['A', 'B', 'C']
+        for offset, raw in games:
+            assert PGN[offset:offset + len(raw)] == raw
+
+
+def test_index_filters_on_headers_and_parses_accepted_games(tmp_path):
+    path = tmp_path / "games.pgn"
+    path.write_bytes(PGN)
+    offsets, lengths, total = build_index(str(path), min_elo_filter(1500))
+    assert total == 3 and len(offsets) == 1
+    game = parse_game(PGN[offsets[0]:offsets[0] + lengths[0]])
+    assert game.headers['Event'] == 'A' and len(list(game.mainline_moves())) == 4
+
+    output = tmp_path / "filtered.pgn"
+    assert process_pgn(str(path), str(output), min_elo=1000, workers=2, span_size=1) == 2
+    assert '[Event "A"]' in output.read_text() and '[Event "C"]' not in output.read_text()
+
+
+def test_compressed_dumps_are_streamed(tmp_path):
+    import bz2
+
+    path = tmp_path / "games.pgn.bz2"
+    path.write_bytes(bz2.compress(PGN))
+    with open_pgn(str(path)) as stream:
+        assert [parse_headers(raw)['Event'] for _, raw in scan_games(stream, chunk_size=16)] == \
+            ['A', 'B', 'C']
+
+    output = tmp_path / "filtered.pgn"
+    assert process_pgn(str(path), str(output), min_elo=1000, workers=2, span_size=1) == 2
@@ -0,0 +1,40 @@
+import chess
+import numpy as np
+import pytest
+
+from src.learning.position_codec import (POSITION_DTYPE, ShardWriter, decode_features,
+                                         encode_position, games_to_positions, iter_batches,
+                                         move_to_index)
+
+GAMES = [
+    b'[Result "0-1"]\n\n1. f3 e5 2. g4 Qh4# 0-1',
+    b'[Result "1-0"]\n\n1. f3 e6 1-0',
+    b'[Result "*"]\n\n1. e4 *',
+]
+
+
+def test_features_match_position_encoder():
+    torch = pytest.importorskip("torch")
+    from src.learning.neural_network import PositionEncoder
+
+    board = chess.Board("r3k2r/pppq1ppp/2n2n2/3pp3/4P3/2N2N2/PPPP1PPP/R1BQK2R w Kkq d6 0 7")
+    records = np.array([encode_position(board)], dtype=POSITION_DTYPE)
+    expected = PositionEncoder.add_game_state_features(board, PositionEncoder.board_to_tensor(board))
+    assert torch.equal(torch.from_numpy(decode_features(records)[0]), expected)
+
+
+def test_games_are_labeled_and_deduplicated(tmp_path):
+    records = games_to_positions(GAMES)
+    # Unfinished games carry no value label
+    assert len(records) == 6
+    assert records[0]['move'] == move_to_index(chess.Move.from_uci('f2f3'))
+    assert records['value'][:4].tolist() == [-1.0, 1.0, -1.0, 1.0]
+
+    writer = ShardWriter(str(tmp_path), shard_size=2)
+    writer.add(records)
+    writer.close()
+    # The start position and 1. f3 repeat in the second game
+    assert writer.written == 4 and writer.duplicates == 2 and writer.shards == 2
+    loaded = np.concatenate(list(iter_batches(str(tmp_path), batch_size=3, shuffle=False)))
+    assert loaded['key'].tolist() == records['key'][:4].tolist()
+    assert np.array_equal(loaded['bitboards'], records['bitboards'][:4])
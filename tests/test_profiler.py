@@ -0,0 +1,43 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from src.profiler import SamplingProfiler
+
+
+def _busy_worker(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+@pytest.mark.asyncio
+async def test_profiler_samples_threads_and_slow_callbacks(tmp_path):
+    profiler = SamplingProfiler(interval=0.002, output_dir=str(tmp_path), slow_callback_ms=20)
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_worker, args=(stop,), name='search-worker')
+    worker.start()
+    original_run = asyncio.events.Handle._run
+    profiler.start()
+    try:
+        async def blocking_step():
+            time.sleep(0.05)  # holds the event loop, as a CPU-bound search would
+        await asyncio.create_task(blocking_step())
+        await asyncio.sleep(0.1)
+    finally:
+        paths = profiler.stop()
+        stop.set()
+        worker.join()
+
+    assert not profiler.running and profiler.samples > 10
+    collapsed = open(paths['collapsed'], encoding='utf-8').read()
+    assert 'search-worker;' in collapsed and '_busy_worker (test_profiler.py' in collapsed
+
+    speedscope = json.load(open(paths['speedscope'], encoding='utf-8'))
+    assert {profile['name'] for profile in speedscope['profiles']} >= {'search-worker', 'MainThread'}
+
+    report = json.load(open(paths['asyncio'], encoding='utf-8'))
+    assert any('blocking_step' in entry['callback'] for entry in report['slow_callbacks'])
+    assert asyncio.events.Handle._run is original_run
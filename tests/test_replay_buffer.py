@@ -0,0 +1,37 @@
+import numpy as np
+
+from src.learning.position_codec import POSITION_DTYPE
+from src.learning.replay_buffer import ReplayBuffer
+
+
+def _records(values):
+    records = np.zeros(len(values), dtype=POSITION_DTYPE)
+    records['key'] = values
+    return records
+
+
+def test_ring_buffer_overwrites_oldest():
+    buffer = ReplayBuffer(capacity=5)
+    buffer.extend(_records([1, 2, 3]))
+    buffer.append(_records([4])[0])
+    buffer.extend(_records([5, 6, 7]))
+    assert len(buffer) == 5
+    assert sorted(buffer.records['key'].tolist()) == [3, 4, 5, 6, 7]
+
+    buffer.extend(_records(range(10, 22)))
+    assert sorted(buffer.records['key'].tolist()) == [17, 18, 19, 20, 21]
+
+    batch = buffer.sample(64, np.random.default_rng(0))
+    assert batch.dtype == POSITION_DTYPE and set(batch['key'].tolist()) <= set(range(17, 22))
+    assert sum(len(b) for b in buffer.iter_batches(2)) == 5
+
+
+def test_memory_mapped_buffer_reopens(tmp_path):
+    path = tmp_path / "replay.bin"
+    buffer = ReplayBuffer(capacity=4, path=str(path))
+    buffer.extend(_records([1, 2, 3]))
+    buffer.flush()
+
+    reopened = ReplayBuffer(capacity=4, path=str(path))
+    assert len(reopened) == 3 and reopened.cursor == 3
+    assert reopened.records['key'][:3].tolist() == [1, 2, 3]
@@ -0,0 +1,27 @@
+import random
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from src.engine.mcts import MCTS
+from src.learning.neural_network import ChessNet
+from src.learning.self_play import load_settings, play_game
+
+
+def test_play_game_labels_positions_with_discounted_outcome():
+    torch.manual_seed(0)
+    random.seed(0)
+    records = play_game(MCTS(ChessNet(), nodes=8, batch_size=4), exploration_rate=0.5,
+                        discount_factor=0.9, max_plies=12)
+    assert len(records) == 12
+    # Unfinished games count as draws
+    assert np.all(records['value'] == 0)
+    assert np.all(records['move'] < 4096)
+
+
+def test_settings_come_from_config_with_overrides():
+    settings = load_settings(actors=3, mcts_nodes=None)
+    assert settings['actors'] == 3
+    assert settings['mcts_nodes'] > 0 and 0 <= settings['exploration_rate'] <= 1
@@ -0,0 +1,37 @@
+import chess
+import chess.engine
+import pytest
+
+from src.engine.stockfish_engine import StockfishEngine
+
+
+class RecordingEngine:
+    """Answers every analysis with a fixed score and keeps the limits it was given."""
+
+    def __init__(self):
+        self.limits = []
+
+    async def analyse(self, board, limit, **kwargs):
+        self.limits.append(limit)
+        return {'score': chess.engine.PovScore(chess.engine.Cp(30), board.turn), 'nodes': 1}
+
+
+async def _label(engine, **kwargs):
+    engine.engine = RecordingEngine()
+    results = [score async for _, score in engine.label_positions([chess.STARTING_FEN], log_every=0, **kwargs)]
+    assert results == [0.3]
+    return engine.engine.limits[0]
+
+
+@pytest.mark.asyncio
+async def test_label_limit_uses_nodes_or_depth(monkeypatch):
+    monkeypatch.delenv('LABEL_DEPTH', raising=False)
+    monkeypatch.setenv('LABEL_NODES', '1500')
+    assert await _label(StockfishEngine()) == chess.engine.Limit(nodes=1500)
+
+    # A configured depth replaces the node budget
+    monkeypatch.setenv('LABEL_DEPTH', '12')
+    assert await _label(StockfishEngine()) == chess.engine.Limit(depth=12)
+
+    # Explicit arguments win over the configuration
+    assert await _label(StockfishEngine(), nodes=300) == chess.engine.Limit(nodes=300)
@@ -0,0 +1,43 @@
+import random
+import sqlite3
+
+import chess
+import numpy as np
+
+from src.learning.position_codec import POSITION_DTYPE, encode_position
+from src.learning.sweep import SweepRunner, rung_budgets, sample_params
+
+
+def test_rung_budgets():
+    assert rung_budgets(1, 9, 3) == [1, 3, 9]
+    assert rung_budgets(1, 10, 3) == [1, 3, 9, 10]
+    assert rung_budgets(2, 2, 3) == [2]
+
+
+def test_sample_params_space():
+    space = {'learning_rate': {'log_uniform': [1e-4, 1e-2]}, 'batch_size': [64, 128],
+             'layers': {'int': [1, 3]}, 'hidden_size': 64}
+    params = sample_params(space, random.Random(0))
+    assert 1e-4 <= params['learning_rate'] <= 1e-2
+    assert params['batch_size'] in (64, 128) and 1 <= params['layers'] <= 3
+    assert params['hidden_size'] == 64
+
+
+def test_successive_halving_sweep(tmp_path):
+    board = chess.Board()
+    records = [encode_position(board, move, 0.1) for move in board.legal_moves]
+    data = tmp_path / "positions.bin"
+    np.array(records * 10, dtype=POSITION_DTYPE).tofile(data)
+
+    space = {'learning_rate': {'log_uniform': [1e-4, 1e-2]}, 'batch_size': [32, 64], 'hidden_size': [16]}
+    runner = SweepRunner(str(data), output_dir=str(tmp_path), space=space, trials=4, workers=2,
+                         min_epochs=1, max_epochs=2, eta=2, val_positions=0)
+    best = runner.run(name="test")
+
+    assert best['epochs_run'] == 4 + 2 and best['full_budget'] == 8
+    with sqlite3.connect(runner.db_path) as connection:
+        statuses = dict(connection.execute('SELECT trial_id, status FROM trials').fetchall())
+        epochs = connection.execute('SELECT COUNT(*) FROM trial_epochs').fetchone()[0]
+    assert sorted(statuses.values()) == ['completed', 'completed', 'stopped', 'stopped']
+    assert statuses[best['trial_id']] == 'completed' and epochs == 6
+    assert (tmp_path / f"sweep-{best['sweep_id']}" / f"trial-{best['trial_id']}.pth").exists()
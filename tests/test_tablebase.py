@@ -0,0 +1,133 @@
+import chess
+import pytest
+
+from src.engine.stockfish_engine import StockfishEngine
+from src.engine.tablebase import TABLEBASE_WIN_SCORE, SyzygyTablebase
+
+# White king and queen against the black king, no mate in one
+KQK = "4k3/8/8/8/4K3/8/8/3Q4 w - - 0 1"
+
+
+class StubTablebase:
+    """
+    Stands in for chess.syzygy.Tablebase: the side with more pieces wins,
+    and DTZ comes from a per-position table (default 20 plies).
+    """
+
+    def __init__(self, dtz=None, missing=()):
+        self.dtz = dtz or {}
+        self.missing = set(missing)
+        self.wdl_calls = 0
+        self.wdl = {'KQvK': None}
+
+    def _check(self, board):
+        if board.epd() in self.missing:
+            raise KeyError(board.epd())
+
+    def probe_wdl(self, board):
+        self._check(board)
+        self.wdl_calls += 1
+        ours = chess.popcount(board.occupied_co[board.turn])
+        theirs = chess.popcount(board.occupied_co[not board.turn])
+        return 2 if ours > theirs else -2 if ours < theirs else 0
+
+    def probe_dtz(self, board):
+        self._check(board)
+        wdl = self.probe_wdl(board)
+        self.wdl_calls -= 1
+        distance = self.dtz.get(board.epd(), 20)
+        return 0 if wdl == 0 else distance if wdl > 0 else -distance
+
+    def close(self):
+        pass
+
+
+def _tablebase(stub):
+    tablebase = SyzygyTablebase(path='')
+    tablebase.tablebase = stub
+    tablebase.max_pieces = 3
+    return tablebase
+
+
+def test_probe_caches_results_and_counts():
+    stub = StubTablebase()
+    tablebase = _tablebase(stub)
+    board = chess.Board(KQK)
+
+    assert tablebase.probe(board) == (2, 20)
+    assert tablebase.probe(board) == (2, 20)
+    assert stub.wdl_calls == 1
+    assert tablebase.get_stats() == {'probes': 2, 'hits': 2, 'cache_hits': 1}
+
+    # Out of range: too many pieces or castling rights, so not even probed
+    assert tablebase.probe(chess.Board()) is None
+    assert tablebase.probe(chess.Board("4k3/8/8/8/8/8/8/R3K3 w Q - 0 1")) is None
+    assert tablebase.get_stats()['probes'] == 2
+
+
+def test_missing_table_is_a_cached_miss():
+    board = chess.Board(KQK)
+    tablebase = _tablebase(StubTablebase(missing=[board.epd()]))
+    assert tablebase.probe(board) is None
+    assert tablebase.probe(board) is None
+    assert tablebase.get_stats() == {'probes': 2, 'hits': 0, 'cache_hits': 1}
+
+    # One child without an answer is enough to give up on the whole move choice
+    tablebase = _tablebase(StubTablebase(missing=[_after(board, "d1d6")]))
+    assert tablebase.get_best_move(board) is None
+
+
+def test_evaluate_is_from_the_side_to_move():
+    tablebase = _tablebase(StubTablebase())
+    assert tablebase.evaluate(chess.Board(KQK)) == TABLEBASE_WIN_SCORE
+    black_to_move = chess.Board(KQK.replace(' w ', ' b '))
+    assert tablebase.evaluate(black_to_move) == -TABLEBASE_WIN_SCORE
+    assert tablebase.evaluate(chess.Board("4k3/8/8/8/4K3/8/8/8 w - - 0 1")) == 0.0
+
+
+def _after(board, uci):
+    child = board.copy()
+    child.push_uci(uci)
+    return child.epd()
+
+
+def test_best_move_ranks_by_dtz():
+    board = chess.Board(KQK)
+    assert not any(board.gives_check(move) and _mates(board, move) for move in board.legal_moves)
+
+    # Winning: the move reaching the shortest DTZ
+    tablebase = _tablebase(StubTablebase(dtz={_after(board, "d1d6"): 3}))
+    assert tablebase.get_best_move(board) == chess.Move.from_uci("d1d6")
+
+    # Losing: the defence with the longest DTZ
+    black = chess.Board(KQK.replace(' w ', ' b '))
+    tablebase = _tablebase(StubTablebase(dtz={_after(black, "e8f7"): 40}))
+    assert tablebase.get_best_move(black) == chess.Move.from_uci("e8f7")
+
+    assert tablebase.get_best_move(chess.Board()) is None
+
+
+def _mates(board, move):
+    child = board.copy()
+    child.push(move)
+    return child.is_checkmate()
+
+
+@pytest.mark.asyncio
+async def test_stockfish_engine_short_circuits_on_tablebase():
+    class NoEngine:
+        async def play(self, *args, **kwargs):
+            raise AssertionError("Stockfish should not be searched")
+
+        async def analyse(self, *args, **kwargs):
+            raise AssertionError("Stockfish should not be searched")
+
+    engine = StockfishEngine()
+    engine.engine = NoEngine()
+    board = chess.Board(KQK)
+    child = board.copy()
+    child.push(chess.Move.from_uci("d1d6"))
+    engine.tablebase = _tablebase(StubTablebase(dtz={child.epd(): 3}))
+
+    assert await engine.get_best_move(board) == chess.Move.from_uci("d1d6")
+    assert await engine.evaluate_position(board) == TABLEBASE_WIN_SCORE
@@ -5,6 +5,7 @@ Initial Model Training Script
 Trains the initial chess model using existing game data or random games.
 """
 
+import argparse
 import asyncio
 import sys
 from pathlib import Path
@@ -17,10 +18,17 @@ import random
 sys.path.append(str(Path(__file__).parent / "src"))
 
 from src.learning.neural_network import ChessNet, PositionEncoder, ChessTrainer
+from src.learning.distributed import launch
+from src.learning.position_codec import decode_features, encode_position, iter_batches
+from src.learning.replay_buffer import ReplayBuffer
 from src.database.db_manager import DatabaseManager
 from src.engine.stockfish_engine import StockfishEngine
 
 
+MODEL_PATH = "models/chess_model_initial.pth"
+GENERATED_POSITIONS = "data/positions/generated.bin"
+
+
 class InitialTrainer:
     """Handles initial training of the chess model."""
     
@@ -45,21 +53,20 @@ class InitialTrainer:
         
         logger.info("✅ Training components initialized")
     
-    async def generate_training_data(self, num_games=100):
+    async def generate_training_data(self, num_games=100, max_plies=100):
         """Generate training data by playing random games with Stockfish analysis."""
         logger.info(f"🎮 Generating {num_games} training games...")
         
-        training_data = []
+        training_data = ReplayBuffer(capacity=num_games * max_plies)
         
         for game_num in range(num_games):
             logger.info(f"Generating game {game_num + 1}/{num_games}")
             
             board = chess.Board()
-            positions = []
-            evaluations = []
+            boards = []
             
             # Play a random game
-            while not board.is_game_over() and len(board.move_stack) < 100:
+            while not board.is_game_over() and len(board.move_stack) < max_plies:
                 # Get random legal move
                 legal_moves = list(board.legal_moves)
                 if not legal_moves:
@@ -67,25 +74,23 @@ class InitialTrainer:
                 
                 move = random.choice(legal_moves)
                 board.push(move)
-                
-                # Encode position
-                position_tensor = self.encoder.board_to_tensor(board)
-                position_tensor = self.encoder.add_game_state_features(board, position_tensor)
-                
-                # Get Stockfish evaluation
-                evaluation = await self.engine.evaluate_position(board)
-                
-                positions.append(position_tensor)
-                evaluations.append(evaluation / 10.0)  # Normalize to [-1, 1] range
+                boards.append(board.copy(stack=False))
             
-            # Add to training data
-            for pos, eval_score in zip(positions, evaluations):
-                training_data.append((pos, eval_score))
+            # The policy label of each position is the move played from it;
+            # the final position has none, so it is left out of the data
+            boards.pop()
+            next_moves = iter(board.move_stack[1:])
+            
+            # Label the whole game with shallow searches in one engine session
+            async for labeled_board, evaluation in self.engine.label_positions(boards, log_every=0):
+                # Normalize to [-1, 1] range
+                training_data.append(encode_position(labeled_board, next(next_moves), evaluation / 10.0))
             
             if (game_num + 1) % 10 == 0:
                 logger.info(f"Generated {len(training_data)} training positions so far")
         
-        logger.info(f"✅ Generated {len(training_data)} training positions")
+        logger.info(f"✅ Generated {len(training_data)} training positions "
+                    f"({training_data.records.dtype.itemsize} bytes each)")
         return training_data
     
     async def train_model(self, training_data, epochs=50, batch_size=32):
@@ -93,22 +98,15 @@ class InitialTrainer:
         logger.info(f"🧠 Training model for {epochs} epochs...")
         
         for epoch in range(epochs):
-            random.shuffle(training_data)
-            
             total_value_loss = 0
             total_policy_loss = 0
             num_batches = 0
             
-            # Process in batches
-            for i in range(0, len(training_data), batch_size):
-                batch = training_data[i:i + batch_size]
-                
-                positions = [item[0] for item in batch]
-                values = [item[1] for item in batch]
-                
-                # For now, use random move indices (in real implementation, 
-                # you'd extract actual moves from the training data)
-                moves = [random.randint(0, 4095) for _ in batch]
+            # Process in shuffled batches
+            for records in training_data.iter_batches(batch_size):
+                positions = torch.from_numpy(decode_features(records))
+                values = records['value'].astype('float32')
+                moves = records['move'].astype('int64')
                 
                 value_loss, policy_loss = self.trainer.train_step(positions, values, moves)
                 
@@ -126,9 +124,46 @@ class InitialTrainer:
         
         logger.info("✅ Model training completed")
     
+    def train_from_shards(self, shard_dir, epochs=1, batch_size=1024):
+        """Train on position shards written by scripts/pgn_to_positions.py."""
+        logger.info(f"🧠 Training model on shards in {shard_dir} for {epochs} epochs...")
+        
+        for epoch in range(epochs):
+            total_value_loss = 0
+            total_policy_loss = 0
+            num_batches = 0
+            
+            for records in iter_batches(shard_dir, batch_size):
+                positions = torch.from_numpy(decode_features(records))
+                values = records['value'].astype('float32')
+                moves = records['move'].astype('int64')
+                
+                value_loss, policy_loss = self.trainer.train_step(positions, values, moves)
+                
+                total_value_loss += value_loss
+                total_policy_loss += policy_loss
+                num_batches += 1
+            
+            if not num_batches:
+                raise ValueError(f"No training positions found in {shard_dir}")
+            
+            logger.info(f"Epoch {epoch + 1}/{epochs} - "
+                        f"Value Loss: {total_value_loss / num_batches:.4f}, "
+                        f"Policy Loss: {total_policy_loss / num_batches:.4f}")
+        
+        logger.info("✅ Model training completed")
+    
+    def train_distributed(self, data, args, epochs):
+        """Train data-parallel across processes (and nodes); rank 0 writes MODEL_PATH."""
+        logger.info(f"🧠 Distributed training on {data} for {epochs} epochs...")
+        launch(data, MODEL_PATH, procs=args.procs, nodes=args.nodes, node_rank=args.node_rank,
+               master_addr=args.master_addr, master_port=args.master_port, epochs=epochs,
+               batch_size=args.batch_size)
+        logger.info("✅ Model training completed")
+    
     def save_model(self):
         """Save the trained model."""
-        model_path = "models/chess_model_initial.pth"
+        model_path = MODEL_PATH
         Path("models").mkdir(exist_ok=True)
         self.trainer.save_model(model_path)
         logger.info(f"💾 Model saved to {model_path}")
@@ -141,24 +176,41 @@ class InitialTrainer:
             await self.db_manager.close()
 
 
-async def main():
+async def main(args):
     """Main training function."""
     logger.info("🤖 Chess Model Initial Training")
     logger.info("=" * 40)
     
     trainer = InitialTrainer()
     
+    distributed = args.procs != 1 or args.nodes > 1
+    
     try:
-        await trainer.initialize()
-        
-        # Generate training data
-        training_data = await trainer.generate_training_data(num_games=50)
-        
-        # Train the model
-        await trainer.train_model(training_data, epochs=30)
+        if args.positions:
+            # Supervised labels from real games need no engine or database
+            if distributed:
+                trainer.train_distributed(args.positions, args, epochs=args.epochs or 1)
+            else:
+                trainer.train_from_shards(args.positions, epochs=args.epochs or 1,
+                                          batch_size=args.batch_size)
+        else:
+            await trainer.initialize()
+            
+            # Generate training data
+            training_data = await trainer.generate_training_data(num_games=50)
+            
+            # Train the model
+            if distributed:
+                # Worker processes read the positions back from disk
+                Path(GENERATED_POSITIONS).parent.mkdir(parents=True, exist_ok=True)
+                training_data.records[:len(training_data)].tofile(GENERATED_POSITIONS)
+                trainer.train_distributed(GENERATED_POSITIONS, args, epochs=args.epochs or 30)
+            else:
+                await trainer.train_model(training_data, epochs=args.epochs or 30)
         
-        # Save the model
-        trainer.save_model()
+        # Rank 0 already saved the distributed run
+        if not distributed:
+            trainer.save_model()
         
         logger.success("🎉 Initial training completed successfully!")
         
@@ -183,6 +235,22 @@ if __name__ == "__main__":
     Path("data/logs").mkdir(parents=True, exist_ok=True)
     Path("models").mkdir(exist_ok=True)
     
+    parser = argparse.ArgumentParser(description="Train the initial chess model")
+    parser.add_argument("--positions", default=None,
+                        help="directory of position shards from scripts/pgn_to_positions.py")
+    parser.add_argument("--epochs", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=1024,
+                        help="positions per step (per process when distributed)")
+    parser.add_argument("--procs", type=int, default=1,
+                        help="data-parallel training processes on this machine (0 = one per core)")
+    parser.add_argument("--nodes", type=int, default=1, help="machines taking part (needs --positions)")
+    parser.add_argument("--node-rank", type=int, default=0)
+    parser.add_argument("--master-addr", default=None, help="rendezvous host (MASTER_ADDR, node 0)")
+    parser.add_argument("--master-port", type=int, default=None, help="rendezvous port (MASTER_PORT)")
+    args = parser.parse_args()
+    if args.nodes > 1 and not args.positions:
+        parser.error("--nodes > 1 needs --positions so every machine trains on the same shards")
+    
     # Run training
-    asyncio.run(main())
+    asyncio.run(main(args))
 